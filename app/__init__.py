@@ -1,24 +1,54 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from app.config import DevelopmentConfig
+from app.response_cache import ResponseCache
+from app.fragment_cache import FragmentCache
+from app.render_cache import RenderCache
+from app.instrumentation import Instrumentation
+from app.json_provider import FastJSONProvider
+from app.change_feed import ChangeFeed
 
 db = SQLAlchemy()
-migrate_manager = Migrate()  # Renommé pour éviter le conflit
+response_cache = ResponseCache()
+fragment_cache = FragmentCache()
+render_cache = RenderCache()
+instrumentation = Instrumentation()
+change_feed = ChangeFeed()
 
 def create_app(config_class=DevelopmentConfig):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # Sérialisation JSON via orjson lorsqu'il est installé
+    app.json = FastJSONProvider(app)
     
     # Initialize database
     db.init_app(app)
+    from app.database import configure_engine
+    configure_engine(app, db)
     
-    # Initialize Flask-Migrate
-    migrate_manager.init_app(app, db)
+    # Cache des réponses en lecture (ETag + LRU invalidé par version)
+    response_cache.init_app(app)
+    
+    # Fragments HTML précalculés / en cache et bytecode des templates
+    fragment_cache.init_app(app)
+    
+    # Exports de la timeline (SVG, PNG, PDF) en cache sur disque
+    render_cache.init_app(app)
+    
+    # Flux des modifications validées (Server-Sent Events)
+    change_feed.init_app(app)
+    
+    # Mesures par requête (Server-Timing + /metrics), si PERF_INSTRUMENTATION est activé
+    instrumentation.init_app(app, db)
     
     # Register blueprints
     from app.routes import main, project
     app.register_blueprint(main)
     app.register_blueprint(project)
     
+    # Commandes CLI (flask import-tasks, flask init-db, flask db ...) ; Flask-Migrate
+    # n'est chargé qu'à l'exécution d'une commande `flask db`
+    from app.cli import register_cli
+    register_cli(app)
+    
     return app
\ No newline at end of file
@@ -0,0 +1,219 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class MemoryChangeLog:
+    """Journal borné (anneau) des derniers événements, propre au processus.
+
+    Les numéros de séquence sont contigus : la position d'un événement dans
+    l'anneau se déduit de son numéro, sans parcours.
+    """
+
+    def __init__(self, size: int):
+        self._events = deque(maxlen=size)
+        self._sequence = 0
+        self._condition = threading.Condition()
+
+    def publish(self, events: List[Dict]) -> None:
+        with self._condition:
+            for change in events:
+                self._sequence += 1
+                self._events.append((self._sequence, {**change, 'id': self._sequence}))
+            self._condition.notify_all()
+
+    def last_id(self) -> int:
+        return self._sequence
+
+    def read(self, after: int, timeout: float) -> Tuple[List[Tuple[int, Dict]], bool]:
+        """Événements postérieurs à `after` (attend jusqu'à `timeout` s'il n'y en a pas).
+
+        Le booléen indique une perte : événements sortis de l'anneau, ou
+        identifiant inconnu (redémarrage, autre processus).
+        """
+        with self._condition:
+            if after == self._sequence:
+                self._condition.wait(timeout)
+            oldest = self._events[0][0] if self._events else self._sequence + 1
+            if after > self._sequence or after + 1 < oldest:
+                return [], True
+            return list(islice(self._events, after + 1 - oldest, None)), False
+
+
+class RedisChangeLog:
+    """Journal partagé entre workers, dans un flux Redis (ou compatible : Valkey, KeyDB...).
+
+    Un script Lua attribue le numéro de séquence et ajoute l'événement de façon
+    atomique ; le flux est tronqué à environ `size` entrées.
+    """
+
+    PUBLISH_SCRIPT = """
+        local sequence = redis.call('INCR', KEYS[2])
+        redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], sequence .. '-0', 'event', ARGV[1])
+        return sequence
+    """
+
+    def __init__(self, url: str, size: int, key: str = 'change_feed'):
+        # Import différé : redis est optionnel et son import coûte ~70 ms au démarrage
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CHANGE_FEED_REDIS_URL est défini mais le paquet redis n'est pas installé")
+        self._client = redis.Redis.from_url(url)
+        self._size = size
+        self._stream = key
+        self._sequence_key = f'{key}:sequence'
+        self._publish = self._client.register_script(self.PUBLISH_SCRIPT)
+
+    def publish(self, events: List[Dict]) -> None:
+        for change in events:
+            self._publish(keys=[self._stream, self._sequence_key], args=[json.dumps(change), self._size])
+
+    def last_id(self) -> int:
+        return int(self._client.get(self._sequence_key) or 0)
+
+    def read(self, after: int, timeout: float) -> Tuple[List[Tuple[int, Dict]], bool]:
+        last = self.last_id()
+        first = self._client.xrange(self._stream, count=1)
+        oldest = int(first[0][0].split(b'-')[0]) if first else last + 1
+        if after > last or after + 1 < oldest:
+            return [], True
+
+        # block=0 attendrait indéfiniment : sans délai, lecture non bloquante
+        result = self._client.xread({self._stream: f'{after}-0'}, block=int(timeout * 1000) or None)
+        events = []
+        for _, entries in result:
+            for entry_id, fields in entries:
+                sequence = int(entry_id.split(b'-')[0])
+                events.append((sequence, {**json.loads(fields[b'event']), 'id': sequence}))
+        return events, False
+
+
+class ChangeFeed:
+    """Extension Flask : flux des modifications validées, diffusé en Server-Sent Events.
+
+    Les services déclarent leurs modifications avec `record()` pendant la
+    transaction ; elles ne sont publiées qu'au commit et oubliées en cas de
+    rollback. Le journal est en mémoire (un par processus) ou, si
+    CHANGE_FEED_REDIS_URL est défini, dans Redis pour être partagé entre
+    workers. Chaque événement porte un numéro de séquence : un client qui se
+    reconnecte avec Last-Event-ID reprend là où il s'était arrêté.
+
+    Les numéros d'un journal en mémoire ne valent que pour son processus :
+    avec plusieurs workers (CHANGE_FEED_PROCESSES > 1) sans Redis, le flux est
+    désactivé plutôt que de sauter ou répéter des événements à la reprise.
+    Un flux ouvert occupe un thread du worker : au plus
+    CHANGE_FEED_MAX_STREAMS flux longs par processus, les connexions
+    suivantes sont servies en interrogation courte (événements en attente,
+    puis reconnexion du navigateur après CHANGE_FEED_POLL_INTERVAL secondes).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CHANGE_FEED_SIZE', 1000)
+        app.config.setdefault('CHANGE_FEED_REDIS_URL', None)
+        app.config.setdefault('CHANGE_FEED_HEARTBEAT', 15)
+        # Durée maximale d'une connexion : le navigateur se reconnecte seul ensuite
+        app.config.setdefault('CHANGE_FEED_STREAM_TIMEOUT', 300)
+        app.config.setdefault('CHANGE_FEED_MAX_STREAMS', 2)
+        app.config.setdefault('CHANGE_FEED_POLL_INTERVAL', 10)
+        app.config.setdefault('CHANGE_FEED_PROCESSES', 1)
+
+        if app.config['CHANGE_FEED_REDIS_URL']:
+            log = RedisChangeLog(app.config['CHANGE_FEED_REDIS_URL'], app.config['CHANGE_FEED_SIZE'])
+        elif app.config['CHANGE_FEED_PROCESSES'] > 1:
+            app.logger.warning(
+                "Flux des modifications désactivé : %d workers sans CHANGE_FEED_REDIS_URL "
+                "(un journal en mémoire par processus ne permet pas la reprise Last-Event-ID)",
+                app.config['CHANGE_FEED_PROCESSES']
+            )
+            log = None
+        else:
+            log = MemoryChangeLog(app.config['CHANGE_FEED_SIZE'])
+        app.extensions['change_feed'] = log
+        app.extensions['change_feed_streams'] = threading.BoundedSemaphore(app.config['CHANGE_FEED_MAX_STREAMS']) \
+            if app.config['CHANGE_FEED_MAX_STREAMS'] > 0 else None
+
+        if not event.contains(Session, 'after_commit', _publish_pending):
+            event.listen(Session, 'after_commit', _publish_pending)
+            event.listen(Session, 'after_rollback', _discard_pending)
+
+    @staticmethod
+    def record(change_type: str, **data) -> None:
+        """Déclare une modification, publiée au prochain commit de la session courante"""
+        from app import db
+        db.session.info.setdefault('pending_changes', []).append({
+            'type': change_type,
+            'at': datetime.utcnow().isoformat(),
+            'data': data
+        })
+
+    @staticmethod
+    def available() -> bool:
+        """Faux si le flux est désactivé (plusieurs workers sans journal partagé)"""
+        return current_app.extensions['change_feed'] is not None
+
+    @staticmethod
+    def last_id() -> int:
+        return current_app.extensions['change_feed'].last_id()
+
+    @staticmethod
+    def stream(last_event_id: Optional[int]) -> Iterator[str]:
+        """Flux SSE : événements `change`, `reset` en cas de perte, commentaires de maintien"""
+        log = current_app.extensions['change_feed']
+        slots = current_app.extensions['change_feed_streams']
+        heartbeat = current_app.config['CHANGE_FEED_HEARTBEAT']
+        deadline = time.monotonic() + current_app.config['CHANGE_FEED_STREAM_TIMEOUT']
+        after = log.last_id() if last_event_id is None else last_event_id
+
+        if slots is None or not slots.acquire(blocking=False):
+            # Threads du worker réservés aux autres requêtes : interrogation courte
+            yield f"retry: {current_app.config['CHANGE_FEED_POLL_INTERVAL'] * 1000}\n\n"
+            for message, _ in ChangeFeed._messages(log, after, 0):
+                yield message
+            return
+
+        try:
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                for message, after in ChangeFeed._messages(log, after, heartbeat):
+                    yield message
+        finally:
+            slots.release()
+
+    @staticmethod
+    def _messages(log, after: int, timeout: float) -> List[Tuple[str, int]]:
+        """Messages SSE d'une lecture du journal, avec la position atteinte après chacun.
+
+        Chaque message porte un id (le Last-Event-ID de la reconnexion), y
+        compris le maintien : un client qui n'a reçu aucun événement reprend
+        tout de même là où il s'était arrêté.
+        """
+        events, lost = log.read(after, timeout)
+        if lost:
+            after = log.last_id()
+            return [(f'id: {after}\nevent: reset\ndata: {{}}\n\n', after)]
+        if not events:
+            return [(f': keepalive\nid: {after}\n\n', after)]
+        return [(f'id: {sequence}\nevent: change\ndata: {json.dumps(change)}\n\n', sequence)
+                for sequence, change in events]
+
+
+def _publish_pending(session):
+    pending = session.info.pop('pending_changes', None)
+    if pending and has_app_context() and current_app.extensions.get('change_feed') is not None:
+        current_app.extensions['change_feed'].publish(pending)
+
+
+def _discard_pending(session):
+    session.info.pop('pending_changes', None)
@@ -0,0 +1,118 @@
+import json
+import click
+from flask import current_app, g
+from app import db
+from app.database import bootstrap_database, init_migrations
+from app.services import HistoryService, ImportService, RollupService
+
+
+class MigrationGroup(click.Group):
+    """Groupe `flask db` chargé à la demande.
+
+    Les commandes de Flask-Migrate ne sont résolues qu'à leur appel : les
+    workers WSGI et les tests n'importent ni Flask-Migrate ni alembic.
+    """
+
+    @staticmethod
+    def _commands() -> click.Group:
+        init_migrations(current_app._get_current_object(), db)
+        from flask_migrate.cli import db as db_group
+        return db_group
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+
+@click.group('db', cls=MigrationGroup)
+@click.option('-d', '--directory', default=None, help='Dossier des scripts de migration (migrations par défaut)')
+@click.option('-x', '--x-arg', multiple=True, help='Arguments supplémentaires transmis à env.py')
+def migration_commands(directory, x_arg):
+    """Migrations de la base (Flask-Migrate)."""
+    # Options du groupe `db` de Flask-Migrate, lues par Migrate.get_config()
+    g.directory = directory
+    g.x_arg = x_arg
+
+
+def register_cli(app):
+    """Enregistre les commandes `flask ...` de l'application"""
+
+    app.cli.add_command(migration_commands)
+
+    @app.cli.command('init-db')
+    @click.option('--seed/--no-seed', default=True, help='Charge les données de démonstration')
+    def init_db(seed):
+        """Crée le schéma d'une base vide (puis `flask db upgrade` pour les évolutions)."""
+        if bootstrap_database(db, seed=seed):
+            click.echo('Base créée' + (' et initialisée avec les données de démonstration' if seed else ''))
+        else:
+            click.echo('Base existante conservée ; `flask db upgrade` applique les migrations en attente')
+
+    @app.cli.group('history')
+    def history():
+        """Historique des tâches, projets et saisies ETP."""
+
+    @history.command('snapshot')
+    @click.option('--min-changes', type=int, default=1, show_default=True,
+                  help="Nombre minimal de modifications depuis le snapshot précédent")
+    def history_snapshot(min_changes):
+        """Compacte le journal en un snapshot (à planifier, par exemple toutes les heures)."""
+        snapshot = HistoryService.snapshot(min_changes=min_changes)
+        if snapshot is None:
+            click.echo('Pas assez de modifications depuis le dernier snapshot')
+        else:
+            click.echo(f"Snapshot {snapshot.id} au {snapshot.taken_at.isoformat()} : "
+                       f"{snapshot.tasks} tâches, {len(snapshot.payload)} octets")
+
+    @history.command('stats')
+    def history_stats():
+        """Affiche la taille du journal et des snapshots."""
+        for name, value in HistoryService.stats().items():
+            click.echo(f"{name:<20} {value}")
+
+    @app.cli.group('rollups')
+    def rollups():
+        """Cumuls de la timeline par jour, semaine, mois, trimestre et année."""
+
+    @rollups.command('rebuild')
+    def rollups_rebuild():
+        """Recalcule tous les cumuls depuis les tâches."""
+        result = RollupService.rebuild()
+        click.echo(f"{result['rows']} cumuls calculés (journal jusqu'à {result['task_history_id']})")
+
+    @rollups.command('catch-up')
+    def rollups_catch_up():
+        """Applique les modifications récentes aux cumuls (à planifier pour alléger les lectures)."""
+        click.echo(f"{RollupService.catch_up()} lignes du journal appliquées")
+
+    @app.cli.command('import-tasks')
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'file_format', type=click.Choice(['auto', 'json', 'csv']), default='auto',
+                  help="Format du fichier (déduit de l'extension par défaut)")
+    @click.option('--dry-run', is_flag=True, help='Valide les lignes sans rien écrire')
+    def import_tasks(source, file_format, dry_run):
+        """Importe des tâches depuis un fichier JSON ou CSV (SOURCE, '-' pour stdin)."""
+        if file_format == 'auto':
+            file_format = 'csv' if source.name.endswith('.csv') else 'json'
+
+        content = source.read()
+        if file_format == 'csv':
+            rows = ImportService.parse_csv(content)
+        else:
+            data = json.loads(content)
+            rows = data.get('tasks', []) if isinstance(data, dict) else data
+
+        report = ImportService.import_tasks(rows, dry_run=dry_run)
+
+        for error in report['errors']:
+            click.echo(f"Ligne {error['row']} : {error['error']}", err=True)
+        action = 'validées' if dry_run else 'importées'
+        click.echo(
+            f"{report['created']} créations, {report['updated']} mises à jour {action}, "
+            f"{len(report['errors'])} erreurs en {report['duration']:.2f} s "
+            f"({report['rows_per_second']} lignes/s)"
+        )
+        if report['errors']:
+            raise SystemExit(1)
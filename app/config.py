@@ -1,13 +1,74 @@
+import os
 from datetime import timedelta
 
+def database_url(default='sqlite:///project_manager.db'):
+    """URL de la base depuis l'environnement (DATABASE_URL), avec repli sur SQLite"""
+    url = os.environ.get('DATABASE_URL', default)
+    # Les hébergeurs fournissent souvent l'ancien schéma postgres://, refusé par SQLAlchemy
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
 class Config:
-    SECRET_KEY = 'your-secret-key-here'
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-here')
     DEBUG = False
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///project_manager.db'
+    SQLALCHEMY_DATABASE_URI = database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Instrumentation des requêtes (Server-Timing, /metrics), désactivée par défaut
+    PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+    # Journal des modifications partagé entre workers (redis://...) ; en mémoire si absent
+    CHANGE_FEED_REDIS_URL = os.environ.get('CHANGE_FEED_REDIS_URL')
+    # Nombre de processus qui servent l'application (renseigné par gunicorn.conf.py) :
+    # au-delà d'un, le flux exige le journal Redis
+    CHANGE_FEED_PROCESSES = int(os.environ.get('CHANGE_FEED_PROCESSES', 1))
+    # Flux SSE longs par processus (chacun occupe un thread) ; 0 : interrogation courte seulement
+    CHANGE_FEED_MAX_STREAMS = int(os.environ.get('CHANGE_FEED_MAX_STREAMS', 2))
+    TIMELINE_PAGE_SIZE = 100
+    TIMELINE_MAX_PAGE_SIZE = 500
+    # Snapshots d'historique décodés gardés en mémoire par worker (reconstitutions ?as_of=)
+    HISTORY_SNAPSHOT_CACHE_SIZE = 2
+    # Nombre de seaux visé par /api/rollups en niveau automatique, et maximum accepté
+    ROLLUP_BUCKETS = 100
+    ROLLUP_MAX_BUCKETS = 1000
+    # Nombre maximal de points de courbe (jours ou semaines) servis par /api/capacity :
+    # dix ans au jour près, de quoi couvrir le calendrier des périodes ETP
+    CAPACITY_MAX_BUCKETS = 3660
+    # PRAGMA appliqués à chaque connexion SQLite (ignorés pour les autres bases) :
+    # WAL permet les lectures pendant une écriture, busy_timeout fait attendre
+    # un écrivain au lieu d'échouer avec "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL'
+    }
 
 class DevelopmentConfig(Config):
     DEBUG = True
 
 class ProductionConfig(Config):
-    DEBUG = False
\ No newline at end of file
+    DEBUG = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True
+    }
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig
+}
+
+def config_from_env(default='production'):
+    """Classe de configuration désignée par APP_CONFIG (development, production, testing)"""
+    name = os.environ.get('APP_CONFIG', default).lower()
+    try:
+        return CONFIGS[name]
+    except KeyError:
+        raise ValueError(f"APP_CONFIG inconnu : {name} (attendu : {', '.join(CONFIGS)})")
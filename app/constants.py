@@ -1,18 +1,31 @@
+from datetime import date
+
 class TimeConstants:
-    PERIODS_MAPPING = {
-        1: "2025 Q1-Q2",
-        2: "2025 Q3-Q4",
-        3: "2026-2027"
-    }
+    # Périodes ETP : (libellé, début inclus, fin exclue)
+    ETP_PERIODS = [
+        ("2025 Q1-Q2", date(2025, 1, 1), date(2025, 7, 1)),
+        ("2025 Q3-Q4", date(2025, 7, 1), date(2026, 1, 1)),
+        ("2026-2027", date(2026, 1, 1), date(2028, 1, 1))
+    ]
+    
+    # Dates de tâche acceptées en écriture : les cumuls par jour coûtent en
+    # proportion de la durée d'une tâche, qui reste ainsi bornée à un siècle
+    TASK_DATE_MIN = date(2000, 1, 1)
+    TASK_DATE_MAX = date(2099, 12, 31)
+
+    PERIODS_MAPPING = {index: period[0] for index, period in enumerate(ETP_PERIODS, start=1)}
     
-    PERIODS_DISPLAY = [
-        "2025 Q1",
-        "2025 Q2",
-        "2025 Q3",
-        "2025 Q4",
-        "2026-2027"
+    # Colonnes de la timeline : (libellé, début inclus, fin exclue)
+    TIMELINE_COLUMNS = [
+        ("2025 Q1", date(2025, 1, 1), date(2025, 4, 1)),
+        ("2025 Q2", date(2025, 4, 1), date(2025, 7, 1)),
+        ("2025 Q3", date(2025, 7, 1), date(2025, 10, 1)),
+        ("2025 Q4", date(2025, 10, 1), date(2026, 1, 1)),
+        ("2026-2027", date(2026, 1, 1), date(2028, 1, 1))
     ]
     
+    PERIODS_DISPLAY = [column[0] for column in TIMELINE_COLUMNS]
+    
     MILESTONES = [
         {"position": "left-1/3", "text": "RFI"},
         {"position": "left-1/2", "text": "RFP"},
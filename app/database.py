@@ -0,0 +1,53 @@
+from flask import current_app
+from sqlalchemy import event, inspect
+
+# Journal des tâches (triggers), index plein texte et upserts n'existent que pour ces dialectes
+SUPPORTED_DIALECTS = ('sqlite', 'postgresql')
+
+
+def configure_engine(app, db):
+    """Vérifie que la base est supportée et applique les réglages de connexion du dialecte (PRAGMA SQLite)"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name not in SUPPORTED_DIALECTS:
+        raise RuntimeError(f"Base de données non supportée : {engine.dialect.name} "
+                           f"(SQLALCHEMY_DATABASE_URI doit désigner SQLite ou PostgreSQL)")
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def init_migrations(app, db):
+    """Initialise Flask-Migrate à la demande (import d'alembic compris)"""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+
+def bootstrap_database(db, seed: bool = True) -> bool:
+    """Crée le schéma d'une base vide, la marque à la dernière migration et la peuple.
+
+    Ne fait rien si les tables existent déjà : les évolutions de schéma passent
+    par `flask db upgrade`. Retourne True si la base a été créée. À appeler
+    dans un contexte d'application, hors du chemin des requêtes.
+    """
+    if inspect(db.engine).has_table('projects'):
+        return False
+
+    db.create_all()
+    init_migrations(current_app._get_current_object(), db)
+    from flask_migrate import stamp
+    stamp()
+    if seed:
+        from app.services.init_data import init_db_data
+        init_db_data()
+    return True
@@ -0,0 +1,10 @@
+class ConflictError(Exception):
+    """Écriture refusée : la version attendue ne correspond plus à la ligne en base.
+
+    `current` contient l'état actuel sérialisé des lignes concernées, renvoyé
+    au client avec le statut 409 pour qu'il fusionne sans tout recharger.
+    """
+
+    def __init__(self, message: str, current=None):
+        super().__init__(message)
+        self.current = current
@@ -0,0 +1,84 @@
+import os
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from app.response_cache import LRUCache
+from app.timeline_layout import TimelineLayout
+
+
+class FragmentCache:
+    """Extension Flask : fragments HTML précalculés ou mis en cache.
+
+    - l'en-tête des périodes de la timeline est rendu une fois au démarrage ;
+    - chaque ligne de projet de la timeline est mise en cache, indexée par le
+      projet (id, updated_at) et par l'empreinte (id, updated_at) de ses tâches
+      affichées : après une écriture, seuls les projets modifiés sont chargés
+      et rendus ;
+    - le bytecode des templates compilés est conservé dans le dossier instance
+      et survit aux redémarrages des workers.
+    """
+
+    ROW_TEMPLATE = 'project/_timeline_row.html'
+    HEADER_TEMPLATE = 'project/_timeline_header.html'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_SIZE', 2048)
+        app.config.setdefault('JINJA_BYTECODE_CACHE_DIR', 'jinja_cache')
+
+        if app.config['JINJA_BYTECODE_CACHE_DIR']:
+            directory = os.path.join(app.instance_path, app.config['JINJA_BYTECODE_CACHE_DIR'])
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+        with app.app_context():
+            layout = TimelineLayout.current()
+            header = app.jinja_env.get_template(self.HEADER_TEMPLATE).render(periods=layout.labels)
+        app.extensions['fragment_cache'] = {
+            'static': {'timeline_header': (layout.signature, Markup(header))},
+            'rows': LRUCache(app.config['FRAGMENT_CACHE_SIZE'])
+        }
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['fragment_cache']
+
+    def timeline_header(self) -> Markup:
+        """En-tête des périodes ; re-rendu seulement si la grille a changé depuis le démarrage"""
+        state = self._state()
+        layout = TimelineLayout.current()
+        signature, header = state['static']['timeline_header']
+        if signature != layout.signature:
+            header = Markup(current_app.jinja_env.get_template(self.HEADER_TEMPLATE).render(periods=layout.labels))
+            state['static']['timeline_header'] = (layout.signature, header)
+        return header
+
+    def timeline_rows(self, fingerprints, load_projects) -> list:
+        """Lignes HTML de la timeline.
+
+        `fingerprints` vient de ProjectService.get_timeline_page_fingerprints ;
+        `load_projects(ids)` sérialise les projets (avec leurs tâches visibles)
+        dont la ligne n'est pas en cache : eux seuls sont chargés et rendus.
+        """
+        rows_cache = self._state()['rows']
+        layout = TimelineLayout.current()
+
+        keys = [(project_id, name, color_scheme, version, hash(tasks), layout.signature)
+                for project_id, name, color_scheme, version, tasks in fingerprints]
+        rows = [rows_cache.get(key) for key in keys]
+        missing = [index for index, row in enumerate(rows) if row is None]
+        if missing:
+            template = current_app.jinja_env.get_template(self.ROW_TEMPLATE)
+            serialized = {project['id']: project for project in load_projects([keys[index][0] for index in missing])}
+            for index in missing:
+                project = serialized.get(keys[index][0])
+                if project is None:
+                    # Projet supprimé entre les deux requêtes
+                    rows[index] = Markup('')
+                    continue
+                rows[index] = Markup(template.render(project=project))
+                rows_cache.put(keys[index], rows[index])
+        return rows
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import defaultdict
+from flask import Response, current_app, g, has_request_context, request, template_rendered, before_render_template
+from app.json_provider import FastJSONProvider
+from sqlalchemy import event
+
+
+class MetricsRegistry:
+    """Agrégats par endpoint (compteurs et sommes), exposés au format texte Prometheus."""
+
+    DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._sums = defaultdict(lambda: defaultdict(float))
+        self._buckets = defaultdict(lambda: [0] * len(self.DURATION_BUCKETS))
+
+    def record(self, endpoint: str, method: str, status: int, timings: dict) -> None:
+        with self._lock:
+            self._requests[(endpoint, method, status)] += 1
+            sums = self._sums[endpoint]
+            sums['count'] += 1
+            for name, value in timings.items():
+                sums[name] += value
+            buckets = self._buckets[endpoint]
+            for index, bound in enumerate(self.DURATION_BUCKETS):
+                if timings['total'] <= bound:
+                    buckets[index] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append('# HELP http_requests_total Requêtes HTTP traitées')
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines.append('# HELP http_request_duration_seconds Durée totale des requêtes')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for endpoint, sums in sorted(self._sums.items()):
+                for bound, count in zip(self.DURATION_BUCKETS, self._buckets[endpoint]):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {int(sums["count"])}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {sums["total"]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {int(sums["count"])}')
+
+            for name, metric, help_text in [
+                ('queries', 'db_queries_total', 'Requêtes SQL exécutées'),
+                ('db', 'db_duration_seconds_total', 'Temps passé dans la base'),
+                ('render', 'template_render_seconds_total', 'Temps de rendu des templates'),
+                ('serialize', 'serialization_seconds_total', 'Temps de sérialisation JSON'),
+            ]:
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} counter')
+                for endpoint, sums in sorted(self._sums.items()):
+                    value = int(sums[name]) if name == 'queries' else f'{sums[name]:.6f}'
+                    lines.append(f'{metric}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """Provider JSON qui mesure le temps de sérialisation de la requête en cours"""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            _add_timing('serialize', time.perf_counter() - started)
+
+
+def _add_timing(name: str, value: float) -> None:
+    if has_request_context():
+        timings = g.get('perf_timings')
+        if timings is not None:
+            timings[name] += value
+
+
+class Instrumentation:
+    """Extension Flask optionnelle (PERF_INSTRUMENTATION) de mesure par requête.
+
+    Compte les requêtes SQL et mesure le temps base de données, rendu des
+    templates et sérialisation JSON de chaque requête HTTP. Les valeurs sont
+    renvoyées dans l'en-tête Server-Timing et agrégées par endpoint sur
+    /metrics. Les métriques sont propres à chaque processus worker.
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        if not app.config.get('PERF_INSTRUMENTATION'):
+            return
+
+        app.extensions['instrumentation'] = MetricsRegistry()
+        app.json = TimedJSONProvider(app)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    @staticmethod
+    def _before_request():
+        g.perf_started = time.perf_counter()
+        g.perf_timings = defaultdict(float)
+
+    def _after_request(self, response):
+        timings = g.get('perf_timings')
+        if timings is None or request.endpoint == 'metrics':
+            return response
+
+        timings['total'] = time.perf_counter() - g.perf_started
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={timings["db"] * 1000:.2f};desc="{int(timings["queries"])} queries"',
+            f'render;dur={timings["render"] * 1000:.2f}',
+            f'serialize;dur={timings["serialize"] * 1000:.2f}',
+            f'total;dur={timings["total"] * 1000:.2f}',
+        ])
+        registry = current_app.extensions['instrumentation']
+        registry.record(request.endpoint or 'unknown', request.method, response.status_code, timings)
+        return response
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('perf_query_start', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['perf_query_start'].pop()
+        _add_timing('queries', 1)
+        _add_timing('db', time.perf_counter() - started)
+
+    @staticmethod
+    def _before_render(sender, template, context, **extra):
+        g.perf_render_started = time.perf_counter()
+
+    @staticmethod
+    def _after_render(sender, template, context, **extra):
+        started = g.pop('perf_render_started', None)
+        if started is not None:
+            _add_timing('render', time.perf_counter() - started)
+
+    def _metrics_view(self):
+        registry = current_app.extensions['instrumentation']
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
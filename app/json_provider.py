@@ -0,0 +1,42 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+
+def dumps(obj) -> str:
+    """Sérialisation compacte (orjson si disponible), pour les flux NDJSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, ensure_ascii=False, default=DefaultJSONProvider.default)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider JSON de l'application : orjson s'il est installé, json sinon.
+
+    Le résultat est équivalent à celui du provider par défaut (clés triées,
+    dates au format HTTP via `default`) ; seuls les caractères non ASCII sont
+    émis en UTF-8 au lieu d'être échappés.
+    """
+
+    SUPPORTED_ARGUMENTS = {'default', 'indent', 'separators', 'sort_keys'}
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or not kwargs.keys() <= self.SUPPORTED_ARGUMENTS:
+            return super().dumps(obj, **kwargs)
+
+        # Dates et dataclasses passent par `default`, comme avec le provider standard
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -1,5 +1,11 @@
 from .project import Project
 from .task import Task
 from .etp_entry import EtpEntry
+from .etp_aggregate import EtpAggregate
+from .scenario import Scenario, ScenarioTask, ScenarioEtpEntry
+from .history import TaskHistory, ProjectHistory, EtpEntryHistory, HistorySnapshot
+from .rollup import TimelineRollup, TimelineRollupState
+from . import search_index  # noqa: F401  (index plein texte créé avec la table tasks)
 
-__all__ = ['Project', 'Task', 'EtpEntry']
\ No newline at end of file
+__all__ = ['Project', 'Task', 'EtpEntry', 'EtpAggregate', 'Scenario', 'ScenarioTask', 'ScenarioEtpEntry',
+           'TaskHistory', 'ProjectHistory', 'EtpEntryHistory', 'HistorySnapshot', 'TimelineRollup', 'TimelineRollupState']
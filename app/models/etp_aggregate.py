@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+class EtpAggregate(db.Model):
+    """Agrégat ETP matérialisé d'un projet, tenu à jour à chaque écriture.
+
+    `period_values` associe chaque période à l'ETP retenu pour le projet
+    (valeur saisie dans EtpEntry ou maximum des tâches), `max_etp` est l'ETP
+    maximal de ses tâches. `calendar_signature` identifie le calendrier de
+    périodes utilisé pour le calcul : un agrégat calculé avec un autre
+    calendrier est considéré comme manquant.
+    """
+    __tablename__ = 'etp_aggregates'
+    
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    period_values = db.Column(db.JSON, nullable=False, default=dict)
+    max_etp = db.Column(db.Float, nullable=False, default=0.0)
+    calendar_signature = db.Column(db.String(40))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
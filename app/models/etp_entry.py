@@ -10,7 +10,10 @@ class EtpEntry(db.Model):
     etp_value = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Verrouillage optimiste : chaque UPDATE de l'ORM vérifie et incrémente la version
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     __table_args__ = (
         db.UniqueConstraint('project_id', 'period', name='uix_project_period'),
     )
+    __mapper_args__ = {'version_id_col': version}
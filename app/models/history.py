@@ -0,0 +1,182 @@
+"""Historique (ajout seul) des tâches, projets et entrées ETP.
+
+Chaque écriture sur `tasks`, `projects` ou `etp_entries` ajoute une ligne à la
+table d'historique correspondante : état après l'écriture pour un INSERT (I)
+ou un UPDATE (U), clé seule pour un DELETE (D). Des triggers alimentent les
+tables, si bien que toutes les écritures sont couvertes (ORM, UPDATE
+ensemblistes, executemany, upserts) sans passer par les services.
+
+Pour limiter la croissance, un UPDATE n'enregistre le libellé et le
+commentaire d'une tâche que s'ils changent (NULL sinon ; un commentaire
+effacé est enregistré comme ''). Les HistorySnapshot compactent
+périodiquement le journal (voir HistoryService.snapshot).
+
+Les triggers sont créés avec les tables (create_all) ; la migration
+c81f4e6a2d93 les ajoute aux bases existantes. Comme pour l'index plein
+texte, une migration SQLite qui reconstruit une table suivie supprime ses
+triggers.
+"""
+from sqlalchemy import event
+
+from app import db
+
+
+class TaskHistory(db.Model):
+    __tablename__ = 'task_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(1), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
+    project_id = db.Column(db.Integer)
+    text = db.Column(db.String(200))
+    comment = db.Column(db.Text)
+    start_date = db.Column(db.Date)
+    end_date = db.Column(db.Date)
+    color = db.Column(db.String(50))
+    etp = db.Column(db.Float)
+    version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('ix_task_history_task', 'task_id', 'id'),
+        db.Index('ix_task_history_changed_at', 'changed_at'),
+    )
+
+
+class ProjectHistory(db.Model):
+    __tablename__ = 'project_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(1), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
+    name = db.Column(db.String(100))
+    color_scheme = db.Column(db.String(50))
+    version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('ix_project_history_changed_at', 'changed_at'),
+    )
+
+
+class EtpEntryHistory(db.Model):
+    __tablename__ = 'etp_entry_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.String(20), nullable=False)
+    operation = db.Column(db.String(1), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)
+    etp_value = db.Column(db.Float)
+    version = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index('ix_etp_entry_history_changed_at', 'changed_at'),
+    )
+
+
+class HistorySnapshot(db.Model):
+    """État complet compacté (JSON compressé) après les lignes d'historique jusqu'aux ids indiqués.
+
+    `taken_at` est la date de la dernière modification incluse : l'état vaut
+    pour toute date postérieure, jusqu'à la modification suivante.
+    """
+    __tablename__ = 'history_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False, index=True)
+    task_history_id = db.Column(db.Integer, nullable=False)
+    project_history_id = db.Column(db.Integer, nullable=False)
+    etp_entry_history_id = db.Column(db.Integer, nullable=False)
+    tasks = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+# Tables suivies : table d'historique, clé (colonne source -> colonne
+# d'historique), colonnes d'état, colonnes enregistrées seulement si modifiées
+TRACKED = {
+    'tasks': ('task_history', {'id': 'task_id'},
+              ('project_id', 'text', 'comment', 'start_date', 'end_date', 'color', 'etp', 'version'),
+              ('text', 'comment')),
+    'projects': ('project_history', {'id': 'project_id'}, ('name', 'color_scheme', 'version'), ()),
+    'etp_entries': ('etp_entry_history', {'project_id': 'project_id', 'period': 'period'},
+                    ('etp_value', 'version'), ()),
+}
+
+NOW = {
+    # Horodatage UTC, au format des DateTime écrits par SQLAlchemy
+    'sqlite': "strftime('%Y-%m-%d %H:%M:%f000', 'now')",
+    'postgresql': "(now() AT TIME ZONE 'utc')",
+}
+SAME = {'sqlite': '{new} IS {old}', 'postgresql': '{new} IS NOT DISTINCT FROM {old}'}
+
+
+def _insert(dialect: str, history: str, keys: dict, columns: tuple, sparse: tuple, operation: str) -> str:
+    """INSERT dans la table d'historique pour une opération I, U ou D"""
+    record = 'old' if operation == 'D' else 'new'
+    names = [*keys.values(), 'operation', 'changed_at']
+    values = [f'{record}.{column}' for column in keys] + [f"'{operation}'", NOW[dialect]]
+    if operation != 'D':
+        names += columns
+        for column in columns:
+            value = f'new.{column}'
+            if operation == 'U' and column in sparse:
+                same = SAME[dialect].format(new=value, old=f'old.{column}')
+                value = f"CASE WHEN {same} THEN NULL ELSE coalesce({value}, '') END"
+            values.append(value)
+    return f"INSERT INTO {history} ({', '.join(names)}) VALUES ({', '.join(values)});"
+
+
+def create_statements(dialect: str) -> list:
+    statements = []
+    for table, (history, keys, columns, sparse) in TRACKED.items():
+        if dialect == 'sqlite':
+            for operation, event_name in (('I', 'INSERT'), ('U', 'UPDATE'), ('D', 'DELETE')):
+                statements.append(
+                    f"CREATE TRIGGER IF NOT EXISTS {history}_{event_name.lower()} AFTER {event_name} ON {table} "
+                    f"BEGIN {_insert(dialect, history, keys, columns, sparse, operation)} END"
+                )
+        elif dialect == 'postgresql':
+            statements.append(f"""
+                CREATE OR REPLACE FUNCTION {history}_record() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN {_insert(dialect, history, keys, columns, sparse, 'I')}
+                    ELSIF TG_OP = 'UPDATE' THEN {_insert(dialect, history, keys, columns, sparse, 'U')}
+                    ELSE {_insert(dialect, history, keys, columns, sparse, 'D')}
+                    END IF;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+            """)
+            statements.append(f'DROP TRIGGER IF EXISTS {history}_record ON {table}')
+            statements.append(
+                f'CREATE TRIGGER {history}_record AFTER INSERT OR UPDATE OR DELETE ON {table} '
+                f'FOR EACH ROW EXECUTE FUNCTION {history}_record()'
+            )
+    return statements
+
+
+def drop_statements(dialect: str) -> list:
+    statements = []
+    for table, (history, _, _, _) in TRACKED.items():
+        if dialect == 'sqlite':
+            statements += [f'DROP TRIGGER IF EXISTS {history}_{name}' for name in ('insert', 'update', 'delete')]
+        elif dialect == 'postgresql':
+            statements += [f'DROP TRIGGER IF EXISTS {history}_record ON {table}',
+                           f'DROP FUNCTION IF EXISTS {history}_record()']
+    return statements
+
+
+# Événements des métadonnées : les triggers portent sur plusieurs tables,
+# qui doivent toutes exister
+@event.listens_for(db.metadata, 'after_create')
+def create_history_triggers(target, connection, **kw):
+    for statement in create_statements(connection.dialect.name):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_history_triggers(target, connection, **kw):
+    for statement in drop_statements(connection.dialect.name):
+        connection.exec_driver_sql(statement)
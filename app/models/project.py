@@ -9,15 +9,21 @@ class Project(db.Model):
     color_scheme = db.Column(db.String(50), nullable=False, default='blue')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Verrouillage optimiste : chaque UPDATE de l'ORM vérifie et incrémente la version
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relations
     tasks = db.relationship('Task', backref='project', lazy=True, cascade='all, delete-orphan')
     etp_entries = db.relationship('EtpEntry', backref='project', lazy=True, cascade='all, delete-orphan')
+    etp_aggregate = db.relationship('EtpAggregate', backref='project', uselist=False, cascade='all, delete-orphan')
+    
+    __mapper_args__ = {'version_id_col': version}
     
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'color_scheme': self.color_scheme,
+            'version': self.version,
             'tasks': [task.to_dict() for task in self.tasks]
         }
\ No newline at end of file
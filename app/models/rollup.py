@@ -0,0 +1,38 @@
+from app import db
+
+# Projet fictif des lignes qui couvrent tout le portefeuille
+PORTFOLIO = 0
+
+
+class TimelineRollup(db.Model):
+    """Cumuls des tâches par seau de temps (jour, semaine, mois, trimestre, année).
+
+    Une ligne par niveau, projet (PORTFOLIO pour le portefeuille entier) et
+    seau, identifié par sa date de début ; les seaux sans tâche n'ont pas de
+    ligne. `task_count` est le nombre de tâches actives pendant le seau,
+    `etp_milli` la somme de leurs ETP et `etp_days_milli` la charge
+    (ETP x jours) du seau, tous deux en millièmes pour que les mises à jour
+    incrémentales restent exactes.
+    """
+    __tablename__ = 'timeline_rollups'
+
+    level = db.Column(db.String(10), primary_key=True)
+    project_id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+    etp_milli = db.Column(db.BigInteger, nullable=False, default=0)
+    etp_days_milli = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class TimelineRollupState(db.Model):
+    """Position des cumuls dans le journal task_history (une seule ligne, id = 1).
+
+    Les cumuls reflètent toutes les lignes du journal jusqu'à `task_history_id`
+    inclus ; RollupService.catch_up applique les suivantes.
+    """
+    __tablename__ = 'timeline_rollup_state'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_history_id = db.Column(db.Integer, nullable=False)
+    rebuilt_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,49 @@
+from app import db
+from datetime import datetime
+
+class Scenario(db.Model):
+    """Scénario « et si » : variante nommée du portefeuille.
+
+    Un scénario ne copie rien : il ne contient que les écarts au réel
+    (ScenarioTask, ScenarioEtpEntry), appliqués à la lecture. Le créer coûte
+    une ligne, quelle que soit la taille du portefeuille.
+    """
+    __tablename__ = 'scenarios'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    description = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ScenarioTask(db.Model):
+    """Écart d'une tâche dans un scénario : seuls les champs non nuls remplacent le réel.
+
+    `removed` retire la tâche du scénario. `base_version` est la version de la
+    tâche réelle lors du premier écart : si elle a changé depuis, l'écart
+    repose sur des données modifiées (voir ScenarioService.describe).
+    """
+    __tablename__ = 'scenario_tasks'
+
+    scenario_id = db.Column(db.Integer, db.ForeignKey('scenarios.id', ondelete='CASCADE'), primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'))
+    start_date = db.Column(db.Date)
+    end_date = db.Column(db.Date)
+    color = db.Column(db.String(50))
+    etp = db.Column(db.Float)
+    removed = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    base_version = db.Column(db.Integer, nullable=False)
+
+class ScenarioEtpEntry(db.Model):
+    """Cellule de la table ETP saisie dans un scénario.
+
+    `etp_value` à NULL annule la saisie réelle : la cellule revient à la
+    valeur calculée depuis les tâches du scénario.
+    """
+    __tablename__ = 'scenario_etp_entries'
+
+    scenario_id = db.Column(db.Integer, db.ForeignKey('scenarios.id', ondelete='CASCADE'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    period = db.Column(db.String(20), primary_key=True)
+    etp_value = db.Column(db.Float)
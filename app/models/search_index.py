@@ -0,0 +1,73 @@
+"""Index plein texte des tâches (text, comment), propre au dialecte.
+
+- SQLite : table virtuelle FTS5 `tasks_fts` à contenu externe (les textes ne
+  sont pas dupliqués), tenue à jour par des triggers sur `tasks` ;
+- PostgreSQL : colonne générée `tasks.search_vector` (tsvector) indexée en GIN.
+
+Les triggers et la colonne générée couvrent toutes les écritures, y compris
+les UPDATE et executemany Core des imports et opérations par lot. L'index est
+créé avec la table (create_all) ; la migration e5b9c1d47a20 l'ajoute aux
+bases existantes. Attention : une migration SQLite qui reconstruit `tasks`
+(batch_alter_table avec recréation) supprime les triggers, à recréer ensuite.
+"""
+from sqlalchemy import event
+
+from app.models.task import Task
+
+SQLITE_CREATE = [
+    # remove_diacritics : « equipe » trouve « équipe »
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        text, comment, content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, text, comment) VALUES (new.id, new.text, new.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, text, comment) VALUES ('delete', old.id, old.text, old.comment);
+    END""",
+    # Les décalages de dates ne touchent pas à l'index
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF text, comment ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, text, comment) VALUES ('delete', old.id, old.text, old.comment);
+        INSERT INTO tasks_fts(rowid, text, comment) VALUES (new.id, new.text, new.comment);
+    END""",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS tasks_fts_update',
+    'DROP TRIGGER IF EXISTS tasks_fts_delete',
+    'DROP TRIGGER IF EXISTS tasks_fts_insert',
+    'DROP TABLE IF EXISTS tasks_fts',
+]
+
+POSTGRES_CREATE = [
+    # Configuration 'simple' : pas de racinisation, le contenu mêle français et anglais
+    """ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(text, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(comment, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS ix_tasks_search_vector',
+    'ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector',
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_CREATE, SQLITE_DROP),
+    'postgresql': (POSTGRES_CREATE, POSTGRES_DROP),
+}
+
+
+@event.listens_for(Task.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    create, _ = STATEMENTS.get(connection.dialect.name, ((), ()))
+    for statement in create:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Task.__table__, 'before_drop')
+def drop_search_index(target, connection, **kw):
+    # La table virtuelle FTS5 n'est pas dans les métadonnées : drop_all l'oublierait
+    _, drop = STATEMENTS.get(connection.dialect.name, ((), ()))
+    for statement in drop:
+        connection.exec_driver_sql(statement)
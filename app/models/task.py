@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime, date
+from app.timeline_layout import TimelineLayout
 
 class Task(db.Model):
     __tablename__ = 'tasks'
@@ -14,37 +15,18 @@ class Task(db.Model):
     etp = db.Column(db.Float, default=1.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Verrouillage optimiste : chaque UPDATE de l'ORM vérifie et incrémente la version
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    __table_args__ = (
+        # Sert les requêtes de la timeline par projet et fenêtre de dates
+        db.Index('ix_tasks_project_dates', 'project_id', 'start_date', 'end_date'),
+    )
+    __mapper_args__ = {'version_id_col': version}
     
     def _calculate_grid_position(self):
         """Calcule la position relative dans la grille."""
-        def get_quarter_position(d: date) -> float:
-            if d.year > 2025:
-                return 80.0
-            
-            quarter = (d.month - 1) // 3
-            base_position = quarter * 20.0
-            
-            month_in_quarter = (d.month - 1) % 3
-            days_in_quarter = 90
-            days_from_quarter_start = (month_in_quarter * 30) + (d.day - 1)
-            relative_position = (days_from_quarter_start / days_in_quarter) * 20.0
-            
-            return base_position + relative_position
-        
-        start_pos = get_quarter_position(self.start_date)
-        end_pos = get_quarter_position(self.end_date)
-        
-        if end_pos < start_pos:
-            end_pos = 100.0
-        
-        width = end_pos - start_pos
-        
-        if width < 15 and (self.end_date.month - self.start_date.month >= 1):
-            width = 15
-        elif width < 8:
-            width = 8
-        
-        return start_pos, width
+        return TimelineLayout.current().position(self.start_date, self.end_date)
     
     def to_dict(self):
         start, width = self._calculate_grid_position()
@@ -60,6 +42,7 @@ class Task(db.Model):
             'raw_end_date': self.end_date.isoformat(),      # Pour l'édition
             'color': self.color,
             'etp': self.etp,
+            'version': self.version,
             'start': start,
             'width': width
         }
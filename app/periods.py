@@ -0,0 +1,89 @@
+from bisect import bisect_right
+from datetime import date
+from functools import lru_cache
+from hashlib import sha1
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from flask import current_app, has_app_context
+from app.constants import TimeConstants
+
+
+class Period(NamedTuple):
+    name: str
+    start: date  # inclus
+    end: date    # exclu
+
+
+class PeriodCalendar:
+    """Calendrier des périodes ETP, indexé par dates de début triées.
+
+    Les périodes ne se chevauchent pas : leurs débuts et leurs fins sont donc
+    triés dans le même ordre, et une recherche dichotomique suffit pour trouver
+    les périodes qui recouvrent un intervalle en O(log n + k). Les dates hors
+    du calendrier sont rattachées à la première ou à la dernière période.
+    """
+
+    def __init__(self, periods: Iterable[Tuple[str, date, date]]):
+        self.periods = sorted((Period(*period) for period in periods), key=lambda p: p.start)
+        if not self.periods:
+            raise ValueError("Le calendrier doit contenir au moins une période")
+
+        for previous, period in zip(self.periods, self.periods[1:]):
+            if period.start < previous.end:
+                raise ValueError(f"Les périodes '{previous.name}' et '{period.name}' se chevauchent")
+        for period in self.periods:
+            if period.end <= period.start:
+                raise ValueError(f"La période '{period.name}' est vide")
+
+        self.names = [period.name for period in self.periods]
+        self._starts = [period.start for period in self.periods]
+        self._ends = [period.end for period in self.periods]
+        self.signature = sha1(repr(self.periods).encode()).hexdigest()
+
+    @classmethod
+    def current(cls) -> 'PeriodCalendar':
+        """Retourne le calendrier correspondant à la configuration de l'application."""
+        periods = TimeConstants.ETP_PERIODS
+        if has_app_context():
+            periods = current_app.config.get('ETP_PERIODS') or periods
+        return _calendar_for(tuple(tuple(period) for period in periods))
+
+    def period_for_date(self, target_date: date) -> Optional[str]:
+        """Période contenant la date (None si elle tombe entre deux périodes)"""
+        overlapping = self.overlapping(target_date, target_date)
+        return overlapping[0] if overlapping else None
+
+    def overlapping(self, start: date, end: date) -> List[str]:
+        """Noms des périodes qui recouvrent l'intervalle [start, end] (bornes incluses)"""
+        if end < self._starts[0]:
+            return [self.names[0]]
+        if start >= self._ends[-1]:
+            return [self.names[-1]]
+
+        # Première période dont la fin (exclue) est après le début de l'intervalle
+        first = bisect_right(self._ends, start)
+        # Périodes qui commencent au plus tard à la fin de l'intervalle
+        last = bisect_right(self._starts, end)
+        return self.names[first:last]
+
+    def overlapping_batch(self, starts: Sequence[date], ends: Sequence[date]) -> List[List[str]]:
+        """Version par lot de overlapping() pour une liste de tâches"""
+        names = self.names
+        period_starts = self._starts
+        period_ends = self._ends
+        first_start = period_starts[0]
+        last_end = period_ends[-1]
+
+        results = []
+        for start, end in zip(starts, ends):
+            if end < first_start:
+                results.append([names[0]])
+            elif start >= last_end:
+                results.append([names[-1]])
+            else:
+                results.append(names[bisect_right(period_ends, start):bisect_right(period_starts, end)])
+        return results
+
+
+@lru_cache(maxsize=8)
+def _calendar_for(periods: Tuple[Tuple[str, date, date], ...]) -> PeriodCalendar:
+    return PeriodCalendar(periods)
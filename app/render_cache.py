@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows : le verrou de thread suffit en développement
+    fcntl = None
+
+
+class RenderCache:
+    """Extension Flask : rendus (exports de la timeline) mis en cache sur disque.
+
+    Chaque rendu est un fichier du dossier instance nommé d'après une empreinte
+    du contenu dessiné : tant que les données affichées ne changent pas, tous
+    les workers et tous les destinataires d'un même lien lisent le même
+    fichier, y compris après un redémarrage. Un verrou (fichier + flock) par
+    groupe d'empreintes fait attendre les requêtes simultanées sur un rendu
+    absent, qui n'est donc calculé qu'une fois. Au-delà de RENDER_CACHE_MAX_FILES
+    fichiers, les moins récemment servis sont supprimés.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RENDER_CACHE_DIR', 'timeline_renders')
+        app.config.setdefault('RENDER_CACHE_MAX_FILES', 512)
+        directory = os.path.join(app.instance_path, app.config['RENDER_CACHE_DIR'])
+        os.makedirs(os.path.join(directory, 'locks'), exist_ok=True)
+        app.extensions['render_cache'] = {
+            'directory': directory,
+            'max_files': app.config['RENDER_CACHE_MAX_FILES'],
+            'lock': threading.Lock()
+        }
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['render_cache']
+
+    @contextmanager
+    def _locked(self, key: str):
+        state = self._state()
+        if fcntl is None:
+            with state['lock']:
+                yield
+            return
+        path = os.path.join(state['directory'], 'locks', f'{int(key[:8], 16) % self.LOCK_STRIPES:02d}')
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read(path: str):
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        # La date de modification sert d'ordre LRU pour le nettoyage ; le
+        # fichier a pu être élagué depuis par un autre worker, le contenu lu reste bon
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return content
+
+    def get_or_render(self, key: str, extension: str, render: Callable[[], bytes]) -> bytes:
+        """Contenu en cache pour `key` (empreinte hexadécimale), sinon `render()` une seule fois"""
+        state = self._state()
+        path = os.path.join(state['directory'], f'{key}.{extension}')
+        content = self._read(path)
+        if content is not None:
+            return content
+
+        with self._locked(key):
+            # Une autre requête a pu terminer le rendu pendant l'attente du verrou
+            content = self._read(path)
+            if content is not None:
+                return content
+            content = render()
+            fd, temporary = tempfile.mkstemp(dir=state['directory'], suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temporary, path)
+        self._prune(state)
+        return content
+
+    @staticmethod
+    def _prune(state) -> None:
+        entries = []
+        with os.scandir(state['directory']) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    entries.append(entry)
+        if len(entries) <= state['max_files']:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - state['max_files']]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> int:
+        """Supprime tous les rendus ; retourne le nombre de fichiers supprimés"""
+        directory = self._state()['directory']
+        removed = 0
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                os.remove(path)
+                removed += 1
+        return removed
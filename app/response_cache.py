@@ -0,0 +1,137 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, make_response, request
+
+try:
+    import fcntl
+except ImportError:  # Windows : le verrou de thread suffit en développement
+    fcntl = None
+
+
+class DataVersion:
+    """Compteur de version des données, stocké dans un fichier du dossier instance.
+
+    Le fichier est partagé par tous les workers d'une même machine et survit
+    aux redémarrages : une ETag reste valide tant qu'aucune écriture n'a eu lieu.
+    La valeur est écrite sur une largeur fixe pour qu'un lecteur ne voie jamais
+    un fichier tronqué.
+    """
+
+    WIDTH = 20
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        try:
+            with open(self.path, 'rb') as f:
+                return int(f.read(self.WIDTH) or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.read(fd, self.WIDTH)
+                value = int(raw or 0) + 1
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, str(value).zfill(self.WIDTH).encode())
+                return value
+            finally:
+                os.close(fd)
+
+
+class LRUCache:
+    """Cache borné à éviction LRU, sûr entre threads."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Extension Flask : ETag / GET conditionnel et cache des réponses sérialisées.
+
+    Les entrées sont indexées par (endpoint, URL) et étiquetées avec la version
+    des données au moment du calcul ; une écriture incrémente la version, ce
+    qui invalide toutes les entrées sans avoir à les parcourir.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_SIZE', 128)
+        app.config.setdefault('DATA_VERSION_FILE', 'data_version')
+        os.makedirs(app.instance_path, exist_ok=True)
+        app.extensions['response_cache'] = {
+            'version': DataVersion(os.path.join(app.instance_path, app.config['DATA_VERSION_FILE'])),
+            'entries': LRUCache(app.config['RESPONSE_CACHE_SIZE'])
+        }
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['response_cache']
+
+    def current_version(self) -> int:
+        return self._state()['version'].current()
+
+    def bump(self) -> int:
+        """À appeler après chaque écriture validée (commit)"""
+        return self._state()['version'].bump()
+
+    def cached(self, view):
+        """Décorateur pour les vues GET dont le contenu ne dépend que des données"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            state = self._state()
+            version = state['version'].current()
+            key = (request.endpoint, request.full_path)
+            etag = f"{version}-{zlib.crc32(request.full_path.encode()):08x}"
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                entry = state['entries'].get(key)
+                if entry is not None and entry[0] == version:
+                    response = Response(entry[1], mimetype=entry[2])
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    state['entries'].put(key, (version, response.get_data(), response.mimetype))
+
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
@@ -0,0 +1,140 @@
+import math
+from collections import defaultdict
+from datetime import date
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.models.rollup import PORTFOLIO
+
+# Niveaux de la pyramide, du plus fin au plus grossier
+LEVELS = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def bucket_index(level: str, day: date) -> int:
+    """Numéro du seau de `level` contenant `day` (croissant avec le temps, consécutif)"""
+    if level == 'day':
+        return day.toordinal()
+    if level == 'week':
+        # Le 1er janvier de l'an 1 (ordinal 1) est un lundi : semaines ISO du lundi au dimanche
+        return (day.toordinal() - 1) // 7
+    if level == 'month':
+        return day.year * 12 + day.month - 1
+    if level == 'quarter':
+        return day.year * 4 + (day.month - 1) // 3
+    if level == 'year':
+        return day.year
+    raise ValueError(f"Niveau inconnu : {level}")
+
+
+def bucket_start(level: str, index: int) -> date:
+    """Premier jour du seau numéro `index`"""
+    if level == 'day':
+        return date.fromordinal(index)
+    if level == 'week':
+        return date.fromordinal(index * 7 + 1)
+    if level == 'month':
+        return date(index // 12, index % 12 + 1, 1)
+    if level == 'quarter':
+        return date(index // 4, index % 4 * 3 + 1, 1)
+    if level == 'year':
+        return date(index, 1, 1)
+    raise ValueError(f"Niveau inconnu : {level}")
+
+
+def bucket_stop(level: str, index: int) -> int:
+    """Ordinal du lendemain du dernier jour du seau numéro `index`.
+
+    Le seau qui contient date.max n'a pas de successeur représentable : son
+    lendemain est borné à date.max + 1 jour.
+    """
+    try:
+        return bucket_start(level, index + 1).toordinal()
+    except ValueError:
+        return date.max.toordinal() + 1
+
+
+def bucket_count(level: str, start: date, end: date) -> int:
+    """Nombre de seaux de `level` qui recouvrent [start, end]"""
+    return bucket_index(level, end) - bucket_index(level, start) + 1
+
+
+class RollupDelta:
+    """Variation des cumuls pour un ensemble de tâches ajoutées (+1) ou retirées (-1).
+
+    Chaque tâche compte pour tous les seaux qu'elle recouvre, à chaque niveau,
+    pour son projet et pour le portefeuille. Le calcul passe par des tableaux
+    de différences : O(tâches + jours couverts) par projet, quelle que soit la
+    durée des tâches, si bien qu'un recalcul complet et la mise à jour d'une
+    seule tâche utilisent le même code.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, List[Tuple[int, int, int, int]]] = defaultdict(list)
+        # Tâches dont l'ETP n'est pas un nombre fini, comptées avec un ETP nul
+        self.invalid_etp = 0
+
+    def add(self, project_id: int, start: date, end: date, etp: Optional[float], sign: int = 1) -> None:
+        if end < start:
+            return
+        etp_milli = (etp or 0) * 1000
+        if not math.isfinite(etp_milli):
+            # Même règle à l'ajout et au retrait de la tâche : les cumuls restent cohérents
+            self.invalid_etp += 1
+            etp_milli = 0
+        task = (start.toordinal(), end.toordinal(), round(etp_milli), sign)
+        self._tasks[project_id].append(task)
+        self._tasks[PORTFOLIO].append(task)
+
+    def __bool__(self) -> bool:
+        return bool(self._tasks)
+
+    def rows(self) -> Iterator[Tuple[str, int, date, int, int, int]]:
+        """(niveau, projet, début du seau, Δ tâches, Δ etp_milli, Δ etp_days_milli), variations nulles omises"""
+        for project_id, tasks in self._tasks.items():
+            yield from self._project_rows(project_id, tasks)
+
+    @staticmethod
+    def _project_rows(project_id: int, tasks: List[Tuple[int, int, int, int]]):
+        low = min(start for start, _, _, _ in tasks)
+        high = max(end for _, end, _, _ in tasks)
+
+        # Tâches actives et ETP par jour, puis charge cumulée (préfixe) pour les seaux plus larges
+        count_diff = [0] * (high - low + 2)
+        etp_diff = [0] * (high - low + 2)
+        for start, end, etp, sign in tasks:
+            count_diff[start - low] += sign
+            count_diff[end - low + 1] -= sign
+            etp_diff[start - low] += sign * etp
+            etp_diff[end - low + 1] -= sign * etp
+        day_counts = list(accumulate(count_diff))
+        day_etps = list(accumulate(etp_diff))
+        load = [0, *accumulate(day_etps)]
+
+        for offset, (count, etp) in enumerate(zip(day_counts[:-1], day_etps[:-1])):
+            if count or etp:
+                yield 'day', project_id, date.fromordinal(low + offset), count, etp, etp
+
+        for level in LEVELS[1:]:
+            first = bucket_index(level, date.fromordinal(low))
+            last = bucket_index(level, date.fromordinal(high))
+            count_diff = [0] * (last - first + 2)
+            etp_diff = [0] * (last - first + 2)
+            for start, end, etp, sign in tasks:
+                start_bucket = bucket_index(level, date.fromordinal(start)) - first
+                end_bucket = bucket_index(level, date.fromordinal(end)) - first
+                count_diff[start_bucket] += sign
+                count_diff[end_bucket + 1] -= sign
+                etp_diff[start_bucket] += sign * etp
+                etp_diff[end_bucket + 1] -= sign * etp
+
+            count = etp = 0
+            for offset in range(last - first + 1):
+                count += count_diff[offset]
+                etp += etp_diff[offset]
+                bucket = bucket_start(level, first + offset)
+                # Charge sur la partie du seau couverte par les jours calculés
+                load_start = max(bucket.toordinal(), low) - low
+                load_end = min(bucket_stop(level, first + offset), high + 1) - low
+                etp_days = load[load_end] - load[load_start]
+                if count or etp or etp_days:
+                    yield level, project_id, bucket, count, etp, etp_days
@@ -1,9 +1,15 @@
-from flask import Blueprint, render_template, jsonify, request, redirect, url_for
-from app.services import ProjectService, EtpService
+from flask import Blueprint, Response, current_app, render_template, jsonify, request, redirect, url_for, stream_with_context
+from app.services import (ProjectService, EtpService, ImportService, ExportService, BatchService,
+                          CapacityService, SearchService, ScenarioService, HistoryService, RollupService)
 from app.models import Project, Task
 from app.constants import TimeConstants
+from app.timeline_layout import TimelineLayout
+from app.periods import PeriodCalendar
+from app.serializers import TimelineSerializer
+from app.exceptions import ConflictError
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
-from app import db
+from app import db, response_cache, fragment_cache, change_feed
 
 bp = Blueprint('project', __name__, url_prefix='/project')
 
@@ -14,34 +20,427 @@ def make_response(data=None, error=None, status=200):
         return jsonify({'error': str(error)}), status
     return jsonify({'status': 'success', 'data': data}), status
 
+def make_conflict(error, current=None):
+    """Réponse 409 d'une écriture concurrente, avec l'état actuel des lignes"""
+    return jsonify({'error': str(error), 'current': current if current is not None else error.current}), 409
+
+def expected_version(data):
+    """Version attendue par le client (champ "version" du corps), None si absente"""
+    if data.get('version') is None:
+        return None
+    try:
+        return int(data['version'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Version invalide : {data['version']!r}")
+
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+@bp.after_request
+def bump_data_version(response):
+    """Toute écriture réussie invalide les ETags et le cache des réponses"""
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        response_cache.bump()
+    return response
+
+def parse_timeline_window():
+    """Lit la fenêtre visible et la pagination de la timeline (start, end, after, limit)"""
+    layout = TimelineLayout.current()
+    start = request.args.get('start')
+    end = request.args.get('end')
+    window_start = datetime.strptime(start, '%Y-%m-%d').date() if start else layout.horizon_start
+    window_end = datetime.strptime(end, '%Y-%m-%d').date() if end else layout.horizon_end
+    if window_end < window_start:
+        raise ValueError('La fin de la fenêtre précède son début')
+    
+    after_id = request.args.get('after', type=int)
+    limit = request.args.get('limit', current_app.config['TIMELINE_PAGE_SIZE'], type=int)
+    if limit < 1:
+        raise ValueError('La limite doit être positive')
+    limit = min(limit, current_app.config['TIMELINE_MAX_PAGE_SIZE'])
+    return window_start, window_end, after_id, limit
+
+def parse_scenario():
+    """Écarts du scénario demandé (?scenario=<id>), None pour le réel"""
+    scenario_id = request.args.get('scenario', type=int)
+    return ScenarioService.load_overlay(scenario_id) if scenario_id is not None else None
+
+def parse_history():
+    """État reconstitué à la date demandée (?as_of=), None pour l'état actuel"""
+    as_of = request.args.get('as_of')
+    if not as_of:
+        return None
+    if request.args.get('scenario'):
+        raise ValueError('as_of et scenario ne peuvent pas être combinés')
+    return HistoryService.state_at(HistoryService.parse_as_of(as_of))
+
+def build_timeline_page():
+    """Construit une page de timeline : projets sérialisés et curseur suivant"""
+    window_start, window_end, after_id, limit = parse_timeline_window()
+    history = parse_history()
+    if history is not None:
+        projects, next_cursor = history.timeline_page(window_start, window_end, after_id, limit)
+    else:
+        projects, next_cursor = TimelineSerializer().timeline_page(window_start, window_end, after_id, limit,
+                                                                   overlay=parse_scenario())
+    return {
+        'projects': projects,
+        'window': {'start': window_start.isoformat(), 'end': window_end.isoformat()},
+        'next_cursor': next_cursor
+    }
+
 # Routes de pages (Views)
 @bp.route('/timeline')
+@response_cache.cached
 def timeline():
-    """Page de la timeline des projets"""
-    projects = ProjectService.get_all_projects()
+    """Page de la timeline des projets (fenêtre de dates, pagination et date passée ?as_of= optionnelles)"""
+    try:
+        window_start, window_end, after_id, limit = parse_timeline_window()
+        history = parse_history()
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    if history is not None:
+        fingerprints, next_cursor = history.timeline_page_fingerprints(window_start, window_end, after_id, limit)
+    else:
+        fingerprints, next_cursor = ProjectService.get_timeline_page_fingerprints(window_start, window_end,
+                                                                                  after_id, limit)
+
+    def load_projects(ids):
+        if history is not None:
+            return history.timeline_projects(ids, window_start, window_end)
+        return TimelineSerializer().timeline_projects(ids, window_start, window_end)
+    next_url = None
+    if next_cursor is not None:
+        next_url = url_for('project.timeline', **{**request.args.to_dict(), 'after': next_cursor})
+    # Lignes et en-tête issus du cache de fragments : seuls les projets modifiés sont rendus
     return render_template('project/timeline.html',
-                         projects=[p.to_dict() for p in projects],
-                         periods=TimeConstants.PERIODS_DISPLAY,
+                         rows=fragment_cache.timeline_rows(fingerprints, load_projects),
+                         timeline_header=fragment_cache.timeline_header(),
+                         next_url=next_url,
+                         as_of=request.args.get('as_of'),
                          milestones=TimeConstants.MILESTONES)
 
+@bp.route('/timeline/export.<export_format>')
+def export_timeline(export_format):
+    """Timeline rendue côté serveur (svg, png ou pdf) pour les rapports.
+
+    Accepte les paramètres de la page (start, end, after, limit, as_of,
+    scenario). Le rendu est mis en cache sur disque et l'ETag est l'empreinte
+    du contenu : un même lien ouvert par de nombreux destinataires ne coûte
+    qu'un rendu.
+    """
+    if export_format not in ExportService.RENDER_FORMATS:
+        return make_response(error=f"Format inconnu : {export_format}", status=404)
+    try:
+        window_start, window_end, after_id, limit = parse_timeline_window()
+        history = parse_history()
+        overlay = parse_scenario()
+    except ValueError as e:
+        return make_response(error=e, status=400)
+
+    title = 'Project Timeline'
+    if history is not None:
+        title += f" — état au {request.args['as_of']}"
+    if overlay is not None:
+        title += f" — scénario {ScenarioService.get_scenario_by_id(overlay.scenario_id).name}"
+
+    if overlay is not None:
+        # Un scénario n'a pas de versions par tâche : la clé vient du contenu dessiné
+        projects, _ = TimelineSerializer().timeline_page(window_start, window_end, after_id, limit, overlay=overlay)
+        content = ExportService.timeline_drawn_content(projects)
+    else:
+        # Les versions des lignes affichées suffisent : rien n'est sérialisé si le rendu est en cache
+        if history is not None:
+            fingerprints, _ = history.timeline_page_fingerprints(window_start, window_end, after_id, limit)
+        else:
+            fingerprints, _ = ProjectService.get_timeline_page_fingerprints(window_start, window_end, after_id, limit)
+        content = ExportService.timeline_fingerprint_content(fingerprints)
+        projects = None
+
+    def load_projects():
+        if projects is not None:
+            return projects
+        ids = [fingerprint[0] for fingerprint in fingerprints]
+        if history is not None:
+            return history.timeline_projects(ids, window_start, window_end)
+        return TimelineSerializer().timeline_projects(ids, window_start, window_end)
+    key = ExportService.timeline_render_key(export_format, title, content)
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+    else:
+        try:
+            data = ExportService.render_timeline(load_projects, export_format, title, key)
+        except RuntimeError as e:
+            return make_response(error=e, status=501)
+        except ValueError as e:
+            return make_response(error=e, status=400)
+        response = Response(data, mimetype=ExportService.RENDER_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f'inline; filename=timeline.{export_format}'
+    response.set_etag(key)
+    response.cache_control.no_cache = True
+    return response
+
 @bp.route('/etp')
 def etp_redirect():
     """Redirection vers la table ETP"""
     return redirect(url_for('project.etp_table'))
 
 @bp.route('/etp_table')
+@response_cache.cached
 def etp_table():
-    """Page de la table ETP"""
-    projects = ProjectService.get_all_projects()
-    etp_data, period_totals = EtpService.calculate_etp_per_period(projects)
+    """Page de la table ETP (?as_of= : table à une date passée)"""
+    try:
+        history = parse_history()
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    if history is not None:
+        etp_data, period_totals = history.etp_table()
+        versions = history.stored_etp_versions()
+    else:
+        etp_data, period_totals = EtpService.get_etp_table()
+        versions = EtpService.get_stored_etp_versions()
+    for row in etp_data:
+        row['versions'] = versions.get(row['id'], {})
     total_max_etp = sum(row["total"] for row in etp_data)
     return render_template('project/etp_table.html',
+                         periods=PeriodCalendar.current().names,
                          etp_data=etp_data,
                          period_totals=period_totals,
-                         total_max_etp=total_max_etp)
+                         total_max_etp=total_max_etp,
+                         as_of=request.args.get('as_of'))
+
+@bp.route('/api/timeline', methods=['GET'])
+@response_cache.cached
+def get_timeline():
+    """Timeline en JSON, limitée à la fenêtre visible et paginée par curseur.
+
+    ?scenario=<id> : vue d'un scénario ; ?as_of= : timeline à une date passée.
+    """
+    try:
+        return make_response(data=build_timeline_page())
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
 
 # API Routes - Projects
+@bp.route('/api/etp', methods=['GET'])
+@response_cache.cached
+def get_etp_grid():
+    """Grille ETP complète : valeurs saisies et valeurs retenues par projet et période.
+
+    Avec ?scenario=<id>, grille du scénario (sans versions : ses cellules ne
+    s'écrivent que par ses opérations) ; avec ?as_of=, grille à une date passée.
+    """
+    try:
+        history = parse_history()
+        overlay = parse_scenario() if history is None else None
+        if history is not None:
+            etp_data, period_totals = history.etp_table()
+            stored = history.stored_etp_grid()
+            versions = history.stored_etp_versions()
+        else:
+            etp_data, period_totals = EtpService.get_etp_table(overlay)
+            stored = EtpService.get_stored_etp_grid()
+            versions = EtpService.get_stored_etp_versions() if overlay is None else {}
+        for row in etp_data:
+            row['stored'] = stored.get(row['id'], {})
+            if overlay is not None:
+                row['stored'] = overlay.stored_etps(row['id'], row['stored'])
+            row['versions'] = versions.get(row['id'], {})
+        return make_response(data={
+            'periods': PeriodCalendar.current().names,
+            'projects': etp_data,
+            'period_totals': period_totals
+        })
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/etp', methods=['PUT'])
+def update_etp_grid():
+    """Écrit plusieurs cellules de la grille ETP en une requête.
+
+    Corps : {"entries": [{"project_id", "period", "etp", "version"?}, ...]} ;
+    etp à null supprime la saisie de la cellule. Avec "version" (0 pour une
+    cellule non saisie), l'écriture est refusée en 409 si la cellule a changé.
+    """
+    try:
+        data = request.json
+        entries = data.get('entries') if isinstance(data, dict) else data
+        if not isinstance(entries, list) or not entries:
+            raise ValueError("Une liste d'entrées non vide est attendue")
+        try:
+            cells = [(int(entry['project_id']), entry['period'], entry.get('etp')) for entry in entries]
+            expected = {
+                (int(entry['project_id']), entry['period']): int(entry['version'])
+                for entry in entries if entry.get('version') is not None
+            }
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError("Chaque entrée doit avoir project_id, period et etp")
+        return make_response(data=EtpService.save_etp_entries(cells, expected))
+    except ConflictError as e:
+        return make_conflict(e)
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/capacity', methods=['GET'])
+@response_cache.cached
+def get_capacity():
+    """Charge ETP réelle (jour ou semaine) et sur-allocations, portefeuille et projets.
+
+    Paramètres : start, end (AAAA-MM-JJ), granularity (day|week), project_id,
+    capacity (capacité uniforme par projet), curves=1 (courbes par projet).
+    Au-delà de CAPACITY_MAX_BUCKETS points de courbe, la fenêtre est refusée (400).
+    """
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        result = CapacityService.analyze(
+            start=datetime.strptime(start, '%Y-%m-%d').date() if start else None,
+            end=datetime.strptime(end, '%Y-%m-%d').date() if end else None,
+            granularity=request.args.get('granularity', 'week'),
+            project_id=request.args.get('project_id', type=int),
+            capacity=request.args.get('capacity', type=float),
+            include_curves=request.args.get('curves', '').lower() in ('1', 'true', 'yes'),
+            max_buckets=current_app.config['CAPACITY_MAX_BUCKETS']
+        )
+        return make_response(data=result)
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/rollups', methods=['GET'])
+@response_cache.cached
+def get_rollups():
+    """Nombre de tâches et ETP par seau de temps, du jour à l'année.
+
+    Paramètres : start, end (AAAA-MM-JJ), level (auto|day|week|month|quarter|year),
+    buckets (nombre de seaux visé en auto, ROLLUP_BUCKETS par défaut),
+    project_id, by_project=1 (séries par projet en plus du portefeuille).
+    """
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        return make_response(data=RollupService.zoom(
+            start=datetime.strptime(start, '%Y-%m-%d').date() if start else None,
+            end=datetime.strptime(end, '%Y-%m-%d').date() if end else None,
+            level=request.args.get('level', 'auto'),
+            buckets=request.args.get('buckets', current_app.config['ROLLUP_BUCKETS'], type=int),
+            max_buckets=current_app.config['ROLLUP_MAX_BUCKETS'],
+            project_id=request.args.get('project_id', type=int),
+            by_project=request.args.get('by_project', '').lower() in ('1', 'true', 'yes')
+        ))
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/search', methods=['GET'])
+@response_cache.cached
+def search_tasks():
+    """Recherche plein texte des tâches (libellé et commentaire).
+
+    Paramètres : q (mots recherchés comme préfixes), limit (20 par défaut),
+    project_id. `ranked` indique un classement par pertinence plutôt que par
+    récence (requête trop vague).
+    """
+    try:
+        return make_response(data=SearchService.search(
+            request.args.get('q', ''),
+            limit=request.args.get('limit', 20, type=int),
+            project_id=request.args.get('project_id', type=int)
+        ))
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+# API Routes - Scénarios
+@bp.route('/api/scenarios', methods=['GET'])
+@response_cache.cached
+def get_scenarios():
+    """Liste les scénarios et leur nombre d'écarts"""
+    try:
+        return make_response(data={'scenarios': ScenarioService.list_scenarios()})
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/scenarios', methods=['POST'])
+def create_scenario():
+    """Crée un scénario vide (aucune donnée copiée)"""
+    try:
+        data = request.json
+        name = data.get('name')
+        if not name:
+            return make_response(error='Le nom du scénario est requis', status=400)
+        scenario = ScenarioService.create_scenario(name, data.get('description'))
+        return make_response(data={'scenario': ScenarioService.to_dict(scenario, tasks=0, etp_entries=0)}, status=201)
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/scenarios/compare', methods=['GET'])
+@response_cache.cached
+def compare_scenarios():
+    """Totaux ETP du réel et des scénarios demandés (?ids=1,2,3), côte à côte"""
+    try:
+        try:
+            scenario_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            raise ValueError('ids doit être une liste d\'identifiants séparés par des virgules')
+        if not scenario_ids:
+            raise ValueError('Au moins un scénario est attendu')
+        return make_response(data=ScenarioService.compare(scenario_ids))
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/scenarios/<int:scenario_id>', methods=['GET'])
+@response_cache.cached
+def get_scenario(scenario_id):
+    """Détail d'un scénario : écarts, projets touchés, tâches modifiées dans le réel depuis"""
+    try:
+        scenario = ScenarioService.get_scenario_by_id(scenario_id)
+        if not scenario:
+            return make_response(error='Scénario non trouvé', status=404)
+        return make_response(data={'scenario': ScenarioService.describe(scenario)})
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/scenarios/<int:scenario_id>', methods=['DELETE'])
+def delete_scenario(scenario_id):
+    """Supprime un scénario et ses écarts (le réel n'est pas touché)"""
+    try:
+        success = ScenarioService.delete_scenario(scenario_id)
+        if not success:
+            return make_response(error='Scénario non trouvé', status=404)
+        return make_response()
+    except Exception as e:
+        db.session.rollback()
+        return make_response(error=e, status=500)
+
+@bp.route('/api/scenarios/<int:scenario_id>/operations', methods=['POST'])
+def apply_scenario_operations(scenario_id):
+    """Applique des opérations (décalage, déplacement, ETP, cellules...) au scénario"""
+    try:
+        if not ScenarioService.get_scenario_by_id(scenario_id):
+            return make_response(error='Scénario non trouvé', status=404)
+        data = request.json
+        result = ScenarioService.apply(scenario_id, data.get('operations') if isinstance(data, dict) else data)
+        return make_response(data=result)
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
 @bp.route('/api/projects', methods=['GET'])
+@response_cache.cached
 def get_projects():
     """Liste tous les projets"""
     try:
@@ -73,32 +472,39 @@ def create_project():
 
 @bp.route('/api/projects/<int:project_id>', methods=['PUT'])
 def update_project(project_id):
-    """Met à jour un projet existant"""
+    """Met à jour un projet existant (409 si "version" ne correspond plus)"""
     try:
         data = request.json
         project = Project.query.get(project_id)
         
         if not project:
             return make_response(error='Projet non trouvé', status=404)
+        version = expected_version(data)
+        if version is not None and version != project.version:
+            return make_conflict('Projet modifié entre-temps', TimelineSerializer().project(project))
             
         # Mise à jour uniquement des champs fournis
         if 'name' in data:
             project.name = data['name']
+        db.session.flush()
         if 'colorScheme' in data:
-            project.color_scheme = data['colorScheme']
-            
-            # Mise à jour des couleurs des tâches
-            for task in project.tasks:
-                # Extraire l'intensité de la couleur actuelle
-                intensity = task.color.split('-')[1]
-                # Appliquer la nouvelle couleur avec la même intensité
-                task.color = f"{data['colorScheme']}-{intensity}"
+            # Un seul UPDATE pour toutes les tâches, en conservant leur intensité
+            ProjectService.recolor_project(project.id, data['colorScheme'], expected_version=project.version)
+        if 'name' in data:
+            change_feed.record('project.updated', id=project.id, name=project.name)
         
         db.session.commit()
         
-        return make_response(data={
-            'project': project.to_dict()
-        })
+        return make_response(data={'project': TimelineSerializer().project(project)})
+    except StaleDataError:
+        db.session.rollback()
+        project = Project.query.get(project_id)
+        if project is None:
+            return make_response(error='Projet non trouvé', status=404)
+        return make_conflict('Projet modifié entre-temps', TimelineSerializer().project(project))
+    except ValueError as e:
+        db.session.rollback()
+        return make_response(error=e, status=400)
     except Exception as e:
         db.session.rollback()
         return make_response(error=str(e), status=500)
@@ -133,27 +539,73 @@ def create_task():
             start_date=datetime.strptime(data['start_date'], '%Y-%m-%d').date(),
             end_date=datetime.strptime(data['end_date'], '%Y-%m-%d').date(),
             color=None,  # La couleur sera déterminée par le service
-            etp=float(data.get('etp', 1.0)),
+            etp=data.get('etp', 1.0),
             comment=data.get('comment')
         )
         
         if not task:
             return make_response(error="La tâche n'a pas été créée correctement", status=500)
             
-        return make_response(data={'task': task.to_dict()}, status=201)
+        return make_response(data={'task': TimelineSerializer().task(task)}, status=201)
         
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/tasks/bulk', methods=['POST'])
+def bulk_import_tasks():
+    """Crée ou met à jour des tâches en masse (JSON ou CSV).
+
+    Une ligne avec un id ne remplace que les champs fournis : comment, etp et
+    color absents sont conservés (voir ImportService.import_tasks).
+    """
+    try:
+        if request.mimetype == 'text/csv':
+            rows = ImportService.parse_csv(request.get_data(as_text=True))
+        else:
+            data = request.json
+            rows = data.get('tasks') if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                return make_response(error='Une liste de tâches est attendue', status=400)
+        
+        dry_run = request.args.get('dry_run', 'false').lower() in ('1', 'true', 'yes')
+        report = ImportService.import_tasks(rows, dry_run=dry_run)
+        
+        if report['errors'] and not (report['created'] or report['updated']):
+            return jsonify({'error': 'Aucune tâche valide', 'data': report}), 400
+        return make_response(data=report)
+    except Exception as e:
+        return make_response(error=e, status=500)
+
+@bp.route('/api/tasks/batch', methods=['POST'])
+def batch_update_tasks():
+    """Applique plusieurs modifications (décalage, déplacement, couleur, ETP) en une transaction"""
+    try:
+        data = request.json
+        result = BatchService.apply(data.get('operations') if isinstance(data, dict) else data)
+        return make_response(data=result)
+    except ConflictError as e:
+        return make_conflict(e)
+    except ValueError as e:
+        return make_response(error=e, status=400)
     except Exception as e:
         return make_response(error=e, status=500)
 
 @bp.route('/api/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
-    """Met à jour une tâche existante"""
+    """Met à jour une tâche existante (409 si "version" ne correspond plus)"""
     try:
         data = request.json
         task = Task.query.get(task_id)
         
         if not task:
             return make_response(error='Tâche non trouvée', status=404)
+        version = expected_version(data)
+        if version is not None and version != task.version:
+            return make_conflict('Tâche modifiée entre-temps', TimelineSerializer().task(task))
+        
+        previous_project_id = task.project_id
         
         # Mise à jour du projet si nécessaire
         if 'project_id' in data:
@@ -164,25 +616,55 @@ def update_task(task_id):
             # Si le projet a changé, mettre à jour la couleur de la tâche
             if task.project_id != new_project.id:
                 # Conserver l'intensité de la couleur actuelle
-                intensity = task.color.split('-')[1]
-                task.color = f"{new_project.color_scheme}-{intensity}"
+                task.color = ProjectService.recolored(task.color, new_project.color_scheme)
                 task.project_id = new_project.id
             
         # Mise à jour des autres champs
-        task.text = data.get('text', task.text)
-        task.comment = data.get('comment', task.comment)
+        fields = ProjectService.check_task_fields({field: data[field] for field in ('text', 'comment', 'etp')
+                                                   if field in data})
+        task.text = fields.get('text', task.text)
+        task.comment = fields.get('comment', task.comment)
         task.start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
         task.end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        task.etp = float(data.get('etp', task.etp))
+        ProjectService.check_task_dates(task.start_date, task.end_date)
+        task.etp = fields.get('etp', task.etp)
+        
+        # Mise à jour des agrégats ETP des projets concernés uniquement
+        db.session.flush()
+        for project_id in {previous_project_id, task.project_id}:
+            EtpService.refresh_project_aggregate(project_id)
+        change_feed.record('task.updated', id=task.id, project_id=task.project_id,
+                           previous_project_id=previous_project_id)
         
         db.session.commit()
         
-        return make_response(data={'task': task.to_dict()})
+        return make_response(data={'task': TimelineSerializer().task(task)})
         
+    except StaleDataError:
+        db.session.rollback()
+        task = Task.query.get(task_id)
+        if task is None:
+            return make_response(error='Tâche non trouvée', status=404)
+        return make_conflict('Tâche modifiée entre-temps', TimelineSerializer().task(task))
+    except ValueError as e:
+        db.session.rollback()
+        return make_response(error=e, status=400)
     except Exception as e:
         db.session.rollback()
         return make_response(error=str(e), status=500)
 
+@bp.route('/api/tasks/<int:task_id>/history', methods=['GET'])
+@response_cache.cached
+def get_task_history(task_id):
+    """Versions successives d'une tâche (création, modifications, suppression)"""
+    try:
+        history = HistoryService.task_history(task_id)
+        if not history:
+            return make_response(error='Tâche non trouvée', status=404)
+        return make_response(data={'history': history})
+    except Exception as e:
+        return make_response(error=e, status=500)
+
 @bp.route('/api/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
     """Supprime une tâche"""
@@ -192,4 +674,50 @@ def delete_task(task_id):
             return make_response(error='Tâche non trouvée', status=404)
         return make_response()
     except Exception as e:
-        return make_response(error=e, status=500)
\ No newline at end of file
+        return make_response(error=e, status=500)
+
+# API Routes - Export
+@bp.route('/api/export/<dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """Exporte projets, tâches ou entrées ETP en flux NDJSON ou CSV"""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        project_id = request.args.get('project_id', type=int)
+        start = request.args.get('start')
+        end = request.args.get('end')
+        filters = {'project_id': project_id}
+        if dataset == 'tasks':
+            filters['start'] = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+            filters['end'] = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        
+        chunks = ExportService.stream(dataset, export_format, **filters)
+    except ValueError as e:
+        return make_response(error=e, status=400)
+    
+    response = Response(stream_with_context(chunks), mimetype=ExportService.FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={dataset}.{export_format}'
+    return response
+
+@bp.route('/api/changes', methods=['GET'])
+def stream_changes():
+    """Flux Server-Sent Events des modifications validées.
+
+    Un client qui se reconnecte envoie Last-Event-ID (ou ?last_event_id=) et
+    reçoit les événements manqués ; s'ils ne sont plus dans le journal, un
+    événement `reset` lui indique de recharger ses données. 503 si le flux
+    est désactivé (plusieurs workers sans journal partagé).
+    """
+    if not change_feed.available():
+        return make_response(error='Flux des modifications indisponible (CHANGE_FEED_REDIS_URL requis '
+                                   'avec plusieurs workers)', status=503)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return make_response(error='Last-Event-ID invalide', status=400)
+    
+    response = Response(stream_with_context(change_feed.stream(last_event_id)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Désactive la mise en tampon des proxys (nginx)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
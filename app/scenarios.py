@@ -0,0 +1,107 @@
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import select
+from app import db
+from app.models import ScenarioTask, ScenarioEtpEntry, Task
+
+# Champs d'une tâche qu'un scénario peut remplacer
+TASK_FIELDS = ('project_id', 'start_date', 'end_date', 'color', 'etp')
+
+
+@lru_cache(maxsize=None)
+def _row_type(fields: Tuple[str, ...]):
+    """Type de ligne (namedtuple) aux mêmes champs que les lignes réelles, et positions des champs remplaçables"""
+    return namedtuple('ScenarioRow', fields), [(fields.index(field), field) for field in TASK_FIELDS if field in fields]
+
+
+class ScenarioOverlay:
+    """Écarts d'un scénario, chargés une fois et appliqués aux lignes du réel.
+
+    Les lectures restent celles du portefeuille réel (agrégats ETP, requêtes
+    par fenêtre de la timeline) : seules les tâches et cellules modifiées sont
+    remplacées, et seuls les projets qu'elles touchent (`project_ids`) ont leur
+    ETP recalculé. Évaluer un scénario coûte donc la lecture du réel plus
+    O(écarts), sans rien copier.
+
+    `tasks` associe chaque tâche modifiée à son écart (colonnes de
+    ScenarioTask), `base_projects` à son projet réel et `etp_entries` chaque
+    cellule (projet, période) saisie à sa valeur (None : valeur calculée).
+    Les écarts sur des tâches supprimées depuis sont ignorés.
+    """
+
+    def __init__(self, scenario_id: int, tasks: Dict[int, Tuple], base_projects: Dict[int, int],
+                 stale_task_ids: Set[int], etp_entries: Dict[Tuple[int, str], Optional[float]]):
+        self.scenario_id = scenario_id
+        self.tasks = tasks
+        self.base_projects = base_projects
+        self.stale_task_ids = stale_task_ids
+        self.etp_entries = etp_entries
+        self._etp_by_project = defaultdict(dict)
+        for (project_id, period), value in etp_entries.items():
+            self._etp_by_project[project_id][period] = value
+        self.project_ids = set(base_projects.values()) | {project_id for project_id, _ in etp_entries}
+        self.project_ids |= {change.project_id for change in tasks.values() if change.project_id is not None}
+
+    @classmethod
+    def load(cls, scenario_id: int) -> 'ScenarioOverlay':
+        """Charge les écarts d'un scénario en deux requêtes"""
+        tasks, base_projects, stale = {}, {}, set()
+        rows = db.session.execute(
+            select(*ScenarioTask.__table__.c, Task.project_id.label('base_project_id'),
+                   Task.version.label('current_version'))
+            .join(Task, Task.id == ScenarioTask.task_id)
+            .where(ScenarioTask.scenario_id == scenario_id)
+        )
+        for row in rows:
+            tasks[row.task_id] = row
+            base_projects[row.task_id] = row.base_project_id
+            if row.current_version != row.base_version:
+                stale.add(row.task_id)
+
+        etp_entries = {
+            (project_id, period): etp_value
+            for project_id, period, etp_value in db.session.query(
+                ScenarioEtpEntry.project_id, ScenarioEtpEntry.period, ScenarioEtpEntry.etp_value
+            ).filter(ScenarioEtpEntry.scenario_id == scenario_id)
+        }
+        return cls(scenario_id, tasks, base_projects, stale, etp_entries)
+
+    def effective_project(self, task_id: int) -> Optional[int]:
+        """Projet d'une tâche modifiée dans le scénario (None si elle en est retirée)"""
+        change = self.tasks[task_id]
+        if change.removed:
+            return None
+        return change.project_id if change.project_id is not None else self.base_projects[task_id]
+
+    def apply(self, row):
+        """Ligne telle que vue dans le scénario (mêmes champs), None si la tâche en est retirée"""
+        change = self.tasks.get(row.id)
+        if change is None:
+            return row
+        if change.removed:
+            return None
+        row_type, positions = _row_type(row._fields)
+        values = list(row)
+        for index, field in positions:
+            value = getattr(change, field)
+            if value is not None:
+                values[index] = value
+        return row_type(*values)
+
+    def apply_rows(self, rows: Iterable):
+        """Applique les écarts à des lignes de tâches (qui doivent porter `id`)"""
+        for row in rows:
+            row = self.apply(row)
+            if row is not None:
+                yield row
+
+    def stored_etps(self, project_id: int, stored: Dict[str, float]) -> Dict[str, float]:
+        """Valeurs ETP saisies d'un projet dans le scénario, {période: valeur}"""
+        stored = dict(stored)
+        for period, value in self._etp_by_project.get(project_id, {}).items():
+            if value is None:
+                stored.pop(period, None)
+            else:
+                stored[period] = value
+        return stored
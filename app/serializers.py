@@ -0,0 +1,152 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from app import db
+from app.models import Project, Task
+from app.scenarios import ScenarioOverlay
+from app.timeline_layout import TimelineLayout
+
+
+class TimelineSerializer:
+    """Sérialisation des projets et tâches sans passer par les objets ORM.
+
+    Les requêtes ne sélectionnent que les colonnes nécessaires et renvoient
+    des tuples (pas d'identity map ni d'instrumentation d'attributs). Les
+    positions sont calculées par lot avec TimelineLayout et chaque date n'est
+    formatée qu'une fois par instance, quel que soit le nombre de tâches qui la
+    partagent. Le format produit est celui de Task.to_dict / Project.to_dict.
+    """
+
+    TASK_COLUMNS = (Task.id, Task.project_id, Task.text, Task.comment,
+                    Task.start_date, Task.end_date, Task.color, Task.etp, Task.version)
+    PROJECT_COLUMNS = (Project.id, Project.name, Project.color_scheme, Project.version)
+
+    def __init__(self, layout: Optional[TimelineLayout] = None):
+        self.layout = layout or TimelineLayout.current()
+        self._dates: Dict[date, Tuple[str, str]] = {}
+
+    def _format_date(self, value: date) -> Tuple[str, str]:
+        """(affichage JJ/MM/AAAA, ISO) de la date, mis en mémoire"""
+        formatted = self._dates.get(value)
+        if formatted is None:
+            formatted = self._dates[value] = (value.strftime('%d/%m/%Y'), value.isoformat())
+        return formatted
+
+    def tasks(self, rows: Sequence[Tuple]) -> List[Dict]:
+        """Sérialise des lignes (colonnes TASK_COLUMNS) en dictionnaires de tâche"""
+        positions = self.layout.compute([row[4] for row in rows], [row[5] for row in rows])
+        format_date = self._format_date
+        result = []
+        append = result.append
+        for (task_id, project_id, text, comment, start_date, end_date, color, etp, version), (start, width) \
+                in zip(rows, positions):
+            start_display, start_iso = format_date(start_date)
+            end_display, end_iso = format_date(end_date)
+            append({
+                'id': task_id,
+                'project_id': project_id,
+                'text': text,
+                'comment': comment or '',
+                'start_date': start_display,
+                'end_date': end_display,
+                'dates': f"{start_display} - {end_display}",
+                'raw_start_date': start_iso,
+                'raw_end_date': end_iso,
+                'color': color,
+                'etp': etp,
+                'version': version,
+                'start': start,
+                'width': width
+            })
+        return result
+
+    def task(self, task: Task) -> Dict:
+        """Sérialise une tâche déjà chargée (réponse d'une écriture)"""
+        return self.tasks([tuple(getattr(task, column.key) for column in self.TASK_COLUMNS)])[0]
+
+    def projects(self, project_rows: Iterable[Tuple], task_rows: Iterable[Tuple]) -> List[Dict]:
+        """Assemble les projets (colonnes PROJECT_COLUMNS) et leurs tâches, dans l'ordre des projets"""
+        tasks_by_project = defaultdict(list)
+        for task in self.tasks(list(task_rows)):
+            tasks_by_project[task['project_id']].append(task)
+        return [
+            {'id': project_id, 'name': name, 'color_scheme': color_scheme, 'version': version,
+             'tasks': tasks_by_project.get(project_id, [])}
+            for project_id, name, color_scheme, version in project_rows
+        ]
+
+    def project(self, project: Project) -> Dict:
+        """Sérialise un projet déjà chargé, avec toutes ses tâches"""
+        task_rows = db.session.execute(
+            select(*self.TASK_COLUMNS).where(Task.project_id == project.id)
+            .order_by(Task.start_date, Task.id)
+        ).all()
+        return self.projects([(project.id, project.name, project.color_scheme, project.version)], task_rows)[0]
+
+    @staticmethod
+    def _visible_task_rows(project_ids: Sequence[int], window_start: date, window_end: date,
+                           overlay: Optional[ScenarioOverlay] = None):
+        statement = select(*TimelineSerializer.TASK_COLUMNS).where(
+            Task.project_id.in_(project_ids),
+            Task.end_date >= window_start,
+            Task.start_date <= window_end
+        ).order_by(Task.project_id, Task.start_date, Task.id)
+        rows = db.session.execute(statement).all()
+        if overlay is None or not overlay.tasks:
+            return rows
+
+        # Les tâches modifiées par le scénario sont relues par id : leur projet
+        # ou leurs dates effectifs peuvent les faire entrer dans la page
+        page = set(project_ids)
+        changed = [task_id for task_id in overlay.tasks if overlay.effective_project(task_id) in page]
+        changed_rows = []
+        for i in range(0, len(changed), 500):
+            statement = select(*TimelineSerializer.TASK_COLUMNS).where(Task.id.in_(changed[i:i + 500]))
+            changed_rows.extend(row for row in overlay.apply_rows(db.session.execute(statement))
+                                if row.end_date >= window_start and row.start_date <= window_end)
+
+        # projects() regroupe par projet : seuls les projets qui reçoivent une
+        # tâche modifiée sont retriés (accès par position, plus rapide sur Row)
+        affected = {row.project_id for row in changed_rows}
+        kept, resorted = [], changed_rows
+        for row in rows:
+            if row[0] not in overlay.tasks:
+                (resorted if row[1] in affected else kept).append(row)
+        resorted.sort(key=lambda row: (row.project_id, row.start_date, row.id))
+        return kept + resorted
+
+    def timeline_projects(self, project_ids: Sequence[int], window_start: date, window_end: date) -> List[Dict]:
+        """Projets demandés avec leurs seules tâches visibles, dans l'ordre des ids"""
+        if not project_ids:
+            return []
+        project_rows = db.session.execute(
+            select(*self.PROJECT_COLUMNS).where(Project.id.in_(project_ids))
+        ).all()
+        by_id = {row.id: row for row in project_rows}
+        ordered = [by_id[project_id] for project_id in project_ids if project_id in by_id]
+        return self.projects(ordered, self._visible_task_rows(project_ids, window_start, window_end))
+
+    def timeline_page(
+        self,
+        window_start: date,
+        window_end: date,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+        overlay: Optional[ScenarioOverlay] = None
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """Page de timeline (mêmes règles que ProjectService.get_timeline_page_fingerprints) en deux requêtes.
+
+        Avec `overlay`, les tâches sont celles du scénario (une requête de plus
+        si des tâches modifiées tombent dans la page).
+        """
+        statement = select(*self.PROJECT_COLUMNS).order_by(Project.id)
+        if after_id is not None:
+            statement = statement.where(Project.id > after_id)
+        project_rows = db.session.execute(statement.limit(limit + 1)).all()
+        next_cursor = project_rows[limit - 1].id if len(project_rows) > limit else None
+        project_rows = project_rows[:limit]
+
+        task_rows = self._visible_task_rows([row.id for row in project_rows], window_start, window_end, overlay) \
+            if project_rows else []
+        return self.projects(project_rows, task_rows), next_cursor
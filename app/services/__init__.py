@@ -1,4 +1,13 @@
 from .project_service import ProjectService
 from .etp_service import EtpService
+from .import_service import ImportService
+from .export_service import ExportService
+from .batch_service import BatchService
+from .capacity_service import CapacityService
+from .search_service import SearchService
+from .scenario_service import ScenarioService
+from .history_service import HistoryService
+from .rollup_service import RollupService
 
-__all__ = ['ProjectService', 'EtpService']
\ No newline at end of file
+__all__ = ['ProjectService', 'EtpService', 'ImportService', 'ExportService', 'BatchService', 'CapacityService', 'SearchService',
+           'ScenarioService', 'HistoryService', 'RollupService']
\ No newline at end of file
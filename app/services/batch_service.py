@@ -0,0 +1,251 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Set
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from app import db, change_feed
+from app.exceptions import ConflictError
+from app.models import Project, Task
+from app.serializers import TimelineSerializer
+from app.services.etp_service import EtpService
+from app.services.project_service import ProjectService
+
+class BatchService:
+    """Applique une liste de modifications de tâches en une seule transaction.
+
+    Opérations supportées :
+      - {"op": "shift", "task_ids": [...], "days": n} : décale les dates
+      - {"op": "move", "task_ids": [...], "project_id": p} : change de projet (et de couleur)
+      - {"op": "recolor", "project_id": p, "color_scheme": s} : recolore un projet
+      - {"op": "set_etp", "task_ids": [...], "etp": x} : fixe l'ETP
+      - {"op": "update", "tasks": [{"id", "start_date", "end_date", "etp", ...}]} : valeurs par tâche ;
+        une tâche qui porte "version" n'est modifiée que si elle est toujours à
+        cette version, sinon tout le lot est refusé (ConflictError)
+
+    Chaque opération est traduite en UPDATE ensembliste ou executemany ; aucune
+    tâche n'est chargée comme objet ORM. Une opération invalide annule tout le lot.
+    """
+    UPDATABLE_FIELDS = ('text', 'comment', 'start_date', 'end_date', 'etp')
+    CHUNK_SIZE = 500
+
+    @staticmethod
+    def _task_ids(operation: Dict) -> List[int]:
+        try:
+            task_ids = [int(task_id) for task_id in operation['task_ids']]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"task_ids invalide pour l'opération {operation.get('op')}")
+        if not task_ids:
+            raise ValueError(f"task_ids vide pour l'opération {operation.get('op')}")
+        return task_ids
+
+    @staticmethod
+    def _chunks(values: List, size: int):
+        for i in range(0, len(values), size):
+            yield values[i:i + size]
+
+    @staticmethod
+    def _project_ids_of(task_ids: List[int]) -> Set[int]:
+        """Projets actuels des tâches ; lève ValueError si une tâche n'existe pas"""
+        found = {}
+        for chunk in BatchService._chunks(task_ids, BatchService.CHUNK_SIZE):
+            found.update(db.session.query(Task.id, Task.project_id).filter(Task.id.in_(chunk)))
+        missing = set(task_ids) - found.keys()
+        if missing:
+            raise ValueError(f"Tâches introuvables : {sorted(missing)}")
+        return set(found.values())
+
+    @staticmethod
+    def _parse_date(value) -> date:
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"Date invalide : {value!r}")
+
+    @staticmethod
+    def _shift(operation: Dict) -> Set[int]:
+        task_ids = BatchService._task_ids(operation)
+        try:
+            delta = timedelta(days=int(operation['days']))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("days invalide pour l'opération shift")
+
+        # L'arithmétique de dates n'est pas portable en SQL : calcul en Python, écriture en executemany
+        rows = []
+        touched = set()
+        for chunk in BatchService._chunks(task_ids, BatchService.CHUNK_SIZE):
+            for task_id, project_id, start_date, end_date in db.session.query(
+                    Task.id, Task.project_id, Task.start_date, Task.end_date).filter(Task.id.in_(chunk)):
+                try:
+                    row = {'task_id': task_id, 'start_date': start_date + delta, 'end_date': end_date + delta}
+                except OverflowError:
+                    raise ValueError(f"Tâche {task_id} : décalage hors du calendrier")
+                ProjectService.check_task_dates(row['start_date'], row['end_date'])
+                rows.append(row)
+                touched.add(project_id)
+        missing = set(task_ids) - {row['task_id'] for row in rows}
+        if missing:
+            raise ValueError(f"Tâches introuvables : {sorted(missing)}")
+
+        table = Task.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('task_id')).values(
+                start_date=bindparam('start_date'),
+                end_date=bindparam('end_date'),
+                updated_at=datetime.utcnow(),
+                version=table.c.version + 1
+            ),
+            rows
+        )
+        return touched
+
+    @staticmethod
+    def _move(operation: Dict) -> Set[int]:
+        task_ids = BatchService._task_ids(operation)
+        project = db.session.get(Project, operation.get('project_id'))
+        if project is None:
+            raise ValueError(f"Projet introuvable : {operation.get('project_id')}")
+
+        touched = BatchService._project_ids_of(task_ids) | {project.id}
+        for chunk in BatchService._chunks(task_ids, BatchService.CHUNK_SIZE):
+            db.session.execute(
+                update(Task).where(Task.id.in_(chunk)).values(
+                    project_id=project.id,
+                    color=ProjectService.recolored_task_color(project.color_scheme),
+                    updated_at=datetime.utcnow(),
+                    version=Task.version + 1
+                ),
+                execution_options={'synchronize_session': False}
+            )
+        return touched
+
+    @staticmethod
+    def _recolor(operation: Dict) -> Set[int]:
+        project = db.session.get(Project, operation.get('project_id'))
+        if project is None:
+            raise ValueError(f"Projet introuvable : {operation.get('project_id')}")
+        color_scheme = operation.get('color_scheme')
+        if not color_scheme:
+            raise ValueError("color_scheme requis pour l'opération recolor")
+        try:
+            ProjectService.recolor_project(project.id, color_scheme, expected_version=project.version)
+        except StaleDataError as e:
+            db.session.refresh(project)
+            raise ConflictError(str(e), current=TimelineSerializer().project(project))
+        # La couleur n'intervient pas dans le calcul ETP
+        return set()
+
+    @staticmethod
+    def _set_etp(operation: Dict) -> Set[int]:
+        task_ids = BatchService._task_ids(operation)
+        if 'etp' not in operation:
+            raise ValueError("etp requis pour l'opération set_etp")
+        etp = EtpService.parse_etp(operation['etp'])
+
+        touched = BatchService._project_ids_of(task_ids)
+        for chunk in BatchService._chunks(task_ids, BatchService.CHUNK_SIZE):
+            db.session.execute(
+                update(Task).where(Task.id.in_(chunk))
+                .values(etp=etp, updated_at=datetime.utcnow(), version=Task.version + 1),
+                execution_options={'synchronize_session': False}
+            )
+        return touched
+
+    @staticmethod
+    def _update(operation: Dict) -> Set[int]:
+        tasks = operation.get('tasks')
+        if not isinstance(tasks, list) or not tasks:
+            raise ValueError("tasks doit être une liste non vide pour l'opération update")
+
+        # executemany : toutes les lignes doivent porter les mêmes colonnes
+        fields = sorted({field for task in tasks for field in task if field in BatchService.UPDATABLE_FIELDS})
+        if not fields:
+            raise ValueError("Aucun champ modifiable dans l'opération update")
+        if 'start_date' in fields or 'end_date' in fields:
+            # Les deux dates sont nécessaires pour vérifier l'ordre début/fin
+            fields = sorted(set(fields) | {'start_date', 'end_date'})
+        try:
+            task_ids = [int(task['id']) for task in tasks]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Chaque tâche de l'opération update doit avoir un id")
+
+        current = {}
+        for chunk in BatchService._chunks(task_ids, BatchService.CHUNK_SIZE):
+            # Verrou de ligne (PostgreSQL) : la version lue reste valable jusqu'au commit
+            for row in db.session.query(Task.id, Task.project_id, Task.version, *(getattr(Task, f) for f in fields)) \
+                    .filter(Task.id.in_(chunk)).with_for_update():
+                current[row.id] = row
+        missing = set(task_ids) - current.keys()
+        if missing:
+            raise ValueError(f"Tâches introuvables : {sorted(missing)}")
+
+        stale = [task_id for task_id, task in zip(task_ids, tasks)
+                 if task.get('version') is not None and int(task['version']) != current[task_id].version]
+        if stale:
+            rows = db.session.execute(
+                select(*TimelineSerializer.TASK_COLUMNS).where(Task.id.in_(stale)).order_by(Task.id)
+            ).all()
+            raise ConflictError(f"Tâches modifiées entre-temps : {sorted(stale)}",
+                                current=TimelineSerializer().tasks(rows))
+
+        rows = []
+        for task_id, task in zip(task_ids, tasks):
+            values = {'task_id': task_id}
+            for field in fields:
+                value = task.get(field, getattr(current[task_id], field))
+                if field in ('start_date', 'end_date') and not isinstance(value, date):
+                    value = BatchService._parse_date(value)
+                values[field] = value
+            try:
+                values = ProjectService.check_task_fields(values)
+                if 'start_date' in values:
+                    ProjectService.check_task_dates(values['start_date'], values['end_date'])
+            except ValueError as e:
+                raise ValueError(f"Tâche {task_id} : {e}")
+            rows.append(values)
+
+        table = Task.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('task_id')).values(
+                {**{field: bindparam(field) for field in fields}, 'updated_at': datetime.utcnow(),
+                 'version': table.c.version + 1}
+            ),
+            rows
+        )
+        return {row.project_id for row in current.values()}
+
+    OPERATIONS = {
+        'shift': '_shift',
+        'move': '_move',
+        'recolor': '_recolor',
+        'set_etp': '_set_etp',
+        'update': '_update',
+    }
+
+    @staticmethod
+    def apply(operations: List[Dict]) -> Dict:
+        """Applique les opérations dans l'ordre, puis rafraîchit les agrégats ETP et valide"""
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Une liste d'opérations non vide est attendue")
+
+        touched = set()
+        try:
+            for index, operation in enumerate(operations, start=1):
+                name = BatchService.OPERATIONS.get(operation.get('op') if isinstance(operation, dict) else None)
+                if name is None:
+                    raise ValueError(f"Opération {index} inconnue : {operation!r}")
+                try:
+                    projects = getattr(BatchService, name)(operation)
+                except ValueError as e:
+                    raise ValueError(f"Opération {index} ({operation['op']}) : {e}")
+                touched |= projects
+                if operation['op'] != 'recolor':  # recolor_project publie déjà son événement
+                    task_ids = operation.get('task_ids') or [task['id'] for task in operation['tasks']]
+                    change_feed.record('tasks.updated', task_ids=[int(task_id) for task_id in task_ids],
+                                       project_ids=sorted(projects))
+
+            EtpService.refresh_project_aggregates(touched)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return {'operations': len(operations), 'projects': sorted(touched)}
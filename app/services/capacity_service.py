@@ -0,0 +1,214 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from app import db
+from app.models import Task
+from app.periods import PeriodCalendar
+from app.services.etp_service import EtpService
+
+ONE_DAY = timedelta(days=1)
+# Tolérance sur les sommes de flottants (0.1 + 0.2 > 0.3)
+EPSILON = 1e-9
+
+
+class CapacityService:
+    """Charge ETP réelle (somme des tâches simultanées) et sur-allocations.
+
+    La charge est une fonction en escalier obtenue par balayage : chaque tâche
+    produit un événement +etp à son début et -etp le lendemain de sa fin, les
+    événements sont triés une fois (O(n log n)) puis cumulés. Les segments de
+    charge constante servent ensuite à la courbe (jour ou semaine) et à la
+    comparaison avec la capacité.
+
+    La capacité d'un projet sur une période est la valeur de la table ETP
+    (saisie, ou ETP maximal de ses tâches) ; celle du portefeuille est le total
+    de la période. Un paramètre `capacity` permet d'imposer une capacité
+    uniforme par projet.
+    """
+    GRANULARITIES = {'day': 1, 'week': 7}
+
+    @staticmethod
+    def sweep(intervals: Iterable[Tuple[date, date, float]]) -> List[Tuple[date, date, float]]:
+        """Segments (début inclus, fin exclue, charge) de charge constante non nulle.
+
+        `intervals` contient des (début, fin incluse, etp).
+        """
+        deltas = defaultdict(float)
+        for start, end, etp in intervals:
+            if etp:
+                deltas[start] += etp
+                deltas[end + ONE_DAY] -= etp
+
+        segments = []
+        load = 0.0
+        previous = None
+        for day in sorted(deltas):
+            if previous is not None and load > EPSILON:
+                segments.append((previous, day, load))
+            load += deltas[day]
+            previous = day
+        return segments
+
+    @staticmethod
+    def curve(segments: List[Tuple[date, date, float]], start: date, end: date, step_days: int) -> List[Dict]:
+        """Agrège les segments par tranches de `step_days` jours sur [start, end] : pic et moyenne"""
+        points = []
+        index = 0
+        bucket_start = start
+        stop = end + ONE_DAY
+        while bucket_start < stop:
+            bucket_end = min(bucket_start + timedelta(days=step_days), stop)
+            while index < len(segments) and segments[index][1] <= bucket_start:
+                index += 1
+
+            peak = total = 0.0
+            current = index
+            while current < len(segments) and segments[current][0] < bucket_end:
+                segment_start, segment_end, load = segments[current]
+                days = (min(segment_end, bucket_end) - max(segment_start, bucket_start)).days
+                peak = max(peak, load)
+                total += load * days
+                current += 1
+
+            points.append({
+                'date': bucket_start.isoformat(),
+                'peak': round(peak, 4),
+                'average': round(total / (bucket_end - bucket_start).days, 4)
+            })
+            bucket_start = bucket_end
+        return points
+
+    @staticmethod
+    def over_allocations(
+        segments: List[Tuple[date, date, float]],
+        calendar: PeriodCalendar,
+        capacities: Dict[str, float]
+    ) -> List[Dict]:
+        """Intervalles où la charge dépasse la capacité de la période (jours hors calendrier ignorés)"""
+        starts = [period.start for period in calendar.periods]
+        # Une charge sous la plus petite capacité ne peut dépasser sur aucune période
+        floor = min(capacities.get(name, 0.0) for name in calendar.names) + EPSILON
+        intervals = []
+        for segment_start, segment_end, load in segments:
+            if load <= floor:
+                continue
+            # Découpe du segment aux frontières de périodes
+            position = max(bisect_right(starts, segment_start) - 1, 0)
+            cursor = segment_start
+            while cursor < segment_end and position < len(calendar.periods):
+                period = calendar.periods[position]
+                if cursor < period.start:
+                    cursor = period.start
+                    continue
+                piece_end = min(segment_end, period.end)
+                if cursor < piece_end:
+                    capacity = capacities.get(period.name, 0.0)
+                    if load > capacity + EPSILON:
+                        last = intervals[-1] if intervals else None
+                        if last is not None and last['_end'] == cursor:
+                            last['_end'] = piece_end
+                            last['peak'] = max(last['peak'], load)
+                            last['excess'] = max(last['excess'], load - capacity)
+                        else:
+                            intervals.append({'_start': cursor, '_end': piece_end, 'peak': load,
+                                              'excess': load - capacity})
+                cursor = piece_end
+                position += 1
+
+        return [
+            {
+                'start': interval['_start'].isoformat(),
+                'end': (interval['_end'] - ONE_DAY).isoformat(),
+                'days': (interval['_end'] - interval['_start']).days,
+                'peak': round(interval['peak'], 4),
+                'excess': round(interval['excess'], 4)
+            }
+            for interval in intervals
+        ]
+
+    @staticmethod
+    def analyze(
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        granularity: str = 'week',
+        project_id: Optional[int] = None,
+        capacity: Optional[float] = None,
+        include_curves: bool = False,
+        max_buckets: int = 3660
+    ) -> Dict:
+        """Courbe de charge du portefeuille et sur-allocations par projet sur [start, end].
+
+        Par défaut la fenêtre couvre le calendrier des périodes ETP ; une
+        fenêtre de plus de `max_buckets` points de courbe est refusée. Les
+        courbes par projet ne sont renvoyées que pour un projet donné ou si
+        `include_curves` est demandé (elles sont volumineuses).
+        """
+        if granularity not in CapacityService.GRANULARITIES:
+            raise ValueError(f"Granularité inconnue : {granularity} (attendu : {', '.join(CapacityService.GRANULARITIES)})")
+        if capacity is not None and capacity < 0:
+            raise ValueError("La capacité doit être positive")
+
+        calendar = PeriodCalendar.current()
+        start = start or calendar.periods[0].start
+        end = end or calendar.periods[-1].end - ONE_DAY
+        if end < start:
+            raise ValueError("La date de fin précède la date de début")
+        if end == date.max:
+            raise ValueError("La date de fin dépasse le calendrier")
+        step_days = CapacityService.GRANULARITIES[granularity]
+        curve_start = start - timedelta(days=start.weekday()) if granularity == 'week' else start
+        count = (end - curve_start).days // step_days + 1
+        if count > max_buckets:
+            raise ValueError(f"{count} points de courbe par {granularity} demandés (maximum {max_buckets})")
+
+        etp_rows, period_totals = EtpService.get_etp_table()
+        if project_id is not None:
+            etp_rows = [row for row in etp_rows if row['id'] == project_id]
+            if not etp_rows:
+                raise ValueError(f"Projet introuvable : {project_id}")
+
+        # Tâches de la fenêtre, bornées à la fenêtre, en colonnes seulement
+        statement = select(Task.project_id, Task.start_date, Task.end_date, Task.etp).where(
+            Task.end_date >= start,
+            Task.start_date <= end
+        )
+        if project_id is not None:
+            statement = statement.where(Task.project_id == project_id)
+        intervals = defaultdict(list)
+        for task_project_id, task_start, task_end, etp in db.session.execute(statement):
+            intervals[task_project_id].append((max(task_start, start), min(task_end, end), etp or 0.0))
+
+        projects = []
+        for row in etp_rows:
+            segments = CapacityService.sweep(intervals.get(row['id'], ()))
+            capacities = {name: capacity if capacity is not None else row[name] for name in calendar.names}
+            project = {
+                'id': row['id'],
+                'name': row['name'],
+                'peak': round(max((load for _, _, load in segments), default=0.0), 4),
+                'over_allocations': CapacityService.over_allocations(segments, calendar, capacities)
+            }
+            if include_curves or project_id is not None:
+                project['curve'] = CapacityService.curve(segments, curve_start, end, step_days)
+            projects.append(project)
+
+        portfolio_segments = CapacityService.sweep(
+            interval for project_intervals in intervals.values() for interval in project_intervals
+        )
+        portfolio_capacities = {
+            name: capacity * len(etp_rows) if capacity is not None else (
+                period_totals.get(name, 0.0) if project_id is None else etp_rows[0][name])
+            for name in calendar.names
+        }
+        return {
+            'window': {'start': start.isoformat(), 'end': end.isoformat()},
+            'granularity': granularity,
+            'portfolio': {
+                'peak': round(max((load for _, _, load in portfolio_segments), default=0.0), 4),
+                'curve': CapacityService.curve(portfolio_segments, curve_start, end, step_days),
+                'over_allocations': CapacityService.over_allocations(portfolio_segments, calendar, portfolio_capacities)
+            },
+            'projects': projects
+        }
@@ -1,9 +1,13 @@
+import math
 from collections import defaultdict
-from typing import List, Dict, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
+from sqlalchemy import delete, tuple_
 from datetime import date, datetime
-from app import db
-from app.models import Project, EtpEntry
-from app.constants import TimeConstants
+from app import db, response_cache, change_feed
+from app.exceptions import ConflictError
+from app.models import Project, Task, EtpEntry, EtpAggregate
+from app.periods import PeriodCalendar
+from app.scenarios import ScenarioOverlay
 
 class EtpService:
     @staticmethod
@@ -16,87 +20,299 @@ class EtpService:
         return entry.etp_value if entry else None
 
     @staticmethod
-    def get_period_for_date(target_date: date) -> str:
-        """Détermine la période correspondant à une date donnée"""
-        if target_date.year == 2025:
-            if target_date.month <= 6:
-                return "2025 Q1-Q2"
-            else:
-                return "2025 Q3-Q4"
-        else:
-            return "2026-2027"
+    def get_period_for_date(target_date: date) -> Optional[str]:
+        """Détermine la période correspondant à une date donnée (None si elle tombe entre deux périodes)"""
+        return PeriodCalendar.current().period_for_date(target_date)
 
     @staticmethod
     def get_task_etp_by_date(project_id: int, task_date: date, default_etp: float) -> float:
         """Récupère l'ETP pour une tâche à une date spécifique"""
         period = EtpService.get_period_for_date(task_date)
+        if period is None:
+            return default_etp
         stored_etp = EtpService.get_stored_etp(project_id, period)
         return stored_etp if stored_etp is not None else default_etp
 
     @staticmethod
-    def calculate_etp_per_period(projects: List[Project]) -> Tuple[List[Dict], Dict[str, float]]:
-        etp_data = []
-        period_totals = defaultdict(float)
+    def parse_etp(value) -> float:
+        """Convertit un ETP saisi (nombre ou chaîne) ; ValueError s'il n'est pas un nombre fini positif"""
+        try:
+            etp = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"ETP invalide : {value!r}")
+        if not math.isfinite(etp):
+            raise ValueError(f"ETP invalide : {value!r}")
+        if etp < 0:
+            raise ValueError("L'ETP doit être positif")
+        return etp
+
+    @staticmethod
+    def compute_project_etps(tasks: List[Task], stored_etps_dict: Dict[str, float]) -> Tuple[Dict[str, float], float]:
+        """Calcule l'ETP par période et l'ETP maximal d'un projet à partir de ses tâches"""
+        project_etps = defaultdict(float)
+        max_etp = 0
         
-        for project in projects:
-            project_etps = defaultdict(float)
-            max_etp = 0
-            
-            stored_etps = EtpEntry.query.filter_by(project_id=project.id).all()
-            stored_etps_dict = {entry.period: entry.etp_value for entry in stored_etps}
-            
-            for task in project.tasks:
-                period_start = EtpService.get_period_for_date(task.start_date)
-                period_end = EtpService.get_period_for_date(task.end_date)
-                max_etp = max(max_etp, task.etp)
-                
-                # Assigner l'ETP à toutes les périodes concernées
-                for period in [period_start, period_end]:
-                    stored_value = stored_etps_dict.get(period)
-                    if stored_value is not None:
-                        project_etps[period] = stored_value
-                    else:
-                        project_etps[period] = max(project_etps[period], task.etp)
-                
-                # Si la tâche s'étend sur 2025 Q3-Q4 et commence en Q1-Q2 ou finit en 2026-2027
-                if period_start != period_end and period_start == "2025 Q1-Q2":
-                    middle_period = "2025 Q3-Q4"
-                    stored_value = stored_etps_dict.get(middle_period)
-                    if stored_value is not None:
-                        project_etps[middle_period] = stored_value
-                    else:
-                        project_etps[middle_period] = max(project_etps[middle_period], task.etp)
-            
-            project_row = {
-                "name": project.name,
-                **{period: project_etps[period] for period in TimeConstants.PERIODS_MAPPING.values()},
-                "total": max_etp
-            }
+        # Périodes recouvertes par chaque tâche, calculées en une passe
+        task_periods = PeriodCalendar.current().overlapping_batch(
+            [task.start_date for task in tasks],
+            [task.end_date for task in tasks]
+        )
+        
+        for task, periods in zip(tasks, task_periods):
+            max_etp = max(max_etp, task.etp)
             
-            for period_name, value in project_etps.items():
+            # Assigner l'ETP à toutes les périodes concernées
+            for period in periods:
+                stored_value = stored_etps_dict.get(period)
+                if stored_value is not None:
+                    project_etps[period] = stored_value
+                else:
+                    project_etps[period] = max(project_etps[period], task.etp)
+        
+        return project_etps, max_etp
+
+    @staticmethod
+    def build_etp_row(project_id: int, name: str, project_etps: Dict[str, float], max_etp: float) -> Dict:
+        return {
+            "id": project_id,
+            "name": name,
+            **{period: project_etps.get(period, 0.0) for period in PeriodCalendar.current().names},
+            "total": max_etp
+        }
+
+    @staticmethod
+    def compute_projects_etp(
+        project_ids: Iterable[int],
+        overlay: Optional[ScenarioOverlay] = None
+    ) -> Dict[int, Tuple[Dict[str, float], float]]:
+        """ETP par période et ETP maximal de chaque projet, calculés depuis ses tâches et saisies (deux requêtes).
+
+        Avec `overlay`, le calcul porte sur le réel modifié par les écarts du
+        scénario, et les projets qu'il touche (overlay.project_ids) sont inclus.
+        """
+        project_ids = set(project_ids)
+        if overlay is not None:
+            project_ids |= overlay.project_ids
+        if not project_ids:
+            return {}
+        
+        # Seules les colonnes utiles au calcul sont chargées, sans objets ORM
+        task_rows = db.session.query(Task.id, Task.project_id, Task.start_date, Task.end_date, Task.etp) \
+            .filter(Task.project_id.in_(project_ids))
+        if overlay is not None:
+            task_rows = overlay.apply_rows(task_rows)
+        tasks_by_project = defaultdict(list)
+        for task in task_rows:
+            tasks_by_project[task.project_id].append(task)
+        
+        stored_by_project = defaultdict(dict)
+        for project_id, period, etp_value in db.session.query(
+                EtpEntry.project_id, EtpEntry.period, EtpEntry.etp_value).filter(EtpEntry.project_id.in_(project_ids)):
+            stored_by_project[project_id][period] = etp_value
+        
+        values = {}
+        for project_id in project_ids:
+            stored = stored_by_project[project_id]
+            if overlay is not None:
+                stored = overlay.stored_etps(project_id, stored)
+            values[project_id] = EtpService.compute_project_etps(tasks_by_project[project_id], stored)
+        return values
+
+    @staticmethod
+    def refresh_project_aggregate(project_id: int) -> EtpAggregate:
+        """Recalcule l'agrégat ETP d'un seul projet (sans commit).
+
+        À appeler après toute écriture touchant les tâches ou les entrées ETP
+        du projet, dans la même transaction.
+        """
+        return EtpService.refresh_project_aggregates([project_id])[project_id]
+
+    @staticmethod
+    def refresh_project_aggregates(project_ids: Iterable[int]) -> Dict[int, EtpAggregate]:
+        """Recalcule les agrégats ETP d'un ensemble de projets en trois requêtes (sans commit)"""
+        project_ids = set(project_ids)
+        if not project_ids:
+            return {}
+        
+        values = EtpService.compute_projects_etp(project_ids)
+        signature = PeriodCalendar.current().signature
+        aggregates = {
+            aggregate.project_id: aggregate
+            for aggregate in EtpAggregate.query.filter(EtpAggregate.project_id.in_(project_ids))
+        }
+        
+        for project_id in project_ids:
+            project_etps, max_etp = values[project_id]
+            aggregate = aggregates.get(project_id)
+            if aggregate is None:
+                aggregate = aggregates[project_id] = EtpAggregate(project_id=project_id)
+                db.session.add(aggregate)
+            aggregate.period_values = dict(project_etps)
+            aggregate.max_etp = max_etp
+            aggregate.calendar_signature = signature
+        
+        return aggregates
+
+    @staticmethod
+    def get_etp_table(overlay: Optional[ScenarioOverlay] = None) -> Tuple[List[Dict], Dict[str, float]]:
+        """Construit la table ETP à partir des agrégats matérialisés, en O(projets).
+
+        Les projets sans agrégat à jour (données antérieures à la table
+        etp_aggregates ou calendrier de périodes modifié) sont recalculés puis
+        persistés au passage. Avec `overlay`, seuls les projets touchés par le
+        scénario sont recalculés, les autres gardent leur agrégat.
+        """
+        rows = db.session.query(Project.id, Project.name, EtpAggregate) \
+            .outerjoin(EtpAggregate, EtpAggregate.project_id == Project.id) \
+            .order_by(Project.id) \
+            .all()
+        
+        signature = PeriodCalendar.current().signature
+        missing = [
+            project_id for project_id, _, aggregate in rows
+            if aggregate is None or aggregate.calendar_signature != signature
+        ]
+        if missing:
+            refreshed = EtpService.refresh_project_aggregates(missing)
+            db.session.commit()
+            rows = [(project_id, name, refreshed.get(project_id, aggregate)) for project_id, name, aggregate in rows]
+        
+        scenario_values = EtpService.compute_projects_etp((), overlay) if overlay is not None else {}
+        etp_data = []
+        period_totals = defaultdict(float)
+        for project_id, name, aggregate in rows:
+            period_values, max_etp = scenario_values.get(project_id, (aggregate.period_values, aggregate.max_etp))
+            for period_name, value in period_values.items():
                 period_totals[period_name] += value
-            
-            etp_data.append(project_row)
+            etp_data.append(EtpService.build_etp_row(project_id, name, period_values, max_etp))
         
         return etp_data, period_totals
 
+    @staticmethod
+    def get_stored_etp_grid() -> Dict[int, Dict[str, float]]:
+        """Toutes les valeurs ETP saisies, {project_id: {période: valeur}}, en une requête"""
+        grid = defaultdict(dict)
+        for project_id, period, etp_value in db.session.query(
+                EtpEntry.project_id, EtpEntry.period, EtpEntry.etp_value):
+            grid[project_id][period] = etp_value
+        return grid
+
+    @staticmethod
+    def get_stored_etp_versions() -> Dict[int, Dict[str, int]]:
+        """Version de chaque cellule saisie, {project_id: {période: version}} (absente = version 0)"""
+        versions = defaultdict(dict)
+        for project_id, period, version in db.session.query(
+                EtpEntry.project_id, EtpEntry.period, EtpEntry.version):
+            versions[project_id][period] = version
+        return versions
+
+    @staticmethod
+    def _check_versions(expected: Dict[Tuple[int, str], int]) -> None:
+        """Lève ConflictError si une cellule n'est plus à la version attendue.
+
+        Les lignes lues sont verrouillées (FOR UPDATE sous PostgreSQL ; SQLite
+        sérialise déjà les écritures) jusqu'à la fin de la transaction.
+        """
+        current = {}
+        for project_id, period, etp_value, version in db.session.query(
+                EtpEntry.project_id, EtpEntry.period, EtpEntry.etp_value, EtpEntry.version
+        ).filter(tuple_(EtpEntry.project_id, EtpEntry.period).in_(expected.keys())).with_for_update():
+            current[(project_id, period)] = (etp_value, version)
+
+        stale = sorted(key for key, version in expected.items() if current.get(key, (None, 0))[1] != version)
+        if stale:
+            raise ConflictError(
+                f"Cellules ETP modifiées entre-temps : {', '.join(f'{p}/{period}' for p, period in stale)}",
+                current=[
+                    {'project_id': project_id, 'period': period,
+                     'etp': current.get((project_id, period), (None, 0))[0],
+                     'version': current.get((project_id, period), (None, 0))[1]}
+                    for project_id, period in stale
+                ]
+            )
+
+    @staticmethod
+    def _upsert_statement(rows: List[Dict]):
+        """INSERT ... ON CONFLICT (project_id, period) DO UPDATE natif du dialecte"""
+        # Dialectes vérifiés au démarrage (app.database.SUPPORTED_DIALECTS)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        
+        statement = insert(EtpEntry).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=['project_id', 'period'],
+            set_={
+                'etp_value': statement.excluded.etp_value,
+                'updated_at': statement.excluded.updated_at,
+                'version': EtpEntry.version + 1
+            }
+        )
+
+    @staticmethod
+    def save_etp_entries(
+        entries: List[Tuple[int, str, Optional[float]]],
+        expected_versions: Optional[Dict[Tuple[int, str], int]] = None
+    ) -> Dict[str, int]:
+        """Écrit un ensemble de cellules (projet, période, valeur) de la table ETP.
+
+        Les valeurs sont écrites par un seul upsert (par lot de 500 cellules)
+        sur la contrainte uix_project_period ; une valeur None supprime la
+        saisie et rend la cellule à la valeur calculée. Les agrégats des projets
+        concernés sont rafraîchis dans la même transaction.
+
+        `expected_versions` ({(projet, période): version}, 0 pour une cellule
+        non saisie) rend l'écriture conditionnelle : si une cellule a changé,
+        rien n'est écrit et ConflictError est levée.
+        """
+        calendar = PeriodCalendar.current()
+        valid_periods = set(calendar.names)
+        project_ids = {project_id for project_id, _, _ in entries}
+        known = {project_id for project_id, in db.session.query(Project.id).filter(Project.id.in_(project_ids))}
+        
+        now = datetime.utcnow()
+        upserts, deletions = {}, set()
+        for project_id, period, etp_value in entries:
+            if project_id not in known:
+                raise ValueError(f"Projet introuvable : {project_id}")
+            if period not in valid_periods:
+                raise ValueError(f"Période inconnue : {period}")
+            if etp_value is None:
+                deletions.add((project_id, period))
+                upserts.pop((project_id, period), None)
+                continue
+            etp_value = EtpService.parse_etp(etp_value)
+            deletions.discard((project_id, period))
+            upserts[(project_id, period)] = {
+                'project_id': project_id, 'period': period, 'etp_value': etp_value,
+                'created_at': now, 'updated_at': now
+            }
+        
+        try:
+            if expected_versions:
+                EtpService._check_versions(expected_versions)
+            rows = list(upserts.values())
+            for i in range(0, len(rows), 500):
+                db.session.execute(EtpService._upsert_statement(rows[i:i + 500]))
+            if deletions:
+                db.session.execute(
+                    delete(EtpEntry).where(tuple_(EtpEntry.project_id, EtpEntry.period).in_(deletions)),
+                    execution_options={'synchronize_session': False}
+                )
+            EtpService.refresh_project_aggregates(project_ids)
+            change_feed.record('etp.updated', cells=[
+                {'project_id': project_id, 'period': period, 'etp': etp_value}
+                for project_id, period, etp_value in entries
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        response_cache.bump()
+        return {'updated': len(upserts), 'cleared': len(deletions)}
+
     @staticmethod
     def update_etp(project_id: int, period: str, etp_value: float) -> None:
         """Update ETP value in database"""
-        entry = EtpEntry.query.filter_by(
-            project_id=project_id,
-            period=period
-        ).first()
-        
-        if entry:
-            entry.etp_value = etp_value
-            entry.updated_at = datetime.utcnow()
-        else:
-            entry = EtpEntry(
-                project_id=project_id,
-                period=period,
-                etp_value=etp_value
-            )
-            db.session.add(entry)
-            
-        db.session.commit()
\ No newline at end of file
+        EtpService.save_etp_entries([(project_id, period, etp_value)])
\ No newline at end of file
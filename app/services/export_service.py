@@ -0,0 +1,153 @@
+import csv
+import hashlib
+import io
+import json
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from app import db, render_cache
+from app.constants import TimeConstants
+from app.models import Project, Task, EtpEntry
+from app.json_provider import dumps
+from app.serializers import TimelineSerializer
+from app.timeline_layout import TimelineLayout
+from app.timeline_render import TimelineDrawing
+
+class ExportService:
+    """Export en flux (NDJSON ou CSV) des projets, tâches et entrées ETP.
+
+    Les lignes sont lues par lots avec un curseur côté serveur (yield_per) et
+    formatées au fil de l'eau : la mémoire reste constante quelle que soit la
+    taille du jeu de données.
+    """
+    BATCH_SIZE = 1000
+    FORMATS = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv'
+    }
+    # Rendus de la timeline (TimelineDrawing)
+    RENDER_FORMATS = {
+        'svg': 'image/svg+xml',
+        'png': 'image/png',
+        'pdf': 'application/pdf'
+    }
+
+    @staticmethod
+    def iter_projects(project_id: Optional[int] = None) -> Iterator[Dict]:
+        statement = select(Project.id, Project.name, Project.color_scheme).order_by(Project.id)
+        if project_id is not None:
+            statement = statement.where(Project.id == project_id)
+        for row in db.session.execute(statement.execution_options(yield_per=ExportService.BATCH_SIZE)):
+            yield {'id': row.id, 'name': row.name, 'color_scheme': row.color_scheme}
+
+    @staticmethod
+    def iter_tasks(
+        project_id: Optional[int] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> Iterator[Dict]:
+        """Tâches filtrées par projet et par fenêtre de dates (chevauchement)"""
+        statement = select(*TimelineSerializer.TASK_COLUMNS).order_by(Task.project_id, Task.id)
+        if project_id is not None:
+            statement = statement.where(Task.project_id == project_id)
+        if start is not None:
+            statement = statement.where(Task.end_date >= start)
+        if end is not None:
+            statement = statement.where(Task.start_date <= end)
+
+        serializer = TimelineSerializer()
+        result = db.session.execute(statement.execution_options(yield_per=ExportService.BATCH_SIZE))
+        for rows in result.partitions():
+            yield from serializer.tasks(rows)
+
+    @staticmethod
+    def iter_etp_entries(project_id: Optional[int] = None) -> Iterator[Dict]:
+        statement = select(EtpEntry.project_id, EtpEntry.period, EtpEntry.etp_value) \
+            .order_by(EtpEntry.project_id, EtpEntry.period)
+        if project_id is not None:
+            statement = statement.where(EtpEntry.project_id == project_id)
+        for row in db.session.execute(statement.execution_options(yield_per=ExportService.BATCH_SIZE)):
+            yield {'project_id': row.project_id, 'period': row.period, 'etp_value': row.etp_value}
+
+    @staticmethod
+    def iter_dataset(dataset: str, project_id: Optional[int] = None,
+                     start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Dict]:
+        if dataset == 'projects':
+            return ExportService.iter_projects(project_id)
+        if dataset == 'tasks':
+            return ExportService.iter_tasks(project_id, start, end)
+        if dataset == 'etp':
+            return ExportService.iter_etp_entries(project_id)
+        raise ValueError(f"Jeu de données inconnu : {dataset}")
+
+    @staticmethod
+    def to_ndjson(rows: Iterator[Dict]) -> Iterator[str]:
+        for row in rows:
+            yield dumps(row) + '\n'
+
+    @staticmethod
+    def to_csv(rows: Iterator[Dict]) -> Iterator[str]:
+        """Écrit l'en-tête d'après la première ligne puis une ligne CSV par élément"""
+        buffer = io.StringIO()
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    @staticmethod
+    def stream(dataset: str, export_format: str, **filters) -> Iterator[str]:
+        if export_format not in ExportService.FORMATS:
+            raise ValueError(f"Format inconnu : {export_format}")
+        rows = ExportService.iter_dataset(dataset, **filters)
+        if export_format == 'csv':
+            return ExportService.to_csv(rows)
+        return ExportService.to_ndjson(rows)
+
+    @staticmethod
+    def timeline_render_key(export_format: str, title: str, content: List) -> str:
+        """Clé du cache des rendus : format, titre, grille, jalons et `content`, qui identifie les données.
+
+        `content` vient de timeline_fingerprint_content (versions des lignes
+        affichées, lues sans rien sérialiser) ou de timeline_drawn_content
+        (ce qui est dessiné, pour les données sans versions propres comme un
+        scénario).
+        """
+        key = (TimelineDrawing.VERSION, export_format, title, TimelineLayout.current().signature,
+               TimeConstants.MILESTONES, content)
+        return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode()).hexdigest()
+
+    @staticmethod
+    def timeline_fingerprint_content(fingerprints: List[Tuple]) -> List:
+        """Contenu de clé tiré de ProjectService.get_timeline_page_fingerprints"""
+        return [(project_id, name, color_scheme, version, sorted(tasks))
+                for project_id, name, color_scheme, version, tasks in fingerprints]
+
+    @staticmethod
+    def timeline_drawn_content(projects: List[Dict]) -> List:
+        """Contenu de clé tiré des projets sérialisés : libellés, couleurs et positions dessinés"""
+        return [(project['name'], [(task['text'], task['color'], task['start'], task['width'])
+                                   for task in project['tasks']])
+                for project in projects]
+
+    @staticmethod
+    def render_timeline(load_projects: Callable[[], List[Dict]], export_format: str, title: str, key: str) -> bytes:
+        """Timeline au format svg, png ou pdf, depuis le cache disque ou rendue une seule fois.
+
+        `load_projects()` (projets sérialisés par TimelineSerializer) n'est
+        appelé que si le rendu n'est pas en cache. Lève RuntimeError si le
+        format demande une dépendance absente (Pillow pour le PNG), ValueError
+        si l'image serait trop grande.
+        """
+        if export_format not in ExportService.RENDER_FORMATS:
+            raise ValueError(f"Format inconnu : {export_format}")
+
+        def render() -> bytes:
+            drawing = TimelineDrawing(title, TimelineLayout.current().labels, load_projects(),
+                                      TimeConstants.MILESTONES)
+            return getattr(drawing, f'to_{export_format}')()
+        return render_cache.get_or_render(key, export_format, render)
@@ -0,0 +1,331 @@
+import json
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from app.models import TaskHistory, ProjectHistory, EtpEntryHistory, HistorySnapshot
+from app.response_cache import LRUCache
+from app.serializers import TimelineSerializer
+from app.services.etp_service import EtpService
+
+
+class HistoryTask(NamedTuple):
+    """Tâche reconstituée, aux champs de TimelineSerializer.TASK_COLUMNS"""
+    id: int
+    project_id: int
+    text: str
+    comment: Optional[str]
+    start_date: date
+    end_date: date
+    color: str
+    etp: float
+    version: int
+
+
+class HistoryState:
+    """État du portefeuille à une date : projets, tâches et saisies ETP.
+
+    `projects` : {id: (id, name, color_scheme, version)} (colonnes
+    PROJECT_COLUMNS), `tasks` : {id: HistoryTask}, `etp_entries` :
+    {(projet, période): (valeur, version)}. Les vues produites ont le format
+    de leurs équivalents sur les données actuelles.
+    """
+
+    def __init__(self, projects: Dict[int, Tuple], tasks: Dict[int, HistoryTask],
+                 etp_entries: Dict[Tuple[int, str], Tuple[float, int]]):
+        self.projects = projects
+        self.tasks = tasks
+        self.etp_entries = etp_entries
+
+    def copy(self) -> 'HistoryState':
+        return HistoryState(dict(self.projects), dict(self.tasks), dict(self.etp_entries))
+
+    def etp_table(self) -> Tuple[List[Dict], Dict[str, float]]:
+        """Même résultat que EtpService.get_etp_table, calculé sur cet état"""
+        tasks_by_project = defaultdict(list)
+        for task in self.tasks.values():
+            tasks_by_project[task.project_id].append(task)
+        stored = self.stored_etp_grid()
+
+        etp_data = []
+        period_totals = defaultdict(float)
+        for project_id in sorted(self.projects):
+            project_etps, max_etp = EtpService.compute_project_etps(tasks_by_project[project_id],
+                                                                    stored.get(project_id, {}))
+            for period_name, value in project_etps.items():
+                period_totals[period_name] += value
+            etp_data.append(EtpService.build_etp_row(project_id, self.projects[project_id][1], project_etps, max_etp))
+        return etp_data, period_totals
+
+    def stored_etp_grid(self) -> Dict[int, Dict[str, float]]:
+        grid = defaultdict(dict)
+        for (project_id, period), (etp_value, _) in self.etp_entries.items():
+            grid[project_id][period] = etp_value
+        return grid
+
+    def stored_etp_versions(self) -> Dict[int, Dict[str, int]]:
+        versions = defaultdict(dict)
+        for (project_id, period), (_, version) in self.etp_entries.items():
+            versions[project_id][period] = version
+        return versions
+
+    def _page(self, after_id: Optional[int], limit: int) -> Tuple[List[int], Optional[int]]:
+        project_ids = sorted(project_id for project_id in self.projects if after_id is None or project_id > after_id)
+        next_cursor = project_ids[limit - 1] if len(project_ids) > limit else None
+        return project_ids[:limit], next_cursor
+
+    def visible_task_rows(self, project_ids: Sequence[int], window_start: date, window_end: date) -> List[HistoryTask]:
+        page = set(project_ids)
+        rows = [task for task in self.tasks.values()
+                if task.project_id in page and task.end_date >= window_start and task.start_date <= window_end]
+        rows.sort(key=lambda task: (task.project_id, task.start_date, task.id))
+        return rows
+
+    def timeline_projects(self, project_ids: Sequence[int], window_start: date, window_end: date) -> List[Dict]:
+        """Projets demandés et leurs tâches visibles (format TimelineSerializer.timeline_projects)"""
+        project_ids = [project_id for project_id in project_ids if project_id in self.projects]
+        return TimelineSerializer().projects([self.projects[project_id] for project_id in project_ids],
+                                             self.visible_task_rows(project_ids, window_start, window_end))
+
+    def timeline_page(self, window_start: date, window_end: date, after_id: Optional[int] = None,
+                      limit: int = 50) -> Tuple[List[Dict], Optional[int]]:
+        """Même page que TimelineSerializer.timeline_page, sur cet état"""
+        project_ids, next_cursor = self._page(after_id, limit)
+        return self.timeline_projects(project_ids, window_start, window_end), next_cursor
+
+    def timeline_page_fingerprints(self, window_start: date, window_end: date, after_id: Optional[int] = None,
+                                   limit: int = 50) -> Tuple[List[Tuple], Optional[int]]:
+        """Même format que ProjectService.get_timeline_page_fingerprints.
+
+        Une ligne de projet ne dépend que des versions affichées : le cache de
+        fragments sert aussi bien les dates passées que l'état actuel.
+        """
+        project_ids, next_cursor = self._page(after_id, limit)
+        tasks = defaultdict(set)
+        for task in self.visible_task_rows(project_ids, window_start, window_end):
+            tasks[task.project_id].add((task.id, task.version))
+        return [(*self.projects[project_id], frozenset(tasks[project_id])) for project_id in project_ids], next_cursor
+
+
+class HistoryService:
+    """Historique des tâches, projets et entrées ETP, et reconstitution à une date.
+
+    Le journal (app.models.history) est alimenté par des triggers. Une
+    reconstitution part du dernier HistorySnapshot antérieur à la date, puis
+    rejoue les seules lignes du journal écrites entre ce snapshot et la date
+    (au plus celles jusqu'au snapshot suivant) : son coût dépend de
+    l'intervalle entre snapshots, pas de la longueur du journal. Les snapshots
+    sont pris par `flask history snapshot` (à planifier, avec --min-changes).
+
+    Les ids du journal sont supposés croître avec changed_at (vrai sous
+    SQLite, qui sérialise les écritures).
+    """
+
+    @staticmethod
+    def parse_as_of(value: str) -> datetime:
+        """Date ISO (fin de journée) ou date et heure ; les heures avec fuseau sont ramenées en UTC"""
+        try:
+            as_of = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"as_of invalide : {value!r} (AAAA-MM-JJ ou AAAA-MM-JJTHH:MM[:SS])")
+        if len(value) == 10:
+            as_of = datetime.combine(as_of.date(), time.max)
+        if as_of.tzinfo is not None:
+            as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+        return as_of
+
+    @staticmethod
+    def _encode(state: HistoryState) -> bytes:
+        """JSON compressé ; les dates sont stockées en ordinaux (décodage rapide)"""
+        payload = {
+            'projects': list(state.projects.values()),
+            'tasks': [(task.id, task.project_id, task.text, task.comment, task.start_date.toordinal(),
+                       task.end_date.toordinal(), task.color, task.etp, task.version)
+                      for task in state.tasks.values()],
+            'etp_entries': [(project_id, period, etp_value, version)
+                            for (project_id, period), (etp_value, version) in state.etp_entries.items()]
+        }
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode(), 6)
+
+    @staticmethod
+    def _decode(payload: bytes) -> HistoryState:
+        data = json.loads(zlib.decompress(payload))
+        fromordinal = date.fromordinal
+        return HistoryState(
+            {row[0]: tuple(row) for row in data['projects']},
+            {row[0]: HistoryTask(row[0], row[1], row[2], row[3], fromordinal(row[4]), fromordinal(row[5]),
+                                 row[6], row[7], row[8])
+             for row in data['tasks']},
+            {(project_id, period): (etp_value, version) for project_id, period, etp_value, version in data['etp_entries']}
+        )
+
+    @staticmethod
+    def _snapshot_state(snapshot: Optional[HistorySnapshot]) -> HistoryState:
+        """État d'un snapshot (copie modifiable), décodé une fois par processus"""
+        if snapshot is None:
+            return HistoryState({}, {}, {})
+        cache = current_app.extensions.get('history_snapshots')
+        if cache is None:
+            cache = current_app.extensions['history_snapshots'] = LRUCache(
+                current_app.config.get('HISTORY_SNAPSHOT_CACHE_SIZE', 2))
+        state = cache.get(snapshot.id)
+        if state is None:
+            state = HistoryService._decode(snapshot.payload)
+            cache.put(snapshot.id, state)
+        return state.copy()
+
+    @staticmethod
+    def _replay(state: HistoryState, after: Tuple[int, int, int], until: Optional[Tuple[int, int, int]] = None,
+                as_of: Optional[datetime] = None) -> Optional[datetime]:
+        """Applique à `state` les lignes du journal d'ids dans ]after, until] et antérieures à as_of.
+
+        Retourne la date de la dernière modification appliquée (None si aucune).
+        """
+        last_change = None
+
+        def rows(model, columns, index):
+            query = db.session.query(model.id, model.operation, model.changed_at, *columns) \
+                .filter(model.id > after[index])
+            if until is not None:
+                query = query.filter(model.id <= until[index])
+            if as_of is not None:
+                query = query.filter(model.changed_at <= as_of)
+            return query.order_by(model.id)
+
+        projects = state.projects
+        for _, operation, changed_at, project_id, name, color_scheme, version in rows(
+                ProjectHistory, (ProjectHistory.project_id, ProjectHistory.name, ProjectHistory.color_scheme,
+                                 ProjectHistory.version), 1):
+            if operation == 'D':
+                projects.pop(project_id, None)
+            else:
+                projects[project_id] = (project_id, name, color_scheme, version)
+            last_change = max(last_change or changed_at, changed_at)
+
+        tasks = state.tasks
+        for _, operation, changed_at, task_id, project_id, text, comment, start_date, end_date, color, etp, version \
+                in rows(TaskHistory, (TaskHistory.task_id, TaskHistory.project_id, TaskHistory.text,
+                                      TaskHistory.comment, TaskHistory.start_date, TaskHistory.end_date,
+                                      TaskHistory.color, TaskHistory.etp, TaskHistory.version), 0):
+            if operation == 'D':
+                tasks.pop(task_id, None)
+            else:
+                previous = tasks.get(task_id)
+                if operation == 'U' and previous is not None:
+                    # Libellé et commentaire ne sont enregistrés que s'ils changent
+                    text = previous.text if text is None else text
+                    comment = previous.comment if comment is None else comment
+                tasks[task_id] = HistoryTask(task_id, project_id, text, comment, start_date, end_date,
+                                             color, etp, version)
+            last_change = max(last_change or changed_at, changed_at)
+
+        etp_entries = state.etp_entries
+        for _, operation, changed_at, project_id, period, etp_value, version in rows(
+                EtpEntryHistory, (EtpEntryHistory.project_id, EtpEntryHistory.period, EtpEntryHistory.etp_value,
+                                  EtpEntryHistory.version), 2):
+            if operation == 'D':
+                etp_entries.pop((project_id, period), None)
+            else:
+                etp_entries[(project_id, period)] = (etp_value, version)
+            last_change = max(last_change or changed_at, changed_at)
+
+        return last_change
+
+    @staticmethod
+    def _snapshot_ids(snapshot: Optional[HistorySnapshot]) -> Tuple[int, int, int]:
+        if snapshot is None:
+            return 0, 0, 0
+        return snapshot.task_history_id, snapshot.project_history_id, snapshot.etp_entry_history_id
+
+    @staticmethod
+    def state_at(as_of: datetime) -> HistoryState:
+        """Reconstitue l'état du portefeuille à la date `as_of` (UTC, sans fuseau)"""
+        snapshot = HistorySnapshot.query.filter(HistorySnapshot.taken_at <= as_of) \
+            .order_by(HistorySnapshot.taken_at.desc(), HistorySnapshot.id.desc()).first()
+        following = HistorySnapshot.query.filter(HistorySnapshot.taken_at > as_of) \
+            .order_by(HistorySnapshot.taken_at, HistorySnapshot.id).first()
+
+        state = HistoryService._snapshot_state(snapshot)
+        HistoryService._replay(
+            state,
+            HistoryService._snapshot_ids(snapshot),
+            # Rien au-delà du snapshot suivant n'est antérieur à as_of
+            until=HistoryService._snapshot_ids(following) if following is not None else None,
+            as_of=as_of
+        )
+        return state
+
+    @staticmethod
+    def snapshot(min_changes: int = 1) -> Optional[HistorySnapshot]:
+        """Compacte le journal en un nouveau snapshot (dernier snapshot + lignes suivantes).
+
+        Ne fait rien (retourne None) si moins de `min_changes` lignes ont été
+        écrites depuis le snapshot précédent. L'état est construit depuis le
+        journal, pas depuis les tables : il correspond exactement aux ids
+        enregistrés.
+        """
+        previous = HistorySnapshot.query.order_by(HistorySnapshot.id.desc()).first()
+        after = HistoryService._snapshot_ids(previous)
+        until = tuple(
+            db.session.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+            for model in (TaskHistory, ProjectHistory, EtpEntryHistory)
+        )
+        changes = sum(until) - sum(after)
+        if changes <= 0 or changes < min_changes:
+            return None
+
+        state = HistoryService._snapshot_state(previous)
+        last_change = HistoryService._replay(state, after, until=until)
+        snapshot = HistorySnapshot(
+            taken_at=last_change or previous.taken_at,
+            task_history_id=until[0],
+            project_history_id=until[1],
+            etp_entry_history_id=until[2],
+            tasks=len(state.tasks),
+            payload=HistoryService._encode(state),
+            created_at=datetime.utcnow()
+        )
+        db.session.add(snapshot)
+        db.session.commit()
+        return snapshot
+
+    @staticmethod
+    def task_history(task_id: int) -> List[Dict]:
+        """Versions successives d'une tâche, de la plus ancienne à la plus récente"""
+        history = []
+        text = comment = None
+        for row in db.session.query(TaskHistory).filter(TaskHistory.task_id == task_id).order_by(TaskHistory.id):
+            if row.operation == 'D':
+                history.append({'changed_at': row.changed_at.isoformat(), 'operation': 'deleted'})
+                continue
+            text = row.text if row.text is not None else text
+            comment = row.comment if row.comment is not None else comment
+            history.append({
+                'changed_at': row.changed_at.isoformat(),
+                'operation': 'created' if row.operation == 'I' else 'updated',
+                'project_id': row.project_id,
+                'text': text,
+                'comment': comment or '',
+                'start_date': row.start_date.isoformat(),
+                'end_date': row.end_date.isoformat(),
+                'color': row.color,
+                'etp': row.etp,
+                'version': row.version
+            })
+        return history
+
+    @staticmethod
+    def stats() -> Dict:
+        """Taille du journal et des snapshots"""
+        counts = {
+            model.__tablename__: db.session.query(func.count(model.id)).scalar()
+            for model in (TaskHistory, ProjectHistory, EtpEntryHistory, HistorySnapshot)
+        }
+        last = HistorySnapshot.query.order_by(HistorySnapshot.id.desc()).first()
+        counts['snapshot_bytes'] = db.session.query(func.coalesce(func.sum(func.length(HistorySnapshot.payload)), 0)) \
+            .scalar()
+        counts['last_snapshot'] = last.taken_at.isoformat() if last else None
+        return counts
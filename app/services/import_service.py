@@ -0,0 +1,247 @@
+import csv
+import io
+import re
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+from sqlalchemy import bindparam, func, or_
+from app import db, response_cache, change_feed
+from app.models import Project, Task
+from app.services.etp_service import EtpService
+from app.services.project_service import ProjectService
+
+class ImportService:
+    """Import en masse de tâches (création ou mise à jour) en une transaction.
+
+    Toutes les lignes sont validées en une passe, les projets sont résolus en
+    une requête et les écritures passent par des INSERT/UPDATE Core exécutés
+    en executemany, sans instancier d'objets ORM.
+    """
+    COLOR_INTENSITIES = ['600', '500', '400']
+    # Couleur explicite : schéma et intensité (blue-500)
+    COLOR_PATTERN = re.compile(r'[a-z]+-\d+')
+    # Taille des lots pour les clauses IN (limite de variables SQLite)
+    CHUNK_SIZE = 500
+
+    @staticmethod
+    def parse_csv(content: str) -> List[Dict]:
+        """Lit un CSV avec en-têtes (project ou project_id, text, start_date, end_date, ...)"""
+        return list(csv.DictReader(io.StringIO(content)))
+
+    @staticmethod
+    def _parse_date(value) -> date:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        # fromisoformat (implémenté en C) est bien plus rapide que strptime
+        return date.fromisoformat(str(value).strip())
+
+    @staticmethod
+    def _chunks(values: List, size: int) -> Iterable[List]:
+        for i in range(0, len(values), size):
+            yield values[i:i + size]
+
+    @staticmethod
+    def _resolve_projects(rows: List[Dict]) -> Dict:
+        """Résout noms et ids de projets en une seule requête"""
+        rows = [row for row in rows if isinstance(row, dict)]
+        names = {str(row['project']).strip() for row in rows if row.get('project')}
+        ids = set()
+        for row in rows:
+            try:
+                ids.add(int(row['project_id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        if not names and not ids:
+            return {}
+
+        projects = db.session.query(Project.id, Project.name, Project.color_scheme) \
+            .filter(or_(Project.name.in_(names), Project.id.in_(ids))) \
+            .all()
+        resolved = {}
+        for project in projects:
+            resolved[('name', project.name)] = project
+            resolved[('id', project.id)] = project
+        return resolved
+
+    @staticmethod
+    def _existing_tasks(task_ids: List[int]) -> Dict[int, tuple]:
+        """Retourne {id: (project_id, color, comment, etp)} pour les tâches existantes"""
+        existing = {}
+        for chunk in ImportService._chunks(task_ids, ImportService.CHUNK_SIZE):
+            for task_id, project_id, color, comment, etp in db.session.query(
+                    Task.id, Task.project_id, Task.color, Task.comment, Task.etp).filter(Task.id.in_(chunk)):
+                existing[task_id] = (project_id, color, comment, etp)
+        return existing
+
+    @staticmethod
+    def _task_counts(project_ids: List[int]) -> Counter:
+        counts = Counter()
+        for chunk in ImportService._chunks(project_ids, ImportService.CHUNK_SIZE):
+            counts.update(dict(
+                db.session.query(Task.project_id, func.count(Task.id))
+                .filter(Task.project_id.in_(chunk))
+                .group_by(Task.project_id)
+            ))
+        return counts
+
+    @staticmethod
+    def _validate_row(row: Dict, projects: Dict) -> Dict:
+        """Valide une ligne et retourne les valeurs à écrire (lève ValueError).
+
+        `comment` et `etp` ne figurent dans le résultat que s'ils sont fournis
+        (voir import_tasks pour les valeurs par défaut).
+        """
+        if not isinstance(row, dict):
+            raise ValueError("Chaque ligne doit être un objet")
+        if row.get('project'):
+            project = projects.get(('name', str(row['project']).strip()))
+        elif row.get('project_id') not in (None, ''):
+            try:
+                project = projects.get(('id', int(row['project_id'])))
+            except (TypeError, ValueError):
+                raise ValueError(f"project_id invalide : {row['project_id']!r}")
+        else:
+            raise ValueError("Le projet (project ou project_id) est requis")
+        if project is None:
+            raise ValueError(f"Projet inconnu : {row.get('project') or row.get('project_id')}")
+
+        # etp vide et comment absent : valeurs conservées (mise à jour) ou par défaut (création)
+        values = {'text': '' if row.get('text') is None else row['text']}
+        if row.get('etp') not in (None, ''):
+            values['etp'] = row['etp']
+        if row.get('comment') is not None:
+            values['comment'] = row['comment']
+        values = ProjectService.check_task_fields(values)
+
+        try:
+            start_date = ImportService._parse_date(row['start_date'])
+            end_date = ImportService._parse_date(row['end_date'])
+        except KeyError as e:
+            raise ValueError(f"Le champ {e.args[0]} est requis")
+        except ValueError:
+            raise ValueError("Dates invalides (format attendu : AAAA-MM-JJ)")
+        ProjectService.check_task_dates(start_date, end_date)
+
+        color = row.get('color')
+        if color not in (None, ''):
+            if not isinstance(color, str) or not ImportService.COLOR_PATTERN.fullmatch(color.strip()):
+                raise ValueError(f"Couleur invalide : {color!r} (attendu : schéma-intensité, par exemple blue-500)")
+            color = color.strip()
+        else:
+            color = None
+
+        task_id = row.get('id')
+        if task_id not in (None, ''):
+            try:
+                task_id = int(task_id)
+            except (TypeError, ValueError):
+                raise ValueError(f"id invalide : {task_id!r}")
+        else:
+            task_id = None
+
+        return {
+            **values,
+            'id': task_id,
+            'project_id': project.id,
+            'color_scheme': project.color_scheme,
+            'start_date': start_date,
+            'end_date': end_date,
+            'color': color
+        }
+
+    @staticmethod
+    def import_tasks(rows: List[Dict], dry_run: bool = False) -> Dict:
+        """Valide puis crée/met à jour les tâches ; les lignes invalides sont ignorées et rapportées.
+
+        Une ligne avec un `id` met à jour la tâche existante, sinon elle crée
+        une nouvelle tâche. Projet, libellé et dates sont requis et toujours
+        écrits ; `comment`, `etp` et `color` absents conservent la valeur de la
+        tâche mise à jour (une création prend comment vide, etp 1.0 et la
+        couleur du projet), un commentaire "" l'efface. Les numéros de ligne
+        du rapport commencent à 1.
+        """
+        started = time.perf_counter()
+        projects = ImportService._resolve_projects(rows)
+
+        valid, errors = [], []
+        for index, row in enumerate(rows, start=1):
+            try:
+                valid.append((index, ImportService._validate_row(row, projects)))
+            except ValueError as e:
+                errors.append({'row': index, 'error': str(e)})
+
+        update_ids = [values['id'] for _, values in valid if values['id'] is not None]
+        existing = ImportService._existing_tasks(update_ids) if update_ids else {}
+        inserts, updates = [], []
+        touched = set()
+        for index, values in valid:
+            if values['id'] is None:
+                values.setdefault('comment', None)
+                values.setdefault('etp', 1.0)
+                inserts.append(values)
+            elif values['id'] in existing:
+                previous_project_id, previous_color, previous_comment, previous_etp = existing[values['id']]
+                values.setdefault('comment', previous_comment)
+                values.setdefault('etp', previous_etp)
+                if values['color'] is None:
+                    # Même règle que update_task : on garde l'intensité, on prend le schéma du projet
+                    if previous_project_id != values['project_id']:
+                        values['color'] = ProjectService.recolored(previous_color, values['color_scheme'])
+                    else:
+                        values['color'] = previous_color
+                touched.add(previous_project_id)
+                updates.append(values)
+            else:
+                errors.append({'row': index, 'error': f"Tâche {values['id']} introuvable"})
+                continue
+            touched.add(values['project_id'])
+
+        # Couleur par défaut : schéma du projet, intensité selon le rang de la tâche
+        counts = ImportService._task_counts(list({values['project_id'] for values in inserts}))
+        for values in inserts:
+            if values['color'] is None:
+                intensities = ImportService.COLOR_INTENSITIES
+                values['color'] = f"{values['color_scheme']}-{intensities[counts[values['project_id']] % len(intensities)]}"
+            counts[values['project_id']] += 1
+
+        if not dry_run and touched:
+            try:
+                columns = ['project_id', 'text', 'comment', 'start_date', 'end_date', 'color', 'etp']
+                now = datetime.utcnow()
+                table = Task.__table__
+                if inserts:
+                    db.session.execute(
+                        table.insert(),
+                        [{**{c: values[c] for c in columns}, 'created_at': now, 'updated_at': now}
+                         for values in inserts]
+                    )
+                if updates:
+                    statement = table.update() \
+                        .where(table.c.id == bindparam('task_id')) \
+                        .values({**{c: bindparam(c) for c in columns}, 'updated_at': now,
+                                 'version': table.c.version + 1})
+                    db.session.execute(statement, [
+                        {'task_id': values['id'], **{c: values[c] for c in columns}}
+                        for values in updates
+                    ])
+                EtpService.refresh_project_aggregates(touched)
+                change_feed.record('tasks.imported', created=len(inserts), updated=len(updates),
+                                   project_ids=sorted(touched))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            response_cache.bump()
+
+        duration = time.perf_counter() - started
+        return {
+            'created': len(inserts),
+            'updated': len(updates),
+            'errors': sorted(errors, key=lambda error: error['row']),
+            'dry_run': dry_run,
+            'duration': round(duration, 3),
+            'rows_per_second': round(len(rows) / duration) if duration else None
+        }
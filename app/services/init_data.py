@@ -1,7 +1,8 @@
 from datetime import date
 from typing import List, Dict
 from app import db
-from app.models import Project, Task
+from app.models import Project
+from app.services.import_service import ImportService
 
 def init_db_data():
     """Initialise les données dans la base de données."""
@@ -168,27 +169,24 @@ def init_db_data():
     ]
 
     try:
-        # Création des projets et de leurs tâches
+        # Création des projets
+        projects = {}
         for project_data in projects_data:
-            # Créer le projet
             project = Project(name=project_data["name"])
             db.session.add(project)
-            db.session.flush()  # Pour obtenir l'ID du projet
-            
-            # Créer les tâches associées
-            for task_data in project_data["tasks"]:
-                task = Task(
-                    project_id=project.id,
-                    text=task_data["text"],
-                    start_date=task_data["start_date"],
-                    end_date=task_data["end_date"],
-                    color=task_data["color"],
-                    etp=task_data["etp"]
-                )
-                db.session.add(task)
+            projects[project_data["name"]] = project
+        db.session.flush()  # Pour obtenir les IDs des projets
+        
+        # Création des tâches en un seul lot (validation + insertion + commit)
+        rows = [
+            {"project_id": projects[project_data["name"]].id, **task_data}
+            for project_data in projects_data
+            for task_data in project_data["tasks"]
+        ]
+        report = ImportService.import_tasks(rows)
+        if report["errors"]:
+            raise ValueError(f"Tâches invalides : {report['errors']}")
         
-        # Commit de toutes les modifications
-        db.session.commit()
         print("Données initiales chargées avec succès")
         
     except Exception as e:
@@ -1,19 +1,56 @@
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 from datetime import date
-from app import db
-from typing import List, Optional
-from datetime import date
-from app import db
+from app import db, change_feed
+from app.constants import TimeConstants
 from app.models import Project, Task
 from app.services.etp_service import EtpService
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import String, func, literal, update
+from sqlalchemy.orm.exc import StaleDataError
 
 class ProjectService:
     COLOR_INTENSITIES = ['600', '500', '400']
+    # Longueur de la colonne tasks.text
+    TEXT_MAX_LENGTH = 200
     @staticmethod
     def get_all_projects() -> List[Project]:
         return Project.query.all()
     
+    @staticmethod
+    def get_timeline_page_fingerprints(
+        window_start: date,
+        window_end: date,
+        after_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Tuple[List[Tuple], Optional[int]]:
+        """Page de projets de la timeline, sans charger d'objets ORM.
+
+        Pagination par curseur (id du dernier projet de la page précédente) ;
+        une tâche est visible si elle chevauche [window_start, window_end].
+        Retourne pour chaque projet (id, name, color_scheme, version, tâches)
+        où tâches est l'ensemble des (id, version) des tâches visibles, et le
+        curseur suivant. Sert de clé au cache de fragments de la timeline : toute
+        écriture incrémente la version des lignes touchées.
+        """
+        query = db.session.query(Project.id, Project.name, Project.color_scheme, Project.version) \
+            .order_by(Project.id)
+        if after_id is not None:
+            query = query.filter(Project.id > after_id)
+        
+        rows = query.limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        rows = rows[:limit]
+        
+        tasks = defaultdict(set)
+        if rows:
+            for project_id, task_id, version in db.session.query(Task.project_id, Task.id, Task.version).filter(
+                    Task.project_id.between(rows[0].id, rows[-1].id),
+                    Task.end_date >= window_start,
+                    Task.start_date <= window_end):
+                tasks[project_id].add((task_id, version))
+        return [(*row, frozenset(tasks[row.id])) for row in rows], next_cursor
+    
     @staticmethod
     def get_project_by_id(project_id: int) -> Optional[Project]:
         return Project.query.get(project_id)
@@ -27,12 +64,49 @@ class ProjectService:
         project = Project(name=name, color_scheme=color_scheme)
         db.session.add(project)
         try:
+            db.session.flush()
+            EtpService.refresh_project_aggregate(project.id)
+            change_feed.record('project.created', id=project.id, name=project.name, color_scheme=project.color_scheme)
             db.session.commit()
             return project
         except IntegrityError:
             db.session.rollback()
             raise ValueError(f"Project with name '{name}' already exists")
     
+    @staticmethod
+    def check_task_dates(start_date: date, end_date: date) -> None:
+        """Lève ValueError si les dates d'une tâche sont inversées ou hors de la plage acceptée"""
+        if end_date < start_date:
+            raise ValueError("La date de fin précède la date de début")
+        if start_date < TimeConstants.TASK_DATE_MIN or end_date > TimeConstants.TASK_DATE_MAX:
+            raise ValueError(f"Dates hors de la plage acceptée ({TimeConstants.TASK_DATE_MIN.isoformat()} "
+                             f"au {TimeConstants.TASK_DATE_MAX.isoformat()})")
+
+    @staticmethod
+    def check_task_fields(values: Dict) -> Dict:
+        """Copie de `values` où text, comment et etp, s'ils sont présents, sont validés.
+
+        Le libellé est une chaîne non vide (espaces de bord retirés) d'au plus
+        TEXT_MAX_LENGTH caractères, le commentaire une chaîne ou None ("" devient
+        None), l'ETP un nombre fini positif (EtpService.parse_etp). Lève ValueError sinon.
+        """
+        values = dict(values)
+        if 'text' in values:
+            if not isinstance(values['text'], str):
+                raise ValueError("Le champ text doit être une chaîne")
+            values['text'] = values['text'].strip()
+            if not values['text']:
+                raise ValueError("Le champ text est requis")
+            if len(values['text']) > ProjectService.TEXT_MAX_LENGTH:
+                raise ValueError(f"Le champ text dépasse {ProjectService.TEXT_MAX_LENGTH} caractères")
+        if 'comment' in values:
+            if values['comment'] is not None and not isinstance(values['comment'], str):
+                raise ValueError("Le champ comment doit être une chaîne")
+            values['comment'] = values['comment'] or None
+        if 'etp' in values:
+            values['etp'] = EtpService.parse_etp(values['etp'])
+        return values
+
     @staticmethod
     def create_task(
         project_id: int,
@@ -44,6 +118,8 @@ class ProjectService:
         comment: str = None
     ) -> Optional[Task]:
         try:
+            fields = ProjectService.check_task_fields({'text': text, 'etp': etp, 'comment': comment})
+            ProjectService.check_task_dates(start_date, end_date)
             # Récupérer le projet pour obtenir son schéma de couleur
             project = Project.query.get(project_id)
             if not project:
@@ -59,15 +135,16 @@ class ProjectService:
             print(f"Creating task in service: {project_id}, {text}, {start_date}-{end_date}, {color}")
             task = Task(
                 project_id=project_id,
-                text=text,
-                comment=comment,
                 start_date=start_date,
                 end_date=end_date,
                 color=color,
-                etp=etp
+                **fields
             )
             
             db.session.add(task)
+            db.session.flush()
+            EtpService.refresh_project_aggregate(project_id)
+            change_feed.record('task.created', id=task.id, project_id=project_id)
             db.session.commit()
             
             # Vérifier que la tâche a bien été créée
@@ -90,10 +167,53 @@ class ProjectService:
         if not task:
             return False
             
+        project_id = task.project_id
         db.session.delete(task)
+        db.session.flush()
+        EtpService.refresh_project_aggregate(project_id)
+        change_feed.record('task.deleted', id=task_id, project_id=project_id)
         db.session.commit()
         return True
     
+    @staticmethod
+    def recolored(color: str, color_scheme: str) -> str:
+        """Couleur « schéma-intensité » qui conserve l'intensité de `color` (texte après le dernier '-')"""
+        return f"{color_scheme}-{color.rsplit('-', 1)[-1]}"
+
+    @staticmethod
+    def recolored_task_color(color_scheme: str):
+        """Expression SQL de recolored() sur tasks.color, identique sous SQLite et PostgreSQL"""
+        # rtrim retire en fin de chaîne tout caractère autre que '-' : reste le préfixe jusqu'au dernier '-'
+        prefix = func.rtrim(Task.color, func.replace(Task.color, '-', ''))
+        return literal(f"{color_scheme}-", String).concat(func.substr(Task.color, func.length(prefix) + 1))
+    
+    @staticmethod
+    def recolor_project(project_id: int, color_scheme: str, expected_version: Optional[int] = None) -> int:
+        """Change le schéma de couleur d'un projet et de toutes ses tâches (sans commit).
+
+        Les tâches sont mises à jour par un seul UPDATE ensembliste, sans être
+        chargées. Avec `expected_version`, le projet n'est modifié que s'il est
+        toujours à cette version (StaleDataError sinon), comme un flush ORM.
+        Retourne le nombre de tâches modifiées.
+        """
+        statement = update(Project).where(Project.id == project_id)
+        if expected_version is not None:
+            statement = statement.where(Project.version == expected_version)
+        result = db.session.execute(
+            statement.values(color_scheme=color_scheme, version=Project.version + 1),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount != 1:
+            raise StaleDataError(f"Projet {project_id} modifié entre-temps")
+        result = db.session.execute(
+            update(Task)
+            .where(Task.project_id == project_id)
+            .values(color=ProjectService.recolored_task_color(color_scheme), version=Task.version + 1),
+            execution_options={'synchronize_session': False}
+        )
+        change_feed.record('project.recolored', id=project_id, color_scheme=color_scheme)
+        return result.rowcount
+    
     @staticmethod
     def delete_project(project_id: int) -> bool:
         project = Project.query.get(project_id)
@@ -101,6 +221,7 @@ class ProjectService:
             return False
             
         db.session.delete(project)
+        change_feed.record('project.deleted', id=project_id)
         db.session.commit()
         return True
 
@@ -0,0 +1,339 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Task, TaskHistory, TimelineRollup, TimelineRollupState
+from app.models.rollup import PORTFOLIO
+from app.periods import PeriodCalendar
+from app.rollups import LEVELS, RollupDelta, bucket_count, bucket_index, bucket_start, bucket_stop
+
+ONE_DAY = timedelta(days=1)
+
+
+class RollupService:
+    """Pyramide de cumuls de la timeline (jour, semaine, mois, trimestre, année).
+
+    Les cumuls sont tenus à jour depuis le journal task_history : toute
+    écriture sur les tâches (ORM, lots, imports, suppressions) y laisse une
+    ligne, et catch_up applique celles qui suivent le curseur en retirant
+    l'ancien état de chaque tâche touchée et en ajoutant le nouveau. Une mise
+    à jour coûte en fonction des tâches modifiées, une lecture en fonction du
+    nombre de seaux demandés, quel que soit le nombre de tâches.
+    """
+
+    BATCH_ROWS = 20000
+    CHUNK_SIZE = 500
+    # PostgreSQL : dernier id du journal relevé alors que des transactions étaient
+    # en cours, et xmax de l'instantané du relevé (voir _settled_history_id)
+    _pending = None
+
+    @staticmethod
+    def _lock_history() -> None:
+        """Postgres : attend la fin des écritures en cours sur les tâches et bloque les suivantes.
+
+        Réservé à la reconstruction (rare) : sans ce verrou, une transaction
+        encore ouverte pourrait valider plus tard une ligne de journal d'id
+        inférieur au curseur posé. SQLite sérialise déjà les écritures.
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            db.session.execute(text('LOCK TABLE task_history IN EXCLUSIVE MODE'))
+
+    @staticmethod
+    def _settled_history_id(cursor: int) -> int:
+        """Plus grand id du journal sous lequel aucune ligne ne peut plus apparaître.
+
+        SQLite sérialise les écritures : c'est le dernier id. Sous PostgreSQL,
+        les ids sont attribués à l'insertion et non à la validation : une
+        transaction en cours peut encore valider un id inférieur au dernier
+        visible. Sans transaction en cours dans l'instantané, le dernier id est
+        sûr ; sinon il est retenu, et ne devient sûr qu'une fois terminées
+        toutes les transactions alors en cours (xmin courant >= xmax du relevé).
+        Les écritures ne sont jamais bloquées ; les cumuls peuvent avoir un
+        rattrapage de retard sous écriture continue.
+        """
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return RollupService._last_history_id()
+
+        last_id, xmin, xmax, busy = db.session.execute(text(
+            "SELECT (SELECT coalesce(max(id), 0) FROM task_history), "
+            "pg_snapshot_xmin(s)::text::bigint, pg_snapshot_xmax(s)::text::bigint, "
+            "EXISTS (SELECT 1 FROM pg_snapshot_xip(s)) "
+            "FROM pg_current_snapshot() s"
+        )).one()
+        if not busy:
+            RollupService._pending = None
+            return last_id
+        pending = RollupService._pending
+        if pending is None or pending[1] <= xmin:
+            RollupService._pending = (last_id, xmax)
+        if pending is not None and pending[1] <= xmin:
+            return max(pending[0], cursor)
+        return cursor
+
+    @staticmethod
+    def _cursor() -> Optional[int]:
+        return db.session.execute(
+            select(TimelineRollupState.task_history_id).where(TimelineRollupState.id == 1)
+        ).scalar()
+
+    @staticmethod
+    def _last_history_id() -> int:
+        return db.session.execute(select(func.coalesce(func.max(TaskHistory.id), 0))).scalar()
+
+    @staticmethod
+    def _upsert_statement():
+        """INSERT ... ON CONFLICT DO UPDATE qui ajoute les variations aux cumuls existants.
+
+        Exécuté avec une liste de lignes (executemany) : l'instruction n'est
+        compilée qu'une fois, quel que soit le nombre de seaux modifiés.
+        """
+        # Dialectes vérifiés au démarrage (app.database.SUPPORTED_DIALECTS)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        table = TimelineRollup.__table__
+        statement = dialect_insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=['level', 'project_id', 'bucket'],
+            set_={
+                'task_count': table.c.task_count + statement.excluded.task_count,
+                'etp_milli': table.c.etp_milli + statement.excluded.etp_milli,
+                'etp_days_milli': table.c.etp_days_milli + statement.excluded.etp_days_milli
+            }
+        )
+
+    @staticmethod
+    def _rows(delta: RollupDelta) -> List[Dict]:
+        if delta.invalid_etp:
+            current_app.logger.warning("Cumuls de la timeline : %d tâche(s) à l'ETP non fini comptée(s) avec un ETP nul",
+                                       delta.invalid_etp)
+        return [
+            {'level': level, 'project_id': project_id, 'bucket': bucket,
+             'task_count': count, 'etp_milli': etp, 'etp_days_milli': etp_days}
+            for level, project_id, bucket, count, etp, etp_days in delta.rows()
+        ]
+
+    @staticmethod
+    def rebuild() -> Dict[str, int]:
+        """Recalcule tous les cumuls depuis la table des tâches et place le curseur en fin de journal"""
+        try:
+            RollupService._lock_history()
+            cursor = RollupService._last_history_id()
+            delta = RollupDelta()
+            for project_id, start_date, end_date, etp in db.session.execute(
+                    select(Task.project_id, Task.start_date, Task.end_date, Task.etp)):
+                delta.add(project_id, start_date, end_date, etp)
+            rows = RollupService._rows(delta)
+
+            db.session.execute(delete(TimelineRollup))
+            if rows:
+                db.session.execute(TimelineRollup.__table__.insert(), rows)
+
+            now = datetime.utcnow()
+            if RollupService._cursor() is None:
+                db.session.execute(insert(TimelineRollupState).values(
+                    id=1, task_history_id=cursor, rebuilt_at=now, updated_at=now))
+            else:
+                db.session.execute(update(TimelineRollupState).where(TimelineRollupState.id == 1).values(
+                    task_history_id=cursor, rebuilt_at=now, updated_at=now))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return {'rows': len(rows), 'task_history_id': cursor}
+
+    @staticmethod
+    def catch_up() -> int:
+        """Applique aux cumuls les lignes du journal postérieures au curseur.
+
+        Retourne le nombre de lignes appliquées. Les cumuls absents (base
+        migrée, `flask rollups rebuild` jamais lancé) sont d'abord construits
+        depuis les tâches. Deux rattrapages simultanés sont départagés par la
+        mise à jour conditionnelle du curseur : le second annule le sien.
+        """
+        applied = settled = 0
+        while True:
+            cursor = RollupService._cursor()
+            if cursor is None:
+                try:
+                    RollupService.rebuild()
+                except IntegrityError:
+                    # Construits au même moment par une autre requête
+                    db.session.rollback()
+                continue
+            if settled <= cursor:
+                settled = RollupService._settled_history_id(cursor)
+                if settled <= cursor:
+                    return applied
+
+            try:
+                rows = db.session.execute(
+                    select(TaskHistory.id, TaskHistory.task_id, TaskHistory.operation, TaskHistory.project_id,
+                           TaskHistory.start_date, TaskHistory.end_date, TaskHistory.etp)
+                    .where(TaskHistory.id > cursor, TaskHistory.id <= settled)
+                    .order_by(TaskHistory.id)
+                    .limit(RollupService.BATCH_ROWS)
+                ).all()
+                delta = RollupService._delta(cursor, rows)
+
+                rollup_rows = RollupService._rows(delta)
+                if rollup_rows:
+                    db.session.execute(RollupService._upsert_statement(), rollup_rows)
+                # Seaux qui ont perdu des tâches : supprimés s'ils n'en contiennent plus
+                emptied = [{'emptied_level': row['level'], 'emptied_project_id': row['project_id'],
+                            'emptied_bucket': row['bucket']} for row in rollup_rows if row['task_count'] < 0]
+                if emptied:
+                    table = TimelineRollup.__table__
+                    db.session.execute(
+                        table.delete().where(table.c.level == bindparam('emptied_level'),
+                                             table.c.project_id == bindparam('emptied_project_id'),
+                                             table.c.bucket == bindparam('emptied_bucket'),
+                                             table.c.task_count <= 0),
+                        emptied
+                    )
+
+                moved = db.session.execute(
+                    update(TimelineRollupState)
+                    .where(TimelineRollupState.id == 1, TimelineRollupState.task_history_id == cursor)
+                    .values(task_history_id=rows[-1].id, updated_at=datetime.utcnow())
+                )
+                if moved.rowcount != 1:
+                    # Un autre rattrapage a avancé le curseur entre-temps
+                    db.session.rollback()
+                    continue
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            applied += len(rows)
+
+    @staticmethod
+    def _delta(cursor: int, rows) -> RollupDelta:
+        """Variation des cumuls entre l'état des tâches au curseur et après `rows`"""
+        final = {}
+        for row in rows:
+            final[row.task_id] = row
+
+        # État de chaque tâche touchée au curseur : sa dernière ligne d'id <= curseur
+        previous = {}
+        task_ids = list(final)
+        for i in range(0, len(task_ids), RollupService.CHUNK_SIZE):
+            latest = select(func.max(TaskHistory.id)) \
+                .where(TaskHistory.task_id.in_(task_ids[i:i + RollupService.CHUNK_SIZE]),
+                       TaskHistory.id <= cursor) \
+                .group_by(TaskHistory.task_id)
+            for row in db.session.execute(
+                    select(TaskHistory.task_id, TaskHistory.operation, TaskHistory.project_id,
+                           TaskHistory.start_date, TaskHistory.end_date, TaskHistory.etp)
+                    .where(TaskHistory.id.in_(latest))):
+                previous[row.task_id] = row
+
+        delta = RollupDelta()
+        for task_id, row in final.items():
+            before = previous.get(task_id)
+            before = None if before is None or before.operation == 'D' else \
+                (before.project_id, before.start_date, before.end_date, before.etp)
+            after = None if row.operation == 'D' else (row.project_id, row.start_date, row.end_date, row.etp)
+            if before == after:
+                continue
+            if before is not None:
+                delta.add(*before, sign=-1)
+            if after is not None:
+                delta.add(*after)
+        return delta
+
+    @staticmethod
+    def choose_level(start: date, end: date, max_buckets: int) -> str:
+        """Niveau le plus fin qui couvre [start, end] en `max_buckets` seaux au plus"""
+        for level in LEVELS:
+            if bucket_count(level, start, end) <= max_buckets:
+                return level
+        return LEVELS[-1]
+
+    @staticmethod
+    def zoom(
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        level: str = 'auto',
+        buckets: int = 100,
+        max_buckets: int = 1000,
+        project_id: Optional[int] = None,
+        by_project: bool = False
+    ) -> Dict:
+        """Cumuls de [start, end] à un niveau donné, ou au plus fin tenant en `buckets` seaux (auto).
+
+        Les seaux sont entiers : le premier et le dernier peuvent déborder de
+        la plage. Chaque seau donne le nombre de tâches actives, la somme de
+        leurs ETP, la charge (ETP x jours) et l'ETP moyen par jour. Par défaut
+        la plage couvre le calendrier des périodes ETP ; `project_id` limite
+        la série à un projet, `by_project` ajoute celle de chaque projet
+        (projets sans tâche sur la plage omis).
+        """
+        if start is None or end is None:
+            calendar = PeriodCalendar.current()
+            start = start or calendar.periods[0].start
+            end = end or calendar.periods[-1].end - ONE_DAY
+        if end < start:
+            raise ValueError("La date de fin doit être postérieure à la date de début")
+        if level == 'auto':
+            if buckets < 1:
+                raise ValueError("buckets doit être positif")
+            level = RollupService.choose_level(start, end, min(buckets, max_buckets))
+        elif level not in LEVELS:
+            raise ValueError(f"Niveau inconnu : {level} (attendu : auto, {', '.join(LEVELS)})")
+        count = bucket_count(level, start, end)
+        if count > max_buckets:
+            raise ValueError(f"{count} seaux de niveau {level} demandés (maximum {max_buckets})")
+
+        try:
+            RollupService.catch_up()
+        except Exception as e:
+            # Erreur côté serveur (journal illisible, base) : ni la faute ni le ressort du lecteur
+            current_app.logger.exception("Rattrapage des cumuls de la timeline impossible")
+            raise RuntimeError("Cumuls de la timeline indisponibles") from e
+
+        first = bucket_index(level, start)
+        last = first + count - 1
+        query = select(TimelineRollup.project_id, TimelineRollup.bucket, TimelineRollup.task_count,
+                       TimelineRollup.etp_milli, TimelineRollup.etp_days_milli) \
+            .where(TimelineRollup.level == level,
+                   TimelineRollup.bucket >= bucket_start(level, first),
+                   TimelineRollup.bucket <= bucket_start(level, last))
+        series_id = PORTFOLIO if project_id is None else project_id
+        by_project = by_project and project_id is None
+        if not by_project:
+            query = query.where(TimelineRollup.project_id == series_id)
+        stored = {}
+        for row in db.session.execute(query):
+            stored.setdefault(row.project_id, {})[row.bucket] = row
+
+        def series(values: Dict) -> List[Dict]:
+            result = []
+            for index in range(first, last + 1):
+                bucket = bucket_start(level, index)
+                stop = bucket_stop(level, index)
+                row = values.get(bucket)
+                task_count, etp, etp_days = (row.task_count, row.etp_milli, row.etp_days_milli) if row else (0, 0, 0)
+                result.append({
+                    'start': bucket.isoformat(),
+                    'end': date.fromordinal(stop - 1).isoformat(),
+                    'tasks': task_count,
+                    'etp': etp / 1000,
+                    'etp_days': etp_days / 1000,
+                    'etp_avg': round(etp_days / (stop - bucket.toordinal()) / 1000, 3)
+                })
+            return result
+
+        result = {
+            'level': level,
+            'start': bucket_start(level, first).isoformat(),
+            'end': date.fromordinal(bucket_stop(level, last) - 1).isoformat(),
+        }
+        result['buckets'] = series(stored.pop(series_id, {}))
+        if by_project:
+            result['projects'] = {key: series(values) for key, values in sorted(stored.items())}
+        return result
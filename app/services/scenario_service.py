@@ -0,0 +1,441 @@
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Project, Scenario, ScenarioTask, ScenarioEtpEntry, Task
+from app.periods import PeriodCalendar
+from app.scenarios import ScenarioOverlay, TASK_FIELDS
+from app.services.etp_service import EtpService
+from app.services.project_service import ProjectService
+
+CHUNK_SIZE = 500
+
+
+def add_months(value: date, months: int) -> date:
+    """Décale une date d'un nombre de mois, en ramenant le jour au dernier jour du mois si besoin"""
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, monthrange(year, month)[1]))
+
+
+class ScenarioEdit:
+    """État d'un scénario pendant l'application d'opérations (copie sur écriture).
+
+    Seules les tâches visées par les opérations sont lues dans le réel ; les
+    écarts existants du scénario sont repris, puis `save` réécrit les écarts
+    des seules tâches et cellules touchées.
+    """
+
+    def __init__(self, scenario_id: int):
+        self.scenario_id = scenario_id
+        overlay = ScenarioOverlay.load(scenario_id)
+        self.changes = {
+            task_id: {
+                **{field: getattr(row, field) for field in TASK_FIELDS if getattr(row, field) is not None},
+                'removed': row.removed,
+                'base_version': row.base_version
+            }
+            for task_id, row in overlay.tasks.items()
+        }
+        self.cells = dict(overlay.etp_entries)
+        self.base = {}
+        self.touched_tasks = set()
+        self.touched_cells = set()
+
+    def load(self, task_ids: List[int]) -> None:
+        """Lit les lignes réelles des tâches ; lève ValueError si une tâche n'existe pas"""
+        wanted = [task_id for task_id in task_ids if task_id not in self.base]
+        for i in range(0, len(wanted), CHUNK_SIZE):
+            for row in db.session.query(Task.id, Task.project_id, Task.start_date, Task.end_date,
+                                        Task.color, Task.etp, Task.version).filter(Task.id.in_(wanted[i:i + CHUNK_SIZE])):
+                self.base[row.id] = row
+        missing = set(task_ids) - self.base.keys()
+        if missing:
+            raise ValueError(f"Tâches introuvables : {sorted(missing)}")
+
+    def current(self, task_id: int) -> Dict:
+        """Valeurs de la tâche dans le scénario (après load)"""
+        change = self.changes.get(task_id, {})
+        if change.get('removed'):
+            raise ValueError(f"Tâche {task_id} retirée du scénario")
+        base = self.base[task_id]
+        return {field: change.get(field, getattr(base, field)) for field in TASK_FIELDS}
+
+    def set(self, task_id: int, **values) -> None:
+        change = self.changes.setdefault(task_id, {'removed': False, 'base_version': self.base[task_id].version})
+        change.update(values)
+        self.touched_tasks.add(task_id)
+
+    def reset(self, task_id: int) -> None:
+        self.changes.pop(task_id, None)
+        self.touched_tasks.add(task_id)
+
+    def set_cell(self, project_id: int, period: str, etp_value: Optional[float]) -> None:
+        self.cells[(project_id, period)] = etp_value
+        self.touched_cells.add((project_id, period))
+
+    def reset_cell(self, project_id: int, period: str) -> None:
+        self.cells.pop((project_id, period), None)
+        self.touched_cells.add((project_id, period))
+
+    def project_task_ids(self, project_id: int) -> List[int]:
+        """Tâches du projet dans le scénario (déplacements et retraits compris)"""
+        task_ids = {task_id for task_id, in db.session.query(Task.id).filter(Task.project_id == project_id)}
+        for task_id, change in self.changes.items():
+            if change.get('removed') or ('project_id' in change and change['project_id'] != project_id):
+                task_ids.discard(task_id)
+            elif change.get('project_id') == project_id:
+                task_ids.add(task_id)
+        return sorted(task_ids)
+
+    def save(self) -> None:
+        """Réécrit les écarts touchés ; un écart identique au réel n'est pas conservé"""
+        touched = sorted(self.touched_tasks)
+        self.load([task_id for task_id in touched if task_id in self.changes])
+        rows = []
+        for task_id in touched:
+            change = self.changes.get(task_id)
+            if change is None:
+                continue
+            base = self.base[task_id]
+            values = {field: change[field] if field in change and change[field] != getattr(base, field) else None
+                      for field in TASK_FIELDS}
+            if change['removed'] or any(value is not None for value in values.values()):
+                rows.append({'scenario_id': self.scenario_id, 'task_id': task_id, **values,
+                             'removed': change['removed'], 'base_version': change['base_version']})
+
+        for i in range(0, len(touched), CHUNK_SIZE):
+            db.session.execute(delete(ScenarioTask).where(
+                ScenarioTask.scenario_id == self.scenario_id,
+                ScenarioTask.task_id.in_(touched[i:i + CHUNK_SIZE])
+            ))
+        if rows:
+            db.session.execute(ScenarioTask.__table__.insert(), rows)
+
+        cells = sorted(self.touched_cells)
+        if cells:
+            db.session.execute(delete(ScenarioEtpEntry).where(
+                ScenarioEtpEntry.scenario_id == self.scenario_id,
+                tuple_(ScenarioEtpEntry.project_id, ScenarioEtpEntry.period).in_(cells)
+            ))
+            rows = [{'scenario_id': self.scenario_id, 'project_id': project_id, 'period': period,
+                     'etp_value': self.cells[(project_id, period)]}
+                    for project_id, period in cells if (project_id, period) in self.cells]
+            if rows:
+                db.session.execute(ScenarioEtpEntry.__table__.insert(), rows)
+
+
+class ScenarioService:
+    """Scénarios « et si » : variantes nommées du portefeuille, stockées comme écarts au réel.
+
+    Opérations supportées (appliquées au scénario, jamais au réel) :
+      - {"op": "shift", "task_ids": [...] ou "project_id": p, "days": n ou "months": n} : décale les dates
+      - {"op": "move", "task_ids": [...], "project_id": p} : change de projet (et de couleur)
+      - {"op": "set_etp", "task_ids": [...], "etp": x} : fixe l'ETP
+      - {"op": "update", "tasks": [{"id", "start_date", "end_date", "etp"}]} : valeurs par tâche
+      - {"op": "remove", "task_ids": [...]} : retire des tâches du scénario
+      - {"op": "set_cells", "entries": [{"project_id", "period", "etp"}]} : saisit des cellules
+        de la table ETP (etp à null : la cellule revient à la valeur calculée)
+      - {"op": "reset", "task_ids": [...], "entries": [{"project_id", "period"}]} : annule des écarts
+
+    Chaque opération part de l'état du scénario (deux décalages s'ajoutent).
+    Une opération invalide annule tout le lot, comme BatchService.
+    """
+    UPDATABLE_FIELDS = ('start_date', 'end_date', 'etp')
+
+    @staticmethod
+    def get_scenario_by_id(scenario_id: int) -> Optional[Scenario]:
+        return db.session.get(Scenario, scenario_id)
+
+    @staticmethod
+    def list_scenarios() -> List[Dict]:
+        """Scénarios avec leur nombre d'écarts, en une requête"""
+        task_count = select(func.count()).where(ScenarioTask.scenario_id == Scenario.id).scalar_subquery()
+        cell_count = select(func.count()).where(ScenarioEtpEntry.scenario_id == Scenario.id).scalar_subquery()
+        rows = db.session.execute(
+            select(Scenario, task_count.label('tasks'), cell_count.label('etp_entries')).order_by(Scenario.id)
+        )
+        return [ScenarioService.to_dict(scenario, tasks=tasks, etp_entries=etp_entries)
+                for scenario, tasks, etp_entries in rows]
+
+    @staticmethod
+    def to_dict(scenario: Scenario, **extra) -> Dict:
+        return {
+            'id': scenario.id,
+            'name': scenario.name,
+            'description': scenario.description or '',
+            'created_at': scenario.created_at.isoformat() if scenario.created_at else None,
+            'updated_at': scenario.updated_at.isoformat() if scenario.updated_at else None,
+            **extra
+        }
+
+    @staticmethod
+    def describe(scenario: Scenario) -> Dict:
+        """Scénario et résumé de ses écarts ; `stale_tasks` liste les tâches modifiées dans le réel depuis"""
+        overlay = ScenarioOverlay.load(scenario.id)
+        return ScenarioService.to_dict(
+            scenario,
+            tasks=len(overlay.tasks),
+            etp_entries=len(overlay.etp_entries),
+            project_ids=sorted(overlay.project_ids),
+            stale_tasks=sorted(overlay.stale_task_ids)
+        )
+
+    @staticmethod
+    def create_scenario(name: str, description: Optional[str] = None) -> Scenario:
+        """Crée un scénario vide : une ligne, quelle que soit la taille du portefeuille"""
+        scenario = Scenario(name=name, description=description)
+        db.session.add(scenario)
+        try:
+            db.session.commit()
+            return scenario
+        except IntegrityError:
+            db.session.rollback()
+            raise ValueError(f"Scenario with name '{name}' already exists")
+
+    @staticmethod
+    def delete_scenario(scenario_id: int) -> bool:
+        scenario = db.session.get(Scenario, scenario_id)
+        if not scenario:
+            return False
+
+        # Écarts supprimés explicitement : SQLite n'applique pas ON DELETE CASCADE par défaut
+        db.session.execute(delete(ScenarioTask).where(ScenarioTask.scenario_id == scenario_id))
+        db.session.execute(delete(ScenarioEtpEntry).where(ScenarioEtpEntry.scenario_id == scenario_id))
+        db.session.delete(scenario)
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def load_overlay(scenario_id: int) -> ScenarioOverlay:
+        if db.session.get(Scenario, scenario_id) is None:
+            raise ValueError(f"Scénario introuvable : {scenario_id}")
+        return ScenarioOverlay.load(scenario_id)
+
+    @staticmethod
+    def _task_ids(operation: Dict) -> List[int]:
+        try:
+            task_ids = [int(task_id) for task_id in operation['task_ids']]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"task_ids invalide pour l'opération {operation.get('op')}")
+        if not task_ids:
+            raise ValueError(f"task_ids vide pour l'opération {operation.get('op')}")
+        return task_ids
+
+    @staticmethod
+    def _project(project_id) -> Project:
+        project = db.session.get(Project, project_id) if project_id is not None else None
+        if project is None:
+            raise ValueError(f"Projet introuvable : {project_id}")
+        return project
+
+    @staticmethod
+    def _parse_date(value) -> date:
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"Date invalide : {value!r}")
+
+    @staticmethod
+    def _shift(edit: ScenarioEdit, operation: Dict) -> None:
+        if 'task_ids' in operation:
+            task_ids = ScenarioService._task_ids(operation)
+        else:
+            task_ids = edit.project_task_ids(ScenarioService._project(operation.get('project_id')).id)
+        try:
+            months = int(operation['months']) if 'months' in operation else None
+            delta = timedelta(days=int(operation['days'])) if months is None else None
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("days ou months invalide pour l'opération shift")
+
+        edit.load(task_ids)
+        for task_id in task_ids:
+            task = edit.current(task_id)
+            if months is not None:
+                edit.set(task_id, start_date=add_months(task['start_date'], months),
+                         end_date=add_months(task['end_date'], months))
+            else:
+                edit.set(task_id, start_date=task['start_date'] + delta, end_date=task['end_date'] + delta)
+
+    @staticmethod
+    def _move(edit: ScenarioEdit, operation: Dict) -> None:
+        task_ids = ScenarioService._task_ids(operation)
+        project = ScenarioService._project(operation.get('project_id'))
+        edit.load(task_ids)
+        for task_id in task_ids:
+            # Même règle que le réel : schéma du projet cible, intensité conservée
+            edit.set(task_id, project_id=project.id,
+                     color=ProjectService.recolored(edit.current(task_id)['color'], project.color_scheme))
+
+    @staticmethod
+    def _set_etp(edit: ScenarioEdit, operation: Dict) -> None:
+        task_ids = ScenarioService._task_ids(operation)
+        if 'etp' not in operation:
+            raise ValueError("etp requis pour l'opération set_etp")
+        etp = EtpService.parse_etp(operation['etp'])
+        edit.load(task_ids)
+        for task_id in task_ids:
+            edit.current(task_id)
+            edit.set(task_id, etp=etp)
+
+    @staticmethod
+    def _update(edit: ScenarioEdit, operation: Dict) -> None:
+        tasks = operation.get('tasks')
+        if not isinstance(tasks, list) or not tasks:
+            raise ValueError("tasks doit être une liste non vide pour l'opération update")
+        try:
+            task_ids = [int(task['id']) for task in tasks]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Chaque tâche de l'opération update doit avoir un id")
+
+        edit.load(task_ids)
+        for task_id, task in zip(task_ids, tasks):
+            values = edit.current(task_id)
+            for field in ScenarioService.UPDATABLE_FIELDS:
+                if field not in task:
+                    continue
+                if field == 'etp':
+                    try:
+                        values['etp'] = EtpService.parse_etp(task['etp'])
+                    except ValueError as e:
+                        raise ValueError(f"Tâche {task_id} : {e}")
+                else:
+                    values[field] = ScenarioService._parse_date(task[field])
+            if values['end_date'] < values['start_date']:
+                raise ValueError(f"Tâche {task_id} : la date de fin précède la date de début")
+            edit.set(task_id, **{field: values[field] for field in ScenarioService.UPDATABLE_FIELDS})
+
+    @staticmethod
+    def _remove(edit: ScenarioEdit, operation: Dict) -> None:
+        task_ids = ScenarioService._task_ids(operation)
+        edit.load(task_ids)
+        for task_id in task_ids:
+            edit.set(task_id, removed=True)
+
+    @staticmethod
+    def _cells(operation: Dict, with_values: bool) -> List[Tuple]:
+        entries = operation.get('entries')
+        if not isinstance(entries, list) or not entries:
+            raise ValueError(f"entries doit être une liste non vide pour l'opération {operation.get('op')}")
+        valid_periods = set(PeriodCalendar.current().names)
+        try:
+            cells = [(int(entry['project_id']), entry['period'], entry.get('etp') if with_values else None)
+                     for entry in entries]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError("Chaque entrée doit avoir project_id et period")
+
+        project_ids = {project_id for project_id, _, _ in cells}
+        known = {project_id for project_id, in db.session.query(Project.id).filter(Project.id.in_(project_ids))}
+        for project_id, period, etp_value in cells:
+            if project_id not in known:
+                raise ValueError(f"Projet introuvable : {project_id}")
+            if period not in valid_periods:
+                raise ValueError(f"Période inconnue : {period}")
+        return [(project_id, period, None if etp_value is None else EtpService.parse_etp(etp_value))
+                for project_id, period, etp_value in cells]
+
+    @staticmethod
+    def _set_cells(edit: ScenarioEdit, operation: Dict) -> None:
+        for project_id, period, etp_value in ScenarioService._cells(operation, with_values=True):
+            edit.set_cell(project_id, period, etp_value)
+
+    @staticmethod
+    def _reset(edit: ScenarioEdit, operation: Dict) -> None:
+        if not operation.get('task_ids') and not operation.get('entries'):
+            raise ValueError("task_ids ou entries requis pour l'opération reset")
+        if operation.get('task_ids'):
+            for task_id in ScenarioService._task_ids(operation):
+                edit.reset(task_id)
+        if operation.get('entries'):
+            for project_id, period, _ in ScenarioService._cells(operation, with_values=False):
+                edit.reset_cell(project_id, period)
+
+    OPERATIONS = {
+        'shift': '_shift',
+        'move': '_move',
+        'set_etp': '_set_etp',
+        'update': '_update',
+        'remove': '_remove',
+        'set_cells': '_set_cells',
+        'reset': '_reset',
+    }
+
+    @staticmethod
+    def apply(scenario_id: int, operations: List[Dict]) -> Dict:
+        """Applique les opérations au scénario dans l'ordre, puis valide ; le réel n'est pas modifié"""
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("Une liste d'opérations non vide est attendue")
+        scenario = db.session.get(Scenario, scenario_id)
+        if scenario is None:
+            raise ValueError(f"Scénario introuvable : {scenario_id}")
+
+        try:
+            edit = ScenarioEdit(scenario_id)
+            for index, operation in enumerate(operations, start=1):
+                name = ScenarioService.OPERATIONS.get(operation.get('op') if isinstance(operation, dict) else None)
+                if name is None:
+                    raise ValueError(f"Opération {index} inconnue : {operation!r}")
+                try:
+                    getattr(ScenarioService, name)(edit, operation)
+                except ValueError as e:
+                    raise ValueError(f"Opération {index} ({operation['op']}) : {e}")
+
+            edit.save()
+            scenario.updated_at = datetime.utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return {'operations': len(operations), 'tasks': len(edit.touched_tasks), 'etp_entries': len(edit.touched_cells)}
+
+    @staticmethod
+    def compare(scenario_ids: List[int]) -> Dict:
+        """Totaux ETP du réel et de chaque scénario, avec les lignes des projets qui diffèrent.
+
+        La table réelle est lue une fois (agrégats) ; chaque scénario ne
+        recalcule que les projets qu'il touche et corrige les totaux par
+        différence, en O(écarts).
+        """
+        scenarios = {scenario.id: scenario for scenario in Scenario.query.filter(Scenario.id.in_(scenario_ids))}
+        missing = set(scenario_ids) - scenarios.keys()
+        if missing:
+            raise ValueError(f"Scénarios introuvables : {sorted(missing)}")
+
+        periods = PeriodCalendar.current().names
+        etp_data, period_totals = EtpService.get_etp_table()
+        baseline = {row['id']: row for row in etp_data}
+        baseline_totals = {period: period_totals.get(period, 0.0) for period in periods}
+        baseline_max = sum(row['total'] for row in etp_data)
+
+        results = []
+        for scenario_id in scenario_ids:
+            totals, total_max = dict(baseline_totals), baseline_max
+            changed = []
+            for project_id, (project_etps, max_etp) in EtpService.compute_projects_etp(
+                    (), ScenarioOverlay.load(scenario_id)).items():
+                before = baseline.get(project_id)
+                if before is None:
+                    continue
+                row = EtpService.build_etp_row(project_id, before['name'], project_etps, max_etp)
+                if all(row[key] == before[key] for key in (*periods, 'total')):
+                    continue
+                for period in periods:
+                    totals[period] += row[period] - before[period]
+                total_max += row['total'] - before['total']
+                changed.append(row)
+            results.append({
+                'id': scenario_id,
+                'name': scenarios[scenario_id].name,
+                'period_totals': totals,
+                'total_max_etp': total_max,
+                'projects': sorted(changed, key=lambda row: row['id'])
+            })
+
+        return {
+            'periods': periods,
+            'baseline': {'period_totals': baseline_totals, 'total_max_etp': baseline_max},
+            'scenarios': results
+        }
@@ -0,0 +1,165 @@
+import re
+from typing import Dict, List, Optional
+from markupsafe import escape
+from sqlalchemy import text
+from app import db
+
+# Délimiteurs des termes trouvés, pris dans la zone d'usage privé d'Unicode :
+# ils ne peuvent pas venir du texte saisi et survivent à l'échappement HTML
+MARK_OPEN = '\ue000'
+MARK_CLOSE = '\ue001'
+TERM = re.compile(r'\w+')
+
+
+class SearchService:
+    """Recherche plein texte dans le libellé et le commentaire des tâches.
+
+    S'appuie sur l'index propre au dialecte (app.models.search_index) : FTS5
+    et bm25 sous SQLite, tsvector/GIN et ts_rank sous PostgreSQL. La saisie est
+    découpée en mots, tous requis. Seul le dernier, en cours de frappe, est
+    recherché comme préfixe (s'il a au moins deux lettres) : les mots déjà
+    saisis sont complets, et un préfixe oblige l'index à fusionner les listes
+    de tous les termes qui le prolongent (10 ms contre 0,3 ms sur 1M de
+    tâches pour « recette paie 12 »).
+
+    Le classement calcule un score pour chaque tâche trouvée : son coût croît
+    avec le nombre de correspondances (~350 ms pour 100 000 sur 1M de tâches).
+    Une sonde bornée compte d'abord au plus RANK_CANDIDATES correspondances,
+    dans le projet demandé s'il y en a un ; au-delà, la requête est trop vague
+    pour que le score départage utilement et les tâches les plus récentes
+    sont renvoyées (`ranked` à False).
+    """
+    MAX_TERMS = 8
+    MAX_LIMIT = 100
+    RANK_CANDIDATES = 2000
+
+    # Le libellé pèse plus que le commentaire dans le classement. Dans la sonde,
+    # CROSS JOIN garde l'index plein texte en table externe : filtré sur un projet,
+    # SQLite relancerait sinon la recherche pour chacune des tâches du projet
+    SQLITE = {
+        'probe': """
+            SELECT count(*) FROM (
+                SELECT 1 FROM tasks_fts CROSS JOIN tasks t ON t.id = tasks_fts.rowid
+                WHERE tasks_fts MATCH :query {project_filter} LIMIT :candidates
+            )
+        """,
+        'search': """
+            SELECT t.id, t.project_id, p.name AS project_name, t.text,
+                   highlight(tasks_fts, 0, :open, :close) AS text_highlight,
+                   snippet(tasks_fts, 1, :open, :close, '…', 12) AS comment_snippet,
+                   -bm25(tasks_fts, 10.0, 1.0) AS score
+            FROM tasks_fts
+            JOIN tasks t ON t.id = tasks_fts.rowid
+            JOIN projects p ON p.id = t.project_id
+            WHERE tasks_fts MATCH :query {project_filter}
+            ORDER BY {order}
+            LIMIT :limit
+        """,
+        'ranked': 'bm25(tasks_fts, 10.0, 1.0)',
+        'recent': 'tasks_fts.rowid DESC',
+    }
+    # Sélection sur l'index seul, puis extraits calculés pour les lignes retenues
+    POSTGRES = {
+        'probe': """
+            SELECT count(*) FROM (
+                SELECT 1 FROM tasks t, to_tsquery('simple', :query) q
+                WHERE t.search_vector @@ q {project_filter} LIMIT :candidates
+            ) candidates
+        """,
+        'search': """
+            WITH matches AS (
+                SELECT t.id, ts_rank(t.search_vector, q) AS score
+                FROM tasks t, to_tsquery('simple', :query) q
+                WHERE t.search_vector @@ q {project_filter}
+                ORDER BY {order}
+                LIMIT :limit
+            )
+            SELECT t.id, t.project_id, p.name AS project_name, t.text,
+                   ts_headline('simple', t.text, q, :highlight_options) AS text_highlight,
+                   CASE WHEN t.comment IS NULL THEN ''
+                        ELSE ts_headline('simple', t.comment, q, :snippet_options) END AS comment_snippet,
+                   m.score
+            FROM matches m
+            JOIN tasks t ON t.id = m.id
+            JOIN projects p ON p.id = t.project_id,
+                 to_tsquery('simple', :query) q
+            ORDER BY {order}
+        """,
+        'ranked': 'score DESC',
+        'recent': 'id DESC',
+    }
+
+    @staticmethod
+    def _terms(query: str) -> List[str]:
+        return TERM.findall(query or '')[:SearchService.MAX_TERMS]
+
+    @staticmethod
+    def _is_prefix(terms: List[str], index: int) -> bool:
+        return index == len(terms) - 1 and len(terms[index]) > 1
+
+    @staticmethod
+    def _highlight(value: Optional[str]) -> str:
+        """Échappe le texte pour le HTML et remplace les délimiteurs par <mark>"""
+        return str(escape(value or '')).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+    @staticmethod
+    def search(query: str, limit: int = 20, project_id: Optional[int] = None) -> Dict:
+        """Tâches correspondant à `query` : {"results": [...], "ranked": bool}.
+
+        Les résultats sont classés par pertinence, ou du plus récent au plus
+        ancien si la requête est trop vague (voir RANK_CANDIDATES).
+        `highlight` (libellé) et `snippet` (extrait du commentaire) sont du HTML
+        échappé où les termes trouvés sont entourés de <mark>.
+        """
+        if not 1 <= limit <= SearchService.MAX_LIMIT:
+            raise ValueError(f"limit doit être compris entre 1 et {SearchService.MAX_LIMIT}")
+        terms = SearchService._terms(query)
+        if not terms:
+            return {'results': [], 'ranked': True}
+
+        # Dialectes vérifiés au démarrage (app.database.SUPPORTED_DIALECTS)
+        params = {'limit': limit, 'candidates': SearchService.RANK_CANDIDATES}
+        if db.session.get_bind().dialect.name == 'sqlite':
+            statements = SearchService.SQLITE
+            params.update(
+                query=' '.join(f'"{term}"*' if SearchService._is_prefix(terms, i) else f'"{term}"'
+                            for i, term in enumerate(terms)),
+                open=MARK_OPEN,
+                close=MARK_CLOSE
+            )
+        else:
+            statements = SearchService.POSTGRES
+            params.update(
+                query=' & '.join(f'{term}:*' if SearchService._is_prefix(terms, i) else term
+                               for i, term in enumerate(terms)),
+                highlight_options=f'StartSel={MARK_OPEN}, StopSel={MARK_CLOSE}, HighlightAll=true',
+                snippet_options=f'StartSel={MARK_OPEN}, StopSel={MARK_CLOSE}, MaxWords=20, MinWords=5'
+            )
+
+        project_filter = ''
+        if project_id is not None:
+            project_filter = 'AND t.project_id = :project_id'
+            params['project_id'] = project_id
+        probe = statements['probe'].format(project_filter=project_filter)
+        candidates = db.session.execute(text(probe), params).scalar()
+        ranked = candidates < SearchService.RANK_CANDIDATES
+        statement = statements['search'].format(
+            project_filter=project_filter,
+            order=statements['ranked' if ranked else 'recent']
+        )
+
+        return {
+            'results': [
+                {
+                    'id': row.id,
+                    'project_id': row.project_id,
+                    'project_name': row.project_name,
+                    'text': row.text,
+                    'highlight': SearchService._highlight(row.text_highlight),
+                    'snippet': SearchService._highlight(row.comment_snippet),
+                    'score': round(row.score, 4)
+                }
+                for row in db.session.execute(text(statement), params)
+            ],
+            'ranked': ranked
+        }
@@ -30,23 +30,33 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Gérer la validation des modifications
     async function saveChange(cell, newValue) {
-        const project = cell.closest('tr').dataset.project;
+        const projectId = parseInt(cell.closest('tr').dataset.projectId, 10);
         const period = cell.dataset.period;
 
         try {
-            const response = await fetch('/project/api/update_etp', {
-                method: 'POST',
+            const response = await fetch('/project/api/etp', {
+                method: 'PUT',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    project,
-                    period,
-                    etp: newValue
+                    entries: [{
+                        project_id: projectId,
+                        period,
+                        etp: newValue,
+                        version: parseInt(cell.dataset.version, 10)
+                    }]
                 })
             });
 
+            if (response.status === 409) {
+                alert('This value was changed by another user. The table will be reloaded.');
+                window.location.reload();
+                return;
+            }
             if (!response.ok) throw new Error('Failed to update ETP');
+            // Chaque écriture incrémente la version de la cellule (saisie créée : 0 -> 1)
+            cell.dataset.version = parseInt(cell.dataset.version, 10) + 1;
 
             const valueSpan = cell.querySelector('.etp-value');
             valueSpan.textContent = parseFloat(newValue).toFixed(2);
@@ -100,7 +110,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Fonction pour mettre à jour tous les totaux
     function updateTotals() {
         // Totaux par période
-        const periods = ['2025 Q1-Q2', '2025 Q3-Q4', '2026-2027'];
+        const periods = Array.from(table.querySelectorAll('.period-total'))
+            .map(cell => cell.dataset.period);
         
         periods.forEach(period => {
             const cells = table.querySelectorAll(`td[data-period="${period}"] .etp-value`);
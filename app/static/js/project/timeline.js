@@ -38,7 +38,8 @@ const TimelineManager = {
                 const projectId = projectName.closest('.timeline-row').dataset.projectId;
                 const projectTitle = projectName.textContent.trim();
                 const colorScheme = projectName.closest('.timeline-row').dataset.colorScheme || 'blue';
-                ModalManager.openProjectEditModal(projectId, projectTitle, colorScheme);
+                const version = projectName.closest('.timeline-row').dataset.version;
+                ModalManager.openProjectEditModal(projectId, projectTitle, colorScheme, version);
             });
         });
     },
@@ -184,7 +185,8 @@ const TimelineManager = {
                     comment: task.dataset.comment,
                     startDate: task.dataset.startDate,
                     endDate: task.dataset.endDate,
-                    etp: task.dataset.etp
+                    etp: task.dataset.etp,
+                    version: task.dataset.version
                 };
                 ModalManager.openEditTaskModal(taskData);
             });
@@ -276,7 +278,8 @@ const ModalManager = {
                     comment: task.dataset.comment,
                     startDate: task.dataset.startDate,
                     endDate: task.dataset.endDate,
-                    etp: task.dataset.etp
+                    etp: task.dataset.etp,
+                    version: task.dataset.version
                 };
                 this.openEditTaskModal(taskData);
             });
@@ -290,6 +293,7 @@ const ModalManager = {
         // Reset du formulaire
         this.elements.projectForm.reset();
         document.getElementById('projectId').value = '';
+        this.projectVersion = null;
         
         // Mise à jour du titre et des boutons
         this.elements.projectModalTitle.textContent = 'Nouveau Projet';
@@ -299,10 +303,13 @@ const ModalManager = {
         modal.classList.add('show');
     },
 
-    openProjectEditModal(projectId, projectName, colorScheme) {
+    openProjectEditModal(projectId, projectName, colorScheme, version) {
         const modal = this.elements.newProjectModal;
         if (!modal) return;
 
+        // Version affichée : le serveur refuse la modification (409) si le projet a changé depuis
+        this.projectVersion = version || null;
+
         // Mise à jour du titre
         this.elements.projectModalTitle.textContent = 'Modifier le Projet';
 
@@ -329,9 +336,16 @@ const ModalManager = {
             const response = await fetch(url, {
                 method: method,
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(Object.fromEntries(formData))
+                body: JSON.stringify({
+                    ...Object.fromEntries(formData),
+                    ...(projectId && this.projectVersion ? { version: this.projectVersion } : {})
+                })
             });
 
+            if (response.status === 409) {
+                this.handleConflict('Ce projet a été modifié par un autre utilisateur.');
+                return;
+            }
             if (!response.ok) {
                 const error = await response.json();
                 throw new Error(error.error || 'Erreur lors de l\'opération sur le projet');
@@ -410,6 +424,7 @@ const ModalManager = {
         document.getElementById('editTaskStartDate').value = taskData.startDate;
         document.getElementById('editTaskEndDate').value = taskData.endDate;
         document.getElementById('editTaskEtp').value = taskData.etp;
+        this.taskVersion = taskData.version || null;
 
         modal.classList.add('show');
     },
@@ -453,10 +468,15 @@ const ModalManager = {
                     comment: formData.get('comment'),
                     start_date: formData.get('start_date'),
                     end_date: formData.get('end_date'),
-                    etp: formData.get('etp')
+                    etp: formData.get('etp'),
+                    version: this.taskVersion
                 })
             });
 
+            if (response.status === 409) {
+                this.handleConflict('Cette tâche a été modifiée par un autre utilisateur.');
+                return;
+            }
             if (!response.ok) {
                 const error = await response.json();
                 throw new Error(error.error || 'Erreur lors de la modification de la tâche');
@@ -469,6 +489,12 @@ const ModalManager = {
         }
     },
 
+    handleConflict(message) {
+        // La version affichée est périmée : on recharge pour repartir de l'état actuel
+        alert(`${message}\nLa page va être rechargée avec les valeurs actuelles.`);
+        window.location.reload();
+    },
+
     async handleTaskDelete() {
         const taskId = document.getElementById('editTaskId').value;
         const taskText = document.getElementById('editTaskText').value;
@@ -526,7 +552,48 @@ const ModalManager = {
 };
 
 // Initialisation
+// Flux des modifications (SSE) : la page se met à jour quand un autre onglet modifie les données
+const ChangeFeed = {
+    init() {
+        if (!window.EventSource) return;
+        this.source = new EventSource('/project/api/changes');
+        this.source.addEventListener('change', () => this.scheduleRefresh());
+        // Événements perdus (journal dépassé, redémarrage) : on propose de recharger
+        this.source.addEventListener('reset', () => this.showBanner());
+    },
+
+    scheduleRefresh() {
+        // Regroupe les rafales d'événements (lots, imports) en un seul rechargement
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => this.refresh(), 500);
+    },
+
+    refresh() {
+        // Ne pas interrompre une saisie en cours
+        if (document.querySelector('.modal.show')) {
+            this.showBanner();
+            return;
+        }
+        window.location.reload();
+    },
+
+    showBanner() {
+        if (document.querySelector('.change-banner')) return;
+        const banner = document.createElement('div');
+        banner.className = 'change-banner';
+        banner.textContent = 'Des modifications ont été enregistrées. ';
+        const button = document.createElement('button');
+        button.className = 'btn-secondary';
+        button.textContent = 'Actualiser';
+        button.addEventListener('click', () => window.location.reload());
+        banner.appendChild(button);
+        const container = document.querySelector('.timeline-container');
+        container.insertBefore(banner, container.querySelector('.timeline-grid'));
+    }
+};
+
 document.addEventListener('DOMContentLoaded', function() {
     TimelineManager.init();
     ModalManager.init();
+    ChangeFeed.init();
 });
\ No newline at end of file
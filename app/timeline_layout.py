@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+from functools import lru_cache
+from hashlib import sha1
+from typing import List, Sequence, Tuple
+from flask import current_app, has_app_context
+from app.constants import TimeConstants
+
+
+class TimelineLayout:
+    """Calcule la position des tâches (start, width en %) sur la grille de la timeline.
+
+    Chaque colonne occupe la même largeur ; à l'intérieur d'une colonne la
+    position est proportionnelle au nombre réel de jours écoulés. La position
+    de chaque jour de l'horizon est précalculée une fois dans une table, si bien
+    qu'un lot de tâches se résout en deux lectures de table par tâche.
+    """
+
+    MIN_WIDTH = 8.0
+    MIN_WIDTH_MULTI_MONTH = 15.0
+
+    def __init__(self, columns: Sequence[Tuple[str, date, date]]):
+        if not columns:
+            raise ValueError("La timeline doit contenir au moins une colonne")
+
+        self.labels = [label for label, _, _ in columns]
+        # Horizon couvert par la grille (bornes incluses)
+        self.horizon_start = columns[0][1]
+        self.horizon_end = columns[-1][2] - timedelta(days=1)
+        self._origin = columns[0][1].toordinal()
+
+        column_width = 100.0 / len(columns)
+        table = []
+        for index, (label, start, end) in enumerate(columns):
+            if start.toordinal() != self._origin + len(table):
+                raise ValueError(f"La colonne '{label}' n'est pas contiguë à la précédente")
+            days = (end - start).days
+            if days <= 0:
+                raise ValueError(f"La colonne '{label}' est vide")
+            base = index * column_width
+            table.extend(base + day * column_width / days for day in range(days))
+        table.append(100.0)
+        self._table = table
+        # Identifie la grille (clés du cache de fragments)
+        self.signature = sha1(repr(tuple(tuple(column) for column in columns)).encode()).hexdigest()
+
+    @classmethod
+    def current(cls) -> 'TimelineLayout':
+        """Retourne le moteur correspondant à la configuration de l'application."""
+        columns = TimeConstants.TIMELINE_COLUMNS
+        if has_app_context():
+            columns = current_app.config.get('TIMELINE_COLUMNS') or columns
+        return _layout_for(tuple(tuple(column) for column in columns))
+
+    def compute(self, starts: Sequence[date], ends: Sequence[date]) -> List[Tuple[float, float]]:
+        """Calcule (start, width) pour toutes les tâches en une seule passe."""
+        table = self._table
+        origin = self._origin
+        last = len(table) - 1
+        min_width = self.MIN_WIDTH
+        min_width_multi_month = self.MIN_WIDTH_MULTI_MONTH
+
+        results = []
+        append = results.append
+        for start_date, end_date in zip(starts, ends):
+            offset = start_date.toordinal() - origin
+            start_pos = table[0 if offset < 0 else last if offset > last else offset]
+            offset = end_date.toordinal() - origin
+            end_pos = table[0 if offset < 0 else last if offset > last else offset]
+
+            width = (100.0 if end_pos < start_pos else end_pos) - start_pos
+            if width < min_width_multi_month and (
+                    (end_date.year - start_date.year) * 12 + end_date.month - start_date.month >= 1):
+                width = min_width_multi_month
+            elif width < min_width:
+                width = min_width
+            append((start_pos, width))
+        return results
+
+    def position(self, start_date: date, end_date: date) -> Tuple[float, float]:
+        """Calcule (start, width) pour une seule tâche."""
+        return self.compute([start_date], [end_date])[0]
+
+
+@lru_cache(maxsize=8)
+def _layout_for(columns: Tuple[Tuple[str, date, date], ...]) -> TimelineLayout:
+    return TimelineLayout(columns)
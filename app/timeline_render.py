@@ -0,0 +1,391 @@
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+# Couleurs des barres (classes bg-* de static/css/timeline.css)
+TASK_COLORS = {
+    'blue-600': '#2563eb', 'blue-500': '#3b82f6', 'blue-400': '#60a5fa',
+    'purple-600': '#9333ea', 'purple-500': '#a855f7', 'purple-400': '#c084fc',
+    'green-600': '#16a34a', 'green-500': '#22c55e', 'green-400': '#4ade80',
+    'yellow-600': '#ca8a04', 'yellow-500': '#eab308', 'yellow-400': '#facc15',
+    'red-600': '#dc2626', 'red-500': '#ef4444', 'red-400': '#f87171',
+    'indigo-600': '#4f46e5', 'indigo-500': '#6366f1', 'indigo-400': '#818cf8',
+    'teal-600': '#0d9488', 'teal-500': '#14b8a6', 'teal-400': '#2dd4bf',
+    'gray-600': '#4b5563', 'gray-500': '#6b7280', 'gray-400': '#9ca3af',
+}
+PRIMARY_COLOR = '#312e81'
+SECONDARY_COLOR = '#3b82f6'
+ROW_BACKGROUND = '#f9fafb'
+GRID_COLOR = '#e5e7eb'
+TEXT_COLOR = '#111827'
+WHITE = '#ffffff'
+
+# Chasses de Helvetica (1/1000 em) pour les caractères ASCII imprimables ;
+# elles servent à tronquer les libellés de la même façon dans tous les formats
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+ELLIPSIS_WIDTH = 1000
+
+
+@lru_cache(maxsize=1024)
+def _char_width(char: str) -> int:
+    """Chasse d'un caractère ; les lettres accentuées prennent celle de leur base"""
+    code = ord(char)
+    if not 32 <= code <= 126:
+        code = ord(unicodedata.normalize('NFD', char)[0])
+    return HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    """Largeur approchée d'un texte en Helvetica"""
+    return sum(map(_char_width, text)) * size / 1000 * (1.06 if bold else 1.0)
+
+
+def fit_text(text: str, size: float, max_width: float, bold: bool = False) -> str:
+    """Tronque `text` (avec …) pour qu'il tienne dans `max_width`"""
+    scale = size / 1000 * (1.06 if bold else 1.0)
+    if sum(map(_char_width, text)) * scale <= max_width:
+        return text
+    available = max_width / scale - ELLIPSIS_WIDTH
+    used = 0
+    for index, char in enumerate(text):
+        used += _char_width(char)
+        if used > available:
+            return text[:index] + '…' if index else ''
+    return text
+
+
+def milestone_offset(position: str) -> float:
+    """Position d'un jalon (classe Tailwind left-1/3, right-1/6...) en fraction de la largeur"""
+    side, _, fraction = position.partition('-')
+    numerator, _, denominator = fraction.partition('/')
+    value = int(numerator) / int(denominator or 1)
+    return 1 - value if side == 'right' else value
+
+
+def assign_levels(tasks: Sequence[Dict]) -> Tuple[List[int], int]:
+    """Niveau (ligne) de chaque tâche et nombre de niveaux : même placement que timeline.js.
+
+    Les tâches sont placées par début croissant sur le premier niveau libre ;
+    un niveau est libre dès que la dernière tâche qu'il porte se termine avant
+    le début de la tâche, seule sa fin est donc conservée.
+    """
+    order = sorted(range(len(tasks)), key=lambda index: tasks[index]['start'])
+    level_ends: List[float] = []
+    result = [0] * len(tasks)
+    for index in order:
+        start = tasks[index]['start']
+        end = start + tasks[index]['width']
+        for level, level_end in enumerate(level_ends):
+            if start >= level_end:
+                level_ends[level] = end
+                break
+        else:
+            level = len(level_ends)
+            level_ends.append(end)
+        result[index] = level
+    return result, len(level_ends)
+
+
+class TimelineDrawing:
+    """Timeline mise en page pour l'export (SVG, PNG, PDF), sans navigateur.
+
+    Reprend la grille de la page : colonne des noms de projets, colonnes de
+    périodes de même largeur, tâches placées selon leurs `start` / `width`
+    (en % de la grille, calculés par TimelineLayout) et empilées en niveaux
+    comme le fait timeline.js, jalons sous les projets.
+
+    Le dessin est une liste de blocs (en-tête, un bloc par projet, jalons) ;
+    chaque bloc porte sa hauteur et ses primitives en coordonnées locales
+    (pixels CSS). Le SVG et le PNG empilent les blocs, le PDF les répartit
+    sur des pages en répétant l'en-tête.
+
+    Primitives : ('rect', x, y, w, h, couleur, rayon),
+    ('text', x, y, texte, taille, couleur, gras, ancre) avec y la ligne de
+    base, ('line', x1, y1, x2, y2, couleur), ('circle', cx, cy, r, couleur).
+    """
+
+    # À incrémenter à chaque changement du dessin (invalide les rendus en cache)
+    VERSION = 1
+    WIDTH = 1600
+    MARGIN = 16
+    SIDEBAR = 200
+    TITLE_HEIGHT = 48
+    PERIOD_HEIGHT = 36
+    TASK_HEIGHT = 32
+    TASK_MARGIN = 8
+    ROW_PADDING = 8
+    ROW_GAP = 16
+    MILESTONES_HEIGHT = 72
+    FONT_SIZE = 12
+    # Pages PDF : hauteur d'une page par rapport à sa largeur (paysage A4)
+    PAGE_RATIO = 210 / 297
+    # Hauteur maximale d'un PNG (l'image est construite en mémoire : ~5 Mo par 1000 px)
+    MAX_PNG_HEIGHT = 16000
+
+    def __init__(self, title: str, labels: Sequence[str], projects: Sequence[Dict],
+                 milestones: Sequence[Dict] = ()):
+        self.title = title
+        self.grid_x = self.MARGIN + self.SIDEBAR
+        self.grid_width = self.WIDTH - self.MARGIN - self.grid_x
+        self.header = self._header(title, labels)
+        self.blocks = [self._project(project, len(labels)) for project in projects]
+        if milestones:
+            self.blocks.append(self._milestones(milestones))
+
+    @property
+    def height(self) -> int:
+        return self.header[0] + sum(height for height, _ in self.blocks) + self.MARGIN
+
+    def _header(self, title: str, labels: Sequence[str]):
+        items = [('text', self.MARGIN, 32, title, 22, PRIMARY_COLOR, True, 'start')]
+        top = self.TITLE_HEIGHT
+        items.append(('rect', self.MARGIN, top, self.WIDTH - 2 * self.MARGIN, self.PERIOD_HEIGHT, PRIMARY_COLOR, 4))
+        column_width = self.grid_width / len(labels)
+        for index, label in enumerate(labels):
+            x = self.grid_x + index * column_width
+            items.append(('text', x + column_width / 2, top + 23, fit_text(label, 14, column_width - 8),
+                          14, WHITE, False, 'middle'))
+        return self.TITLE_HEIGHT + self.PERIOD_HEIGHT + self.ROW_GAP, items
+
+    def _project(self, project: Dict, columns: int):
+        tasks = project['tasks']
+        levels, count = assign_levels(tasks)
+        lane = self.TASK_HEIGHT + self.TASK_MARGIN
+        height = max(count, 1) * lane + 2 * self.ROW_PADDING
+        items = [
+            ('rect', self.MARGIN, 0, self.SIDEBAR, height, ROW_BACKGROUND, 4),
+            ('rect', self.grid_x, 0, self.grid_width, height, ROW_BACKGROUND, 4),
+            ('text', self.MARGIN + 16, height / 2 + 5,
+             fit_text(project['name'], 14, self.SIDEBAR - 24, bold=True), 14, TEXT_COLOR, True, 'start'),
+        ]
+        for index in range(1, columns):
+            x = self.grid_x + index * self.grid_width / columns
+            items.append(('line', x, 0, x, height, GRID_COLOR))
+
+        grid_end = self.grid_x + self.grid_width
+        for task, level in zip(tasks, levels):
+            x = self.grid_x + task['start'] * self.grid_width / 100
+            width = min(task['width'] * self.grid_width / 100, grid_end - x)
+            if width < 1:
+                # Tâche au-delà de l'horizon de la grille
+                continue
+            y = self.ROW_PADDING + level * lane
+            items.append(('rect', x, y, width, self.TASK_HEIGHT, TASK_COLORS.get(task['color'], SECONDARY_COLOR), 4))
+            label = fit_text(task['text'], self.FONT_SIZE, width - 16)
+            if label:
+                items.append(('text', x + 8, y + self.TASK_HEIGHT / 2 + 4, label, self.FONT_SIZE, WHITE, False, 'start'))
+        return height + self.ROW_GAP, items
+
+    def _milestones(self, milestones: Sequence[Dict]):
+        items = [('rect', self.grid_x, 0, self.grid_width, self.MILESTONES_HEIGHT, ROW_BACKGROUND, 4)]
+        for milestone in milestones:
+            x = self.grid_x + milestone_offset(milestone['position']) * self.grid_width
+            items.append(('circle', x, 24, 8, SECONDARY_COLOR))
+            items.append(('text', x, 54, milestone['text'], self.FONT_SIZE, TEXT_COLOR, True, 'middle'))
+        return self.MILESTONES_HEIGHT + self.MARGIN, items
+
+    def _stacked(self):
+        """Primitives de tous les blocs, empilés, en coordonnées de l'image"""
+        offset = 0
+        for height, items in [self.header, *self.blocks]:
+            for item in items:
+                yield _translate(item, offset)
+            offset += height
+
+    # Formats de sortie
+
+    def to_svg(self) -> bytes:
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.WIDTH}" height="{self.height}" '
+            f'viewBox="0 0 {self.WIDTH} {self.height}" font-family="Helvetica, Arial, sans-serif">',
+            f'<title>{escape(self.title)}</title>',
+            f'<rect width="100%" height="100%" fill="{WHITE}"/>',
+        ]
+        for item in self._stacked():
+            kind = item[0]
+            if kind == 'rect':
+                _, x, y, width, height, fill, radius = item
+                parts.append(f'<rect x="{x:.2f}" y="{y:.2f}" width="{width:.2f}" height="{height:.2f}" '
+                             f'rx="{radius}" fill="{fill}"/>')
+            elif kind == 'text':
+                _, x, y, text, size, fill, bold, anchor = item
+                weight = ' font-weight="bold"' if bold else ''
+                parts.append(f'<text x="{x:.2f}" y="{y:.2f}" font-size="{size}" fill="{fill}"{weight} '
+                             f'text-anchor="{anchor}">{escape(text)}</text>')
+            elif kind == 'line':
+                _, x1, y1, x2, y2, stroke = item
+                parts.append(f'<line x1="{x1:.2f}" y1="{y1:.2f}" x2="{x2:.2f}" y2="{y2:.2f}" stroke="{stroke}"/>')
+            elif kind == 'circle':
+                _, cx, cy, radius, fill = item
+                parts.append(f'<circle cx="{cx:.2f}" cy="{cy:.2f}" r="{radius}" fill="{fill}"/>')
+        parts.append('</svg>')
+        return '\n'.join(parts).encode()
+
+    def to_png(self) -> bytes:
+        # Import différé : seul le PNG dépend de Pillow (déclaré dans requirement.txt)
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError:
+            raise RuntimeError("L'export PNG nécessite le paquet Pillow (pip install -r requirement.txt)")
+        import io
+
+        if self.height > self.MAX_PNG_HEIGHT:
+            raise ValueError(f"Timeline trop haute pour un PNG ({self.height} px) : réduisez `limit` ou la "
+                             f"fenêtre, ou exportez en SVG ou en PDF")
+        fonts = {}
+
+        def font(size, bold):
+            if (size, bold) not in fonts:
+                try:
+                    fonts[size, bold] = ImageFont.truetype('DejaVuSans-Bold.ttf' if bold else 'DejaVuSans.ttf', size)
+                except OSError:
+                    try:
+                        fonts[size, bold] = ImageFont.load_default(size)
+                    except TypeError:  # Pillow < 10.1 : police bitmap de taille fixe
+                        fonts[size, bold] = ImageFont.load_default()
+            return fonts[size, bold]
+
+        image = Image.new('RGB', (self.WIDTH, self.height), WHITE)
+        draw = ImageDraw.Draw(image)
+        for item in self._stacked():
+            kind = item[0]
+            if kind == 'rect':
+                _, x, y, width, height, fill, radius = item
+                draw.rounded_rectangle((x, y, x + width - 1, y + height - 1), radius=radius, fill=fill)
+            elif kind == 'text':
+                _, x, y, text, size, fill, bold, anchor = item
+                draw.text((x, y), text, fill=fill, font=font(size, bold), anchor='ms' if anchor == 'middle' else 'ls')
+            elif kind == 'line':
+                _, x1, y1, x2, y2, stroke = item
+                draw.line((x1, y1, x2, y2), fill=stroke)
+            elif kind == 'circle':
+                _, cx, cy, radius, fill = item
+                draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), fill=fill)
+        output = io.BytesIO()
+        image.save(output, 'PNG', optimize=True)
+        return output.getvalue()
+
+    def to_pdf(self) -> bytes:
+        """PDF écrit directement (polices standard Helvetica, aucune dépendance), paginé"""
+        page_height = self.WIDTH * self.PAGE_RATIO
+        header_height = self.header[0]
+        pages, current, used = [], [], header_height
+        for height, items in self.blocks:
+            if current and used + height > page_height:
+                pages.append((used, current))
+                current, used = [], header_height
+            current.append((used, items))
+            used += height
+        pages.append((used, current))
+        return PdfWriter(self.WIDTH).write(
+            (max(page_height, used + self.MARGIN),
+             [*self.header[1], *(_translate(item, top) for top, items in blocks for item in items)])
+            for used, blocks in pages
+        )
+
+
+def _translate(item: Tuple, offset: float) -> Tuple:
+    """Décale une primitive verticalement"""
+    kind = item[0]
+    if kind == 'line':
+        return (*item[:2], item[2] + offset, item[3], item[4] + offset, *item[5:])
+    return (*item[:2], item[2] + offset, *item[3:])
+
+
+class PdfWriter:
+    """Écriture minimale d'un PDF (rectangles, cercles, traits et texte en Helvetica).
+
+    Les coordonnées reçues sont en pixels CSS, origine en haut à gauche ; elles
+    sont converties en points (0,75 pt par pixel), origine en bas à gauche.
+    Le texte est encodé en WinAnsi (cp1252), qui couvre le français.
+    """
+
+    SCALE = 0.75
+    # Approximation d'un quart de cercle par une courbe de Bézier
+    KAPPA = 0.5523
+
+    def __init__(self, width: float):
+        self.width = width
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _color(value: str) -> str:
+        return ' '.join(f'{int(value[i:i + 2], 16) / 255:.3f}' for i in (1, 3, 5))
+
+    def _rounded_rect(self, x: float, y: float, width: float, height: float, radius: float) -> str:
+        radius = min(radius, width / 2, height / 2)
+        if radius <= 0:
+            return f'{x:.2f} {y:.2f} {width:.2f} {height:.2f} re f'
+        k = radius * (1 - self.KAPPA)
+        right, top = x + width, y + height
+        return (f'{x + radius:.2f} {y:.2f} m {right - radius:.2f} {y:.2f} l '
+                f'{right - k:.2f} {y:.2f} {right:.2f} {y + k:.2f} {right:.2f} {y + radius:.2f} c '
+                f'{right:.2f} {top - radius:.2f} l '
+                f'{right:.2f} {top - k:.2f} {right - k:.2f} {top:.2f} {right - radius:.2f} {top:.2f} c '
+                f'{x + radius:.2f} {top:.2f} l '
+                f'{x + k:.2f} {top:.2f} {x:.2f} {top - k:.2f} {x:.2f} {top - radius:.2f} c '
+                f'{x:.2f} {y + radius:.2f} l '
+                f'{x:.2f} {y + k:.2f} {x + k:.2f} {y:.2f} {x + radius:.2f} {y:.2f} c f')
+
+    def _content(self, height: float, items) -> bytes:
+        # Repère : pixels, origine en haut à gauche
+        operations = [f'{self.SCALE} 0 0 -{self.SCALE} 0 {height * self.SCALE:.2f} cm']
+        for item in items:
+            kind = item[0]
+            if kind == 'rect':
+                _, x, y, width, rect_height, fill, radius = item
+                operations.append(f'{self._color(fill)} rg {self._rounded_rect(x, y, width, rect_height, radius)}')
+            elif kind == 'circle':
+                _, cx, cy, radius, fill = item
+                operations.append(f'{self._color(fill)} rg '
+                                  f'{self._rounded_rect(cx - radius, cy - radius, 2 * radius, 2 * radius, radius)}')
+            elif kind == 'line':
+                _, x1, y1, x2, y2, stroke = item
+                operations.append(f'{self._color(stroke)} RG 1 w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S')
+            elif kind == 'text':
+                _, x, y, text, size, fill, bold, anchor = item
+                if anchor == 'middle':
+                    x -= text_width(text, size, bold) / 2
+                encoded = text.encode('cp1252', errors='replace').hex().upper()
+                # Le texte est redressé (le repère a l'axe vertical inversé)
+                operations.append(f'BT {self._color(fill)} rg /{"F2" if bold else "F1"} {size} Tf '
+                                  f'1 0 0 -1 {x:.2f} {y:.2f} Tm <{encoded}> Tj ET')
+        return zlib.compress('\n'.join(operations).encode('ascii'))
+
+    def write(self, pages) -> bytes:
+        """`pages` : itérable de (hauteur en pixels, primitives)"""
+        objects: List[Optional[bytes]] = [None, None]  # 1 : catalogue, 2 : arbre des pages
+        objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+        page_ids = []
+        for height, items in pages:
+            content = self._content(height, items)
+            objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content) + content
+                           + b'\nendstream')
+            objects.append(('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+                            '/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+                            % (self.width * self.SCALE, height * self.SCALE, len(objects))).encode())
+            page_ids.append(len(objects))
+        objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+        objects[1] = ('<< /Type /Pages /Kids [%s] /Count %d >>'
+                      % (' '.join(f'{page_id} 0 R' for page_id in page_ids), len(page_ids))).encode()
+
+        output = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        xref = len(output)
+        output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+        output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n' % (len(objects) + 1, xref)
+        return bytes(output)
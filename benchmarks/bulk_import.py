@@ -0,0 +1,74 @@
+"""Mesure le débit de l'import en masse comparé à la création tâche par tâche.
+
+Usage : python -m benchmarks.bulk_import [nombre_de_lignes]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Project
+from app.services import ImportService, ProjectService
+
+DEFAULT_ROW_COUNT = 100_000
+ROW_BY_ROW_SAMPLE = 1_000
+PROJECT_COUNT = 50
+
+
+def make_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(0, 730))
+        rows.append({
+            'project': f"Project {rng.randrange(PROJECT_COUNT)}",
+            'text': f"Task {i}",
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=rng.randrange(7, 240))).isoformat(),
+            'etp': str(rng.choice([0.5, 1.0, 2.0]))
+        })
+    return rows
+
+
+def reset_database():
+    db.drop_all()
+    db.create_all()
+    for i in range(PROJECT_COUNT):
+        db.session.add(Project(name=f"Project {i}"))
+    db.session.commit()
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROW_COUNT
+    rows = make_rows(count)
+    app = create_app(TestingConfig)
+
+    with app.app_context():
+        reset_database()
+        report = ImportService.import_tasks(rows)
+        print(f"Import en masse : {count} lignes en {report['duration']:.2f} s "
+              f"({report['rows_per_second']} lignes/s, {len(report['errors'])} erreurs)")
+
+        reset_database()
+        project_ids = {project.name: project.id for project in Project.query}
+        sample = rows[:ROW_BY_ROW_SAMPLE]
+        started = time.perf_counter()
+        for row in sample:
+            ProjectService.create_task(
+                project_id=project_ids[row['project']],
+                text=row['text'],
+                start_date=date.fromisoformat(row['start_date']),
+                end_date=date.fromisoformat(row['end_date']),
+                color=None,
+                etp=float(row['etp'])
+            )
+        duration = time.perf_counter() - started
+        print(f"Création unitaire : {len(sample)} lignes en {duration:.2f} s "
+              f"({round(len(sample) / duration)} lignes/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
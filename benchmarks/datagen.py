@@ -0,0 +1,108 @@
+"""Générateur reproductible de données synthétiques (projets, tâches, entrées ETP).
+
+Les dates suivent une distribution réaliste : les tâches démarrent plutôt en
+début de mois ou de trimestre, durent de quelques semaines à plus d'un an
+(distribution log-normale) et s'enchaînent au sein d'un même projet.
+"""
+import math
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+from app import db, response_cache
+from app.models import Project, Task, EtpEntry
+from app.periods import PeriodCalendar
+from app.services import EtpService
+
+COLOR_SCHEMES = ['blue', 'purple', 'green', 'yellow', 'red', 'indigo', 'teal', 'gray']
+INTENSITIES = ['600', '500', '400']
+# Vocabulaire des libellés (choisi par l'index, sans consommer le générateur
+# aléatoire : les dates et ETP restent identiques d'une version à l'autre)
+TASK_ACTIONS = ['Analyse', 'Conception', 'Développement', 'Recette', 'Déploiement', 'Migration',
+                'Audit', 'Formation', 'Négociation', 'Support']
+TASK_SUBJECTS = ['contrats', 'fournisseurs', 'infrastructure', 'réseau', 'sécurité', 'paie',
+                 'reporting', 'données', 'portail', 'facturation', 'recrutement', 'logistique', 'CRM']
+ETP_VALUES = [0.2, 0.5, 0.5, 1.0, 1.0, 1.0, 1.5, 2.0, 3.0]
+HORIZON_START = date(2025, 1, 1)
+HORIZON_DAYS = 3 * 365
+BATCH_SIZE = 5000
+
+
+def _task_start(rng: random.Random, previous_end: date) -> date:
+    """Début de tâche : souvent à la suite de la précédente, aligné sur un début de mois"""
+    if rng.random() < 0.6 and previous_end is not None:
+        start = previous_end + timedelta(days=rng.randrange(0, 30))
+    else:
+        start = HORIZON_START + timedelta(days=rng.randrange(0, HORIZON_DAYS))
+    if rng.random() < 0.5:
+        start = start.replace(day=1)
+    return start
+
+
+def _task_duration(rng: random.Random) -> int:
+    """Durée log-normale centrée sur ~2 mois, bornée entre 1 semaine et 2 ans"""
+    return int(min(max(rng.lognormvariate(math.log(60), 0.8), 7), 730))
+
+
+def generate_dataset(projects: int, tasks: int, etp_entries: int, seed: int = 42) -> Dict[str, int]:
+    """Vide la base puis insère le jeu de données (dans un contexte d'application).
+
+    Les insertions passent par des INSERT Core par lots ; les agrégats ETP sont
+    recalculés à la fin comme le ferait l'application.
+    """
+    rng = random.Random(seed)
+    db.drop_all()
+    db.create_all()
+    now = datetime.utcnow()
+
+    project_rows = [
+        {'name': f"Project {i:05d}", 'color_scheme': rng.choice(COLOR_SCHEMES), 'created_at': now, 'updated_at': now}
+        for i in range(projects)
+    ]
+    db.session.execute(Project.__table__.insert(), project_rows)
+    project_ids = [project_id for project_id, in db.session.query(Project.id).order_by(Project.id)]
+    schemes = dict(zip(project_ids, (row['color_scheme'] for row in project_rows)))
+
+    # Répartition des tâches inégale entre projets (quelques gros projets)
+    weights = [rng.paretovariate(1.5) for _ in project_ids]
+    assignments = rng.choices(project_ids, weights=weights, k=tasks)
+
+    previous_end = {}
+    batch = []
+    for index, project_id in enumerate(assignments):
+        start = _task_start(rng, previous_end.get(project_id))
+        end = start + timedelta(days=_task_duration(rng))
+        previous_end[project_id] = end
+        batch.append({
+            'project_id': project_id,
+            'text': f"{TASK_ACTIONS[index % len(TASK_ACTIONS)]} "
+                    f"{TASK_SUBJECTS[index // len(TASK_ACTIONS) % len(TASK_SUBJECTS)]} {index}",
+            'comment': None if rng.random() < 0.7 else
+                       f"Commentaire {index} : suivi {TASK_SUBJECTS[index * 7 % len(TASK_SUBJECTS)]}",
+            'start_date': start,
+            'end_date': end,
+            'color': f"{schemes[project_id]}-{rng.choice(INTENSITIES)}",
+            'etp': rng.choice(ETP_VALUES),
+            'created_at': now,
+            'updated_at': now
+        })
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(Task.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Task.__table__.insert(), batch)
+
+    periods = PeriodCalendar.current().names
+    cells = [(project_id, period) for project_id in project_ids for period in periods]
+    etp_rows = [
+        {'project_id': project_id, 'period': period, 'etp_value': rng.choice(ETP_VALUES),
+         'created_at': now, 'updated_at': now}
+        for project_id, period in rng.sample(cells, min(etp_entries, len(cells)))
+    ]
+    if etp_rows:
+        db.session.execute(EtpEntry.__table__.insert(), etp_rows)
+
+    EtpService.refresh_project_aggregates(project_ids)
+    db.session.commit()
+    response_cache.bump()
+    return {'projects': len(project_ids), 'tasks': tasks, 'etp_entries': len(etp_rows), 'seed': seed}
@@ -0,0 +1,161 @@
+"""Mesure la croissance de l'historique et le temps de reconstitution `as_of`.
+
+Usage : python -m benchmarks.history [--edits N] [--snapshot-every K] [--tasks N] [--database FICHIER]
+
+Après génération du jeu de données, applique N modifications de tâches
+(décalages de dates et changements d'ETP, un libellé modifié sur vingt) par
+UPDATE Core en lots, comme l'édition par lot ; les triggers alimentent
+l'historique. Un snapshot est pris toutes les K modifications.
+
+Affiche l'espace occupé par modification (historique et index, mesuré par
+le nombre de pages SQLite), la taille des snapshots, puis le temps de
+reconstitution de l'état à plusieurs dates : depuis le snapshot le plus
+proche (HistoryService.state_at, cache des snapshots vidé) et en rejouant
+tout le journal depuis le début.
+
+Avec --edits 2000000 et --database, mesure le comportement à plusieurs
+millions de modifications sur disque (la base en mémoire tient aussi, au
+prix de la RAM).
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, text, update
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import HistorySnapshot, Task
+from app.services import HistoryService
+
+from benchmarks.datagen import generate_dataset
+
+BATCH_SIZE = 10_000
+ROUNDS = 3
+CHECKPOINTS = 5
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--etp', type=int, default=300, help="nombre d'entrées EtpEntry")
+    parser.add_argument('--edits', type=int, default=200_000)
+    parser.add_argument('--snapshot-every', type=int, default=50_000)
+    parser.add_argument('--database', help='fichier SQLite (défaut : base en mémoire)')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def database_size() -> int:
+    """Taille de la base SQLite en octets"""
+    page_count = db.session.execute(text('PRAGMA page_count')).scalar()
+    page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+    return page_count * page_size
+
+
+def apply_edits(count: int, snapshot_every: int, rng: random.Random):
+    """Applique `count` modifications par lots ; retourne les dates de contrôle (as_of) relevées"""
+    tasks = {task_id: (start, end) for task_id, start, end in db.session.query(Task.id, Task.start_date, Task.end_date)}
+    task_ids = list(tasks)
+    statement = update(Task.__table__).where(Task.__table__.c.id == bindparam('task_id')).values(
+        start_date=bindparam('start_date'), end_date=bindparam('end_date'), etp=bindparam('etp'),
+        version=Task.__table__.c.version + 1
+    )
+    renamed = update(Task.__table__).where(Task.__table__.c.id == bindparam('task_id')).values(
+        text=bindparam('text'), version=Task.__table__.c.version + 1
+    )
+    checkpoints, snapshot_seconds = [], []
+    checkpoint_every = max(count // CHECKPOINTS, 1)
+    done = 0
+    while done < count:
+        size = min(BATCH_SIZE, count - done)
+        shifts, renames = [], []
+        for index in range(size):
+            task_id = rng.choice(task_ids)
+            if (done + index) % 20 == 0:
+                renames.append({'task_id': task_id, 'text': f"Tâche {task_id} rév. {done + index}"})
+                continue
+            start, end = tasks[task_id]
+            days = timedelta(days=rng.randrange(-30, 31))
+            tasks[task_id] = (start + days, end + days)
+            shifts.append({'task_id': task_id, 'start_date': start + days, 'end_date': end + days,
+                           'etp': rng.choice([0.5, 1.0, 1.5, 2.0])})
+        db.session.execute(statement, shifts)
+        if renames:
+            db.session.execute(renamed, renames)
+        db.session.commit()
+        previous, done = done, done + size
+        if done // snapshot_every > previous // snapshot_every:
+            started = time.perf_counter()
+            HistoryService.snapshot()
+            snapshot_seconds.append(time.perf_counter() - started)
+        if done // checkpoint_every > previous // checkpoint_every:
+            # Relevé entre deux lots (les horodatages des triggers sont à la milliseconde)
+            time.sleep(0.002)
+            checkpoints.append((done, datetime.utcnow()))
+            time.sleep(0.002)
+    return checkpoints, snapshot_seconds
+
+
+def timed(function, rounds: int = ROUNDS) -> float:
+    """Médiane en millisecondes"""
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def main() -> int:
+    args = parse_args()
+    config = TestingConfig
+    if args.database:
+        config = type('HistoryBenchmarkConfig', (TestingConfig,),
+                      {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{args.database}"})
+    app = create_app(config)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        params = generate_dataset(args.projects, args.tasks, args.etp, seed=args.seed)
+        print(f"Jeu de données : {params}")
+        HistoryService.snapshot()
+        size_before = database_size()
+
+        started = time.perf_counter()
+        checkpoints, snapshot_seconds = apply_edits(args.edits, args.snapshot_every, rng)
+        duration = time.perf_counter() - started
+        growth = database_size() - size_before
+        print(f"{args.edits} modifications en {duration:.1f} s ({round(args.edits / duration)} /s, "
+              f"snapshots compris)")
+        print(f"Croissance de la base : {growth / 1e6:.1f} Mo, {growth / args.edits:.0f} octets par modification")
+
+        snapshots = db.session.query(HistorySnapshot.tasks, db.func.length(HistorySnapshot.payload)).all()
+        payloads = [size for _, size in snapshots]
+        print(f"Snapshots : {len(snapshots)}, {statistics.mean(payloads) / 1e3:.0f} Ko en moyenne "
+              f"({statistics.mean(payloads) / max(snapshots[-1][0], 1):.0f} octets par tâche), "
+              f"compactage {statistics.median(snapshot_seconds) * 1000:.0f} ms (médiane)"
+              if snapshot_seconds else f"Snapshots : {len(snapshots)}")
+
+        print(f"{'modifications':>14} {'snapshot (ms)':>14} {'journal complet (ms)':>21}")
+        for edits, as_of in checkpoints:
+            def from_snapshot():
+                app.extensions.pop('history_snapshots', None)
+                return HistoryService.state_at(as_of)
+
+            def from_start():
+                state = HistoryService._snapshot_state(None)
+                HistoryService._replay(state, (0, 0, 0), as_of=as_of)
+                return state
+
+            assert from_snapshot().tasks == from_start().tasks
+            print(f"{edits:>14} {timed(from_snapshot):>14.1f} {timed(from_start, rounds=1):>21.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
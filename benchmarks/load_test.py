@@ -0,0 +1,181 @@
+"""Test de charge : débit des endpoints de lecture selon le nombre de workers gunicorn.
+
+Usage : python -m benchmarks.load_test [--workers 1,2,4] [--threads 4] [--concurrency 16]
+                                       [--duration 10] [--projects N] [--tasks M] [--no-cache]
+
+Génère un jeu de données dans une base SQLite temporaire, démarre gunicorn
+(gunicorn.conf.py, wsgi:app) pour chaque nombre de workers demandé, puis
+envoie des requêtes en continu depuis `concurrency` clients (connexions
+keep-alive) pendant `duration` secondes par URL. Affiche requêtes/s, latences
+p50/p95 et erreurs. Le générateur de charge tourne sur la même machine et
+consomme une partie du CPU : comparer les lignes entre elles, pas aux chiffres
+d'un autre poste.
+
+Avec --no-cache, chaque requête porte un paramètre unique pour contourner le
+cache de réponses et mesurer le calcul complet.
+"""
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from app import create_app
+from app.config import ProductionConfig
+from benchmarks.datagen import generate_dataset
+
+URLS = [
+    '/project/api/projects',
+    '/project/timeline',
+]
+HOST = '127.0.0.1'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='nombres de workers à tester, séparés par des virgules')
+    parser.add_argument('--threads', type=int, default=4, help='threads par worker')
+    parser.add_argument('--concurrency', type=int, default=16, help='clients simultanés')
+    parser.add_argument('--duration', type=float, default=10.0, help='durée de mesure par URL (secondes)')
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--no-cache', action='store_true', help='contourne le cache de réponses')
+    return parser.parse_args()
+
+
+def seed_database(url: str, projects: int, tasks: int) -> Dict[str, int]:
+    config = type('LoadTestConfig', (ProductionConfig,), {'SQLALCHEMY_DATABASE_URI': url})
+    app = create_app(config)
+    with app.app_context():
+        return generate_dataset(projects, tasks, projects, seed=42)
+
+
+def start_server(url: str, workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        APP_CONFIG='production',
+        DATABASE_URL=url,
+        GUNICORN_BIND=f'{HOST}:{port}',
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        # Le recyclage des workers coupe les connexions keep-alive en cours de mesure
+        GUNICORN_MAX_REQUESTS='0',
+        GUNICORN_ACCESSLOG='',
+        GUNICORN_LOGLEVEL='warning'
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn s'est arrêté (code {server.returncode})")
+        try:
+            with socket.create_connection((HOST, port), timeout=0.5):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError("gunicorn n'a pas démarré en 30 s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def run_load(port: int, url: str, concurrency: int, duration: float, no_cache: bool) -> Dict:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(client_id: int):
+        connection = http.client.HTTPConnection(HOST, port, timeout=30)
+        local, failed, sequence = [], 0, 0
+        while time.monotonic() < deadline:
+            path = url
+            if no_cache:
+                sequence += 1
+                path += f"{'&' if '?' in url else '?'}_={client_id}-{sequence}"
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status == 200:
+                    local.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection(HOST, port, timeout=30)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    worker_counts = [int(count) for count in args.workers.split(',')]
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    url = f"sqlite:///{os.path.join(workdir, 'load_test.db')}"
+
+    try:
+        params = seed_database(url, args.projects, args.tasks)
+        print(f"Jeu de données : {params} ; {args.threads} threads/worker, "
+              f"{args.concurrency} clients, {args.duration:.0f} s par URL"
+              f"{', sans cache' if args.no_cache else ''}")
+        print(f"  {'workers':>7} {'URL':<28} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'erreurs':>8}")
+
+        for workers in worker_counts:
+            server = start_server(url, workers, args.threads, args.port)
+            try:
+                for path in URLS:
+                    # Amorçage : imports paresseux, cache de réponses, pool de connexions
+                    run_load(args.port, path, args.concurrency, 1.0, args.no_cache)
+                    result = run_load(args.port, path, args.concurrency, args.duration, args.no_cache)
+                    print(f"  {workers:>7} {path:<28} {result['rps']:>9.1f} {result['p50'] * 1000:>8.1f} "
+                          f"{result['p95'] * 1000:>8.1f} {result['errors']:>8}")
+            finally:
+                stop_server(server)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
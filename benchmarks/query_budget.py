@@ -0,0 +1,68 @@
+"""Vérifie le nombre de requêtes SQL émises par les vues timeline et ETP.
+
+Usage : python -m benchmarks.query_budget
+
+La base est peuplée avec un nombre croissant de projets ; chaque vue doit
+rester sous QUERY_BUDGET requêtes, et ce nombre ne doit pas dépendre du
+nombre de projets. Le script sort avec un code non nul en cas de dépassement.
+"""
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import TestingConfig
+from benchmarks.datagen import generate_dataset
+
+QUERY_BUDGET = 5
+PROJECT_COUNTS = [5, 50, 400]
+VIEWS = ['/project/timeline', '/project/etp_table']
+
+
+@contextmanager
+def count_queries(engine):
+    """Compte les requêtes exécutées sur l'engine pendant le bloc."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def main() -> int:
+    app = create_app(TestingConfig)
+    client = app.test_client()
+    counts = {view: {} for view in VIEWS}
+
+    for project_count in PROJECT_COUNTS:
+        with app.app_context():
+            generate_dataset(project_count, tasks=project_count * 3, etp_entries=project_count)
+            engine = db.engine
+        for view in VIEWS:
+            with app.app_context(), count_queries(engine) as statements:
+                response = client.get(view)
+            if response.status_code != 200:
+                print(f"{view} a répondu {response.status_code}")
+                return 1
+            counts[view][project_count] = len(statements)
+
+    failed = False
+    for view, by_size in counts.items():
+        detail = ', '.join(f"{n} projets: {q}" for n, q in by_size.items())
+        over_budget = max(by_size.values()) > QUERY_BUDGET
+        growing = len(set(by_size.values())) > 1
+        status = 'ÉCHEC' if over_budget or growing else 'OK'
+        failed = failed or over_budget or growing
+        print(f"[{status}] {view} ({detail}) budget={QUERY_BUDGET}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Mesure la pyramide de cumuls de la timeline : zoom, reconstruction et rattrapage.
+
+Usage : python -m benchmarks.rollups [--tasks 1000,10000,100000] [--edits 1,100,1000] [--database FICHIER]
+
+Pour chaque taille de jeu de données, affiche :
+- la reconstruction complète des cumuls (RollupService.rebuild) ;
+- le temps d'une lecture RollupService.zoom à plusieurs niveaux sur tout
+  l'horizon (portefeuille, puis séries par projet), comparé au calcul de la
+  même courbe hebdomadaire depuis les tâches (CapacityService.analyze) ;
+- le rattrapage (RollupService.catch_up) après N modifications de tâches
+  écrites par UPDATE Core en un lot, comme l'édition par lot.
+
+Le zoom doit rester stable quand le nombre de tâches augmente (il ne dépend
+que du nombre de seaux), le rattrapage croître avec N seulement.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, update
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Task
+from app.services import CapacityService, RollupService
+
+from benchmarks.datagen import HORIZON_DAYS, HORIZON_START, generate_dataset
+
+ROUNDS = 5
+HORIZON_END = HORIZON_START + timedelta(days=HORIZON_DAYS)
+ZOOMS = [
+    ('année', {'level': 'year'}),
+    ('trimestre', {'level': 'quarter'}),
+    ('mois', {'level': 'month'}),
+    ('semaine', {'level': 'week'}),
+    ('auto (100 seaux)', {'level': 'auto', 'buckets': 100}),
+    ('jour, 1 trimestre', {'level': 'day', 'start': date(2026, 1, 1), 'end': date(2026, 3, 31)}),
+    ('mois, par projet', {'level': 'month', 'by_project': True}),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', default='1000,10000,100000', help='tailles de jeu de données (séparées par des virgules)')
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--edits', default='1,100,1000', help='modifications avant chaque rattrapage')
+    parser.add_argument('--database', help='fichier SQLite (défaut : base en mémoire)')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def timed(function, rounds: int = ROUNDS) -> float:
+    """Médiane en millisecondes"""
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def edit_tasks(count: int, rng: random.Random) -> None:
+    """Décale `count` tâches tirées au hasard et change leur ETP (un seul lot)"""
+    tasks = db.session.query(Task.id, Task.start_date, Task.end_date).all()
+    rows = []
+    for task_id, start, end in rng.sample(tasks, min(count, len(tasks))):
+        days = timedelta(days=rng.randrange(-30, 31))
+        rows.append({'task_id': task_id, 'start_date': start + days, 'end_date': end + days,
+                     'etp': rng.choice([0.5, 1.0, 1.5, 2.0])})
+    statement = update(Task.__table__).where(Task.__table__.c.id == bindparam('task_id')).values(
+        start_date=bindparam('start_date'), end_date=bindparam('end_date'), etp=bindparam('etp'),
+        version=Task.__table__.c.version + 1
+    )
+    db.session.execute(statement, rows)
+    db.session.commit()
+
+
+def main() -> int:
+    args = parse_args()
+    config = TestingConfig
+    if args.database:
+        config = type('RollupBenchmarkConfig', (TestingConfig,),
+                      {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{args.database}"})
+    sizes = [int(value) for value in args.tasks.split(',')]
+    edits = [int(value) for value in args.edits.split(',')]
+    rng = random.Random(args.seed)
+
+    for size in sizes:
+        app = create_app(config)
+        with app.app_context():
+            params = generate_dataset(args.projects, size, 0, seed=args.seed)
+            print(f"\nJeu de données : {params}")
+
+            started = time.perf_counter()
+            result = RollupService.rebuild()
+            print(f"Reconstruction : {(time.perf_counter() - started) * 1000:.0f} ms, {result['rows']} cumuls")
+
+            print(f"{'zoom':>20} {'seaux':>6} {'ms':>8}")
+            for label, options in ZOOMS:
+                options = {'start': HORIZON_START, 'end': HORIZON_END, 'max_buckets': 5000, **options}
+                buckets = len(RollupService.zoom(**options)['buckets'])
+                print(f"{label:>20} {buckets:>6} {timed(lambda: RollupService.zoom(**options)):>8.2f}")
+            print(f"{'sans cumuls (sem.)':>20} {'':>6} "
+                  f"{timed(lambda: CapacityService.analyze(start=HORIZON_START, end=HORIZON_END), rounds=3):>8.2f}")
+
+            print(f"{'modifications':>14} {'rattrapage (ms)':>16}")
+            for count in edits:
+                edit_tasks(count, rng)
+                started = time.perf_counter()
+                applied = RollupService.catch_up()
+                duration = (time.perf_counter() - started) * 1000
+                assert applied == count, (applied, count)
+                print(f"{count:>14} {duration:>16.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Mini-harnais de micro-benchmarks, dans l'esprit de pytest-benchmark.
+
+Chaque mesure exécute la fonction quelques fois à blanc puis `rounds` fois,
+et retient min / médiane / moyenne / écart-type. Les résultats sont
+sauvegardés en JSON avec le commit courant pour comparer les exécutions.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = '.benchmarks'
+
+
+class BenchmarkRunner:
+    def __init__(self, rounds: int = 5, warmup: int = 1):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.results: List[Dict] = []
+
+    def run(self, name: str, fn: Callable, setup: Optional[Callable] = None, group: str = 'micro') -> Dict:
+        """Mesure `fn` ; `setup` est appelé avant chaque exécution, hors chronométrage"""
+        for _ in range(self.warmup):
+            if setup:
+                setup()
+            fn()
+
+        timings = []
+        for _ in range(self.rounds):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+
+        result = {
+            'name': name,
+            'group': group,
+            'rounds': self.rounds,
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'mean': statistics.mean(timings),
+            'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0
+        }
+        self.results.append(result)
+        print(f"  {group:>5} {name:<45} médiane {result['median'] * 1000:9.2f} ms "
+              f"(min {result['min'] * 1000:.2f}, σ {result['stddev'] * 1000:.2f})")
+        return result
+
+    def save(self, params: Dict, path: Optional[str] = None) -> str:
+        commit = _git_commit()
+        if path is None:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+            path = os.path.join(RESULTS_DIR, f"{stamp}_{commit[:8] if commit else 'nocommit'}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': commit,
+                'date': datetime.utcnow().isoformat(),
+                'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+                'params': params,
+                'benchmarks': self.results
+            }, f, indent=2)
+        return path
+
+
+def compare(baseline_path: str, results: List[Dict], threshold: float = 0.10) -> bool:
+    """Affiche l'écart de médiane avec un fichier de résultats ; True si une régression dépasse le seuil"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(b['group'], b['name']): b for b in json.load(f)['benchmarks']}
+
+    regressed = False
+    print(f"Comparaison avec {baseline_path} (seuil {threshold:.0%})")
+    for result in results:
+        previous = baseline.get((result['group'], result['name']))
+        if previous is None:
+            continue
+        change = result['median'] / previous['median'] - 1
+        flag = 'RÉGRESSION' if change > threshold else ''
+        regressed = regressed or change > threshold
+        print(f"  {result['group']:>5} {result['name']:<45} {change:+7.1%} {flag}")
+    return regressed
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,64 @@
+"""Mesure la sérialisation de la timeline telle qu'elle est servie.
+
+Usage : python -m benchmarks.serialization [--projects N] [--tasks M] [--rounds R]
+
+Mesure, sur une page de timeline couvrant tous les projets :
+  - ProjectService.get_timeline_page_fingerprints (clés du cache de
+    fragments de la page HTML) ;
+  - TimelineSerializer (colonnes en tuples, dates formatées une fois),
+    qui sert /api/timeline et les exports ;
+  - encodage JSON avec le module standard puis avec le provider de
+    l'application (orjson s'il est installé).
+"""
+import argparse
+import json
+import sys
+
+from app import create_app
+from app.config import TestingConfig
+from app.json_provider import orjson
+from app.serializers import TimelineSerializer
+from app.services import ProjectService
+from app.timeline_layout import TimelineLayout
+from benchmarks.datagen import generate_dataset
+from benchmarks.runner import BenchmarkRunner
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--tasks', type=int, default=20_000)
+    parser.add_argument('--rounds', type=int, default=5)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    app = create_app(TestingConfig)
+    runner = BenchmarkRunner(rounds=args.rounds)
+
+    with app.app_context():
+        print(f"Jeu de données : {generate_dataset(args.projects, args.tasks, 0)}")
+        layout = TimelineLayout.current()
+        window = (layout.horizon_start, layout.horizon_end)
+
+        def fingerprint_path():
+            return ProjectService.get_timeline_page_fingerprints(*window, limit=args.projects)[0]
+
+        def tuple_path():
+            return TimelineSerializer(layout).timeline_page(*window, limit=args.projects)[0]
+
+        runner.run('ProjectService.get_timeline_page_fingerprints', fingerprint_path)
+        runner.run('TimelineSerializer.timeline_page', tuple_path)
+
+        payload = {'status': 'success', 'data': {'projects': tuple_path()}}
+        runner.run('json.dumps (stdlib)', lambda: json.dumps(payload, sort_keys=True, separators=(',', ':')),
+                   group='json')
+        runner.run(f"app.json.dumps ({'orjson' if orjson else 'stdlib'})",
+                   lambda: app.json.dumps(payload, separators=(',', ':')), group='json')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Mesure le démarrage à froid de l'application, dans des interpréteurs neufs.
+
+Usage : python -m benchmarks.startup [--runs N] [--importtime N]
+
+Chaque exécution lance un nouveau processus Python qui importe `app`, appelle
+create_app(TestingConfig) puis sert une première requête (une vue de
+lecture, après création du schéma en mémoire). Les médianes sont comparées
+à STARTUP_BUDGET (import + create_app, ce que paie chaque worker gunicorn
+et chaque session de tests) ; le script sort avec un code non nul en cas de
+dépassement.
+
+Avec --importtime N, affiche aussi les N imports les plus coûteux parmi ceux
+de premier niveau et leurs dépendances directes (python -X importtime), pour
+repérer une dépendance chargée trop tôt.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STARTUP_BUDGET = 1.0  # secondes
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from app import create_app, db
+from app.config import TestingConfig
+imported = time.perf_counter()
+app = create_app(TestingConfig)
+created = time.perf_counter()
+with app.app_context():
+    db.create_all()
+ready = time.perf_counter()
+status = app.test_client().get('/project/api/projects').status_code
+served = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': created - imported,
+                  'first_request': served - ready, 'status': status}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='affiche les N imports (deux premiers niveaux) les plus lents')
+    return parser.parse_args()
+
+
+def run_probe() -> dict:
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = time.perf_counter() - started
+    return timings
+
+
+def slowest_imports(count: int):
+    """(module, durée cumulée en s) des imports des deux premiers niveaux, du plus lent au plus rapide"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Les imports imbriqués sont indentés de deux espaces par niveau
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if cumulative.strip().isdigit() and depth <= 1:
+            imports.append(('  ' * depth + name.strip(), int(cumulative) / 1e6))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:count]
+
+
+def main() -> int:
+    args = parse_args()
+    runs = [run_probe() for _ in range(args.runs)]
+    if any(run['status'] != 200 for run in runs):
+        print(f"La première requête a échoué : {runs[0]['status']}")
+        return 1
+
+    medians = {key: statistics.median(run[key] for run in runs)
+               for key in ('import', 'create_app', 'first_request', 'process')}
+    for key, value in medians.items():
+        print(f"{key:<15} {value * 1000:8.1f} ms (médiane sur {args.runs})")
+
+    if args.importtime:
+        print("\nImports les plus lents (module, puis ses dépendances directes) :")
+        for name, seconds in slowest_imports(args.importtime):
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    startup = medians['import'] + medians['create_app']
+    status = 'ÉCHEC' if startup > STARTUP_BUDGET else 'OK'
+    print(f"\n[{status}] import + create_app : {startup * 1000:.0f} ms, budget={STARTUP_BUDGET * 1000:.0f} ms")
+    return 1 if startup > STARTUP_BUDGET else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Suite de benchmarks des chemins timeline et ETP.
+
+Usage : python -m benchmarks.suite [--projects N] [--tasks M] [--etp K] [--seed S]
+                                   [--rounds R] [--output FICHIER] [--compare FICHIER]
+
+Génère un jeu de données reproductible, mesure les fonctions de service
+(micro) puis les pages et API via le client de test Flask (e2e), et
+sauvegarde les résultats en JSON dans .benchmarks/. Avec --compare, le
+script sort en erreur si une médiane régresse de plus de 10 %.
+"""
+import argparse
+import sys
+
+from app import create_app, db, response_cache
+from app.config import TestingConfig
+from app.constants import TimeConstants
+from app.models import Project
+from app.scenarios import ScenarioOverlay
+from app.services import EtpService, ProjectService, ScenarioService
+from app.serializers import TimelineSerializer
+from app.timeline_layout import TimelineLayout
+from app.timeline_render import TimelineDrawing
+from benchmarks.datagen import generate_dataset
+from benchmarks.runner import BenchmarkRunner, compare
+
+E2E_URLS = [
+    '/project/timeline',
+    '/project/etp_table',
+    '/project/api/projects',
+    '/project/api/timeline',
+    '/project/api/capacity',
+    '/project/api/search?q=audit+s%C3%A9cu',
+    '/project/timeline/export.svg',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=10_000)
+    parser.add_argument('--etp', type=int, default=300, help="nombre d'entrées EtpEntry")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output', help='fichier JSON de résultats (défaut : .benchmarks/<date>_<commit>.json)')
+    parser.add_argument('--compare', help='fichier JSON de référence')
+    return parser.parse_args()
+
+
+def run_micro(runner: BenchmarkRunner):
+    def expire():
+        db.session.expire_all()
+
+    runner.run('EtpService.get_etp_table', EtpService.get_etp_table, setup=expire)
+    project_ids = [project_id for project_id, in db.session.query(Project.id)]
+    runner.run('EtpService.refresh_project_aggregates',
+               lambda: EtpService.refresh_project_aggregates(project_ids), setup=expire)
+    db.session.rollback()
+
+    # Chemins servis par la timeline : empreintes (clés du cache de fragments), puis sérialisation
+    layout = TimelineLayout.current()
+    window = (layout.horizon_start, layout.horizon_end)
+    runner.run('ProjectService.get_timeline_page_fingerprints',
+               lambda: ProjectService.get_timeline_page_fingerprints(*window, limit=len(project_ids)))
+    runner.run('TimelineSerializer.timeline_page',
+               lambda: TimelineSerializer(layout).timeline_page(*window, limit=len(project_ids)))
+
+    # Rendus d'export (hors cache disque), sur toute la timeline
+    timeline, _ = TimelineSerializer(layout).timeline_page(*window, limit=len(project_ids))
+    runner.run('TimelineDrawing.to_svg',
+               lambda: TimelineDrawing('Bench', layout.labels, timeline, TimeConstants.MILESTONES).to_svg())
+    runner.run('TimelineDrawing.to_pdf',
+               lambda: TimelineDrawing('Bench', layout.labels, timeline, TimeConstants.MILESTONES).to_pdf())
+
+
+def run_scenarios(runner: BenchmarkRunner, count: int = 24):
+    """Scénarios décalant chacun un projet d'un trimestre, évalués seuls puis côte à côte"""
+    project_ids = [project_id for project_id, in db.session.query(Project.id).order_by(Project.id).limit(count)]
+    scenario_ids = []
+    for project_id in project_ids:
+        scenario = ScenarioService.create_scenario(f"Bench {project_id} +1T")
+        ScenarioService.apply(scenario.id, [{'op': 'shift', 'project_id': project_id, 'months': 3}])
+        scenario_ids.append(scenario.id)
+
+    layout = TimelineLayout.current()
+    runner.run('EtpService.get_etp_table (scénario)',
+               lambda: EtpService.get_etp_table(ScenarioOverlay.load(scenario_ids[0])))
+    runner.run('TimelineSerializer.timeline_page (scénario)',
+               lambda: TimelineSerializer(layout).timeline_page(layout.horizon_start, layout.horizon_end,
+                                                                limit=Project.query.count(),
+                                                                overlay=ScenarioOverlay.load(scenario_ids[0])))
+    runner.run(f'ScenarioService.compare ({len(scenario_ids)} scénarios)',
+               lambda: ScenarioService.compare(scenario_ids))
+
+
+def run_e2e(runner: BenchmarkRunner, client):
+    for url in E2E_URLS:
+        # À froid : la version des données change avant chaque appel (cache invalidé)
+        runner.run(f"GET {url} (cold)", lambda: client.get(url), setup=response_cache.bump, group='e2e')
+        runner.run(f"GET {url} (cached)", lambda: client.get(url), group='e2e')
+
+
+def main() -> int:
+    args = parse_args()
+    app = create_app(TestingConfig)
+    runner = BenchmarkRunner(rounds=args.rounds)
+
+    with app.app_context():
+        params = generate_dataset(args.projects, args.tasks, args.etp, seed=args.seed)
+        print(f"Jeu de données : {params}")
+        run_micro(runner)
+        run_scenarios(runner)
+        client = app.test_client()
+        run_e2e(runner, client)
+
+    path = runner.save(params, args.output)
+    print(f"Résultats sauvegardés dans {path}")
+
+    if args.compare:
+        return 1 if compare(args.compare, runner.results) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
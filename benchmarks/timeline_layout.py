@@ -0,0 +1,82 @@
+"""Compare le moteur de positionnement par lot avec l'ancien calcul tâche par tâche.
+
+Usage : python -m benchmarks.timeline_layout [nombre_de_tâches]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from app.models import Task
+from app.timeline_layout import TimelineLayout
+
+DEFAULT_TASK_COUNT = 100_000
+
+
+def legacy_grid_position(task):
+    """Ancienne implémentation de Task._calculate_grid_position (calendrier 2025 codé en dur)."""
+    def get_quarter_position(d: date) -> float:
+        if d.year > 2025:
+            return 80.0
+
+        quarter = (d.month - 1) // 3
+        base_position = quarter * 20.0
+
+        month_in_quarter = (d.month - 1) % 3
+        days_in_quarter = 90
+        days_from_quarter_start = (month_in_quarter * 30) + (d.day - 1)
+        relative_position = (days_from_quarter_start / days_in_quarter) * 20.0
+
+        return base_position + relative_position
+
+    start_pos = get_quarter_position(task.start_date)
+    end_pos = get_quarter_position(task.end_date)
+
+    if end_pos < start_pos:
+        end_pos = 100.0
+
+    width = end_pos - start_pos
+
+    if width < 15 and (task.end_date.month - task.start_date.month >= 1):
+        width = 15
+    elif width < 8:
+        width = 8
+
+    return start_pos, width
+
+
+def make_tasks(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    tasks = []
+    for _ in range(count):
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(0, 730))
+        tasks.append(Task(start_date=start, end_date=start + timedelta(days=rng.randrange(7, 240))))
+    return tasks
+
+
+def timed(fn):
+    began = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - began
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TASK_COUNT
+    tasks = make_tasks(count)
+    layout = TimelineLayout.current()
+
+    _, legacy_time = timed(lambda: [legacy_grid_position(task) for task in tasks])
+    _, per_task_time = timed(lambda: [task._calculate_grid_position() for task in tasks])
+    _, batch_time = timed(lambda: layout.compute([task.start_date for task in tasks],
+                                                 [task.end_date for task in tasks]))
+
+    print(f"{count} tâches")
+    print(f"  ancien calcul par tâche   : {legacy_time * 1000:8.1f} ms")
+    print(f"  moteur, appel par tâche   : {per_task_time * 1000:8.1f} ms")
+    print(f"  moteur, calcul par lot    : {batch_time * 1000:8.1f} ms "
+          f"(x{legacy_time / batch_time:.1f} vs ancien)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
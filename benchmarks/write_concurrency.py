@@ -0,0 +1,104 @@
+"""Test de charge concurrent sur les endpoints d'écriture des tâches (SQLite fichier).
+
+Usage : python -m benchmarks.write_concurrency [workers] [requêtes_par_worker]
+
+Plusieurs processus (comme des workers gunicorn) créent, modifient et lisent
+des tâches sur la même base, une fois sans les PRAGMA SQLite de la
+configuration et une fois avec. Le script compte les réponses en erreur et
+les "database is locked" ; il sort en erreur si la configuration actuelle
+en produit encore.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app import create_app, db
+from app.config import Config
+from app.models import Project
+
+DEFAULT_WORKERS = 8
+DEFAULT_REQUESTS = 100
+
+
+def make_config(database_path: str, pragmas: dict):
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_path}"
+        SQLITE_PRAGMAS = pragmas
+    return LoadTestConfig
+
+
+def worker(database_path: str, pragmas: dict, requests: int, worker_id: int, results):
+    app = create_app(make_config(database_path, pragmas))
+    client = app.test_client()
+    errors = locked = 0
+    # create_task journalise sur stdout : on le fait taire pendant la mesure
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(requests):
+            response = client.post('/project/api/tasks', json={
+                'project_id': 1,
+                'text': f"Worker {worker_id} task {i}",
+                'start_date': '2025-03-01',
+                'end_date': '2025-06-01',
+                'etp': 1.0
+            })
+            if response.status_code == 201:
+                task_id = response.json['data']['task']['id']
+                response = client.put(f'/project/api/tasks/{task_id}', json={
+                    'start_date': '2025-04-01',
+                    'end_date': '2025-07-01',
+                    'etp': 2.0
+                })
+            if response.status_code >= 400:
+                errors += 1
+                locked += b'database is locked' in response.data
+            client.get('/project/api/timeline?limit=20')
+    results.put((errors, locked))
+
+
+def run(pragmas: dict, workers: int, requests: int):
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = os.path.join(directory, 'load_test.db')
+        app = create_app(make_config(database_path, pragmas))
+        with app.app_context():
+            db.create_all()
+            db.session.add(Project(name='Load test'))
+            db.session.commit()
+            db.engine.dispose()
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(database_path, pragmas, requests, i, results))
+            for i in range(workers)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        duration = time.perf_counter() - started
+
+    errors = sum(error for error, _ in totals)
+    locked = sum(lock for _, lock in totals)
+    return errors, locked, workers * requests * 2 / duration
+
+
+def main() -> int:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_WORKERS
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REQUESTS
+
+    failed = False
+    for label, pragmas in [('sans PRAGMA', {}), ('configuration', Config.SQLITE_PRAGMAS)]:
+        errors, locked, throughput = run(pragmas, workers, requests)
+        print(f"{label:>14} : {errors} erreurs dont {locked} 'database is locked', "
+              f"{throughput:.0f} écritures/s ({workers} workers)")
+        failed = label == 'configuration' and errors > 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
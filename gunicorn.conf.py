@@ -0,0 +1,47 @@
+"""Configuration gunicorn ; chaque réglage est surchargeable par l'environnement.
+
+    GUNICORN_BIND      adresse d'écoute (défaut 0.0.0.0:8000)
+    GUNICORN_WORKERS   nombre de processus (défaut 2 × CPU + 1)
+    GUNICORN_THREADS   threads par processus (défaut 4)
+    GUNICORN_TIMEOUT   délai avant redémarrage d'un worker bloqué (défaut 30 s)
+
+Le flux des modifications (/project/api/changes) en découle : sans
+CHANGE_FEED_REDIS_URL, il est désactivé dès qu'il y a plus d'un worker, et
+chaque worker garde au plus la moitié de ses threads pour les flux longs
+(aucun en worker sync, dont le timeout couperait le flux) ; les autres
+connexions sont servies en interrogation courte.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# gthread : les lectures passent leur temps dans la base ou l'E/S, les threads se partagent le GIL
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+
+# Lus par app.config (Config) : le fichier est exécuté avant le chargement de l'application
+os.environ.setdefault('CHANGE_FEED_PROCESSES', str(workers))
+os.environ.setdefault('CHANGE_FEED_MAX_STREAMS', str(threads // 2))
+
+# Application, modèles et templates importés une seule fois dans le maître
+preload_app = True
+# Recycle les workers de temps en temps (fuites mémoire éventuelles) ; 0 désactive
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Les connexions ouvertes dans le maître ne doivent pas être partagées entre processus"""
+    from app import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,32 @@
+"""add etp aggregates
+
+Revision ID: 5c1e8a9d2f40
+Revises: 39d8da607c36
+Create Date: 2026-10-18 09:12:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e8a9d2f40'
+down_revision = '39d8da607c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('etp_aggregates',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('period_values', sa.JSON(), nullable=False),
+    sa.Column('max_etp', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+    # Les agrégats manquants sont recalculés à la première lecture de la table ETP
+
+
+def downgrade():
+    op.drop_table('etp_aggregates')
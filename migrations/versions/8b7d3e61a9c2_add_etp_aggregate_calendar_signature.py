@@ -0,0 +1,26 @@
+"""add etp aggregate calendar signature
+
+Revision ID: 8b7d3e61a9c2
+Revises: 5c1e8a9d2f40
+Create Date: 2026-10-18 10:03:17.084512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7d3e61a9c2'
+down_revision = '5c1e8a9d2f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('etp_aggregates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('calendar_signature', sa.String(length=40), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('etp_aggregates', schema=None) as batch_op:
+        batch_op.drop_column('calendar_signature')
@@ -0,0 +1,26 @@
+"""add tasks project dates index
+
+Revision ID: c4f2a7b90e13
+Revises: 8b7d3e61a9c2
+Create Date: 2026-10-18 11:26:05.731940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f2a7b90e13'
+down_revision = '8b7d3e61a9c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_project_dates', ['project_id', 'start_date', 'end_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_index('ix_tasks_project_dates')
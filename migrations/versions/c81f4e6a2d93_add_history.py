@@ -0,0 +1,204 @@
+"""add history
+
+Revision ID: c81f4e6a2d93
+Revises: f3a6d2b8c951
+Create Date: 2026-10-18 16:47:12.930215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f4e6a2d93'
+down_revision = 'f3a6d2b8c951'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+POSTGRESQL_NOW = "(now() AT TIME ZONE 'utc')"
+
+SQLITE_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS task_history_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO task_history (task_id, operation, changed_at, project_id, text, comment, start_date, end_date, color, etp, version)
+    VALUES (new.id, 'I', {SQLITE_NOW}, new.project_id, new.text, new.comment, new.start_date, new.end_date, new.color, new.etp, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS task_history_update AFTER UPDATE ON tasks BEGIN
+    INSERT INTO task_history (task_id, operation, changed_at, project_id, text, comment, start_date, end_date, color, etp, version)
+    VALUES (new.id, 'U', {SQLITE_NOW}, new.project_id,
+            CASE WHEN new.text IS old.text THEN NULL ELSE coalesce(new.text, '') END,
+            CASE WHEN new.comment IS old.comment THEN NULL ELSE coalesce(new.comment, '') END,
+            new.start_date, new.end_date, new.color, new.etp, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS task_history_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO task_history (task_id, operation, changed_at) VALUES (old.id, 'D', {SQLITE_NOW});
+END;
+CREATE TRIGGER IF NOT EXISTS project_history_insert AFTER INSERT ON projects BEGIN
+    INSERT INTO project_history (project_id, operation, changed_at, name, color_scheme, version)
+    VALUES (new.id, 'I', {SQLITE_NOW}, new.name, new.color_scheme, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS project_history_update AFTER UPDATE ON projects BEGIN
+    INSERT INTO project_history (project_id, operation, changed_at, name, color_scheme, version)
+    VALUES (new.id, 'U', {SQLITE_NOW}, new.name, new.color_scheme, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS project_history_delete AFTER DELETE ON projects BEGIN
+    INSERT INTO project_history (project_id, operation, changed_at) VALUES (old.id, 'D', {SQLITE_NOW});
+END;
+CREATE TRIGGER IF NOT EXISTS etp_entry_history_insert AFTER INSERT ON etp_entries BEGIN
+    INSERT INTO etp_entry_history (project_id, period, operation, changed_at, etp_value, version)
+    VALUES (new.project_id, new.period, 'I', {SQLITE_NOW}, new.etp_value, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS etp_entry_history_update AFTER UPDATE ON etp_entries BEGIN
+    INSERT INTO etp_entry_history (project_id, period, operation, changed_at, etp_value, version)
+    VALUES (new.project_id, new.period, 'U', {SQLITE_NOW}, new.etp_value, new.version);
+END;
+CREATE TRIGGER IF NOT EXISTS etp_entry_history_delete AFTER DELETE ON etp_entries BEGIN
+    INSERT INTO etp_entry_history (project_id, period, operation, changed_at) VALUES (old.project_id, old.period, 'D', {SQLITE_NOW});
+END;
+"""
+
+POSTGRESQL_FUNCTIONS = {
+    ('tasks', 'task_history'): f"""
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO task_history (task_id, operation, changed_at, project_id, text, comment, start_date, end_date, color, etp, version)
+            VALUES (new.id, 'I', {POSTGRESQL_NOW}, new.project_id, new.text, new.comment, new.start_date, new.end_date, new.color, new.etp, new.version);
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO task_history (task_id, operation, changed_at, project_id, text, comment, start_date, end_date, color, etp, version)
+            VALUES (new.id, 'U', {POSTGRESQL_NOW}, new.project_id,
+                    CASE WHEN new.text IS NOT DISTINCT FROM old.text THEN NULL ELSE coalesce(new.text, '') END,
+                    CASE WHEN new.comment IS NOT DISTINCT FROM old.comment THEN NULL ELSE coalesce(new.comment, '') END,
+                    new.start_date, new.end_date, new.color, new.etp, new.version);
+        ELSE
+            INSERT INTO task_history (task_id, operation, changed_at) VALUES (old.id, 'D', {POSTGRESQL_NOW});
+        END IF;
+    """,
+    ('projects', 'project_history'): f"""
+        IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+            INSERT INTO project_history (project_id, operation, changed_at, name, color_scheme, version)
+            VALUES (new.id, left(TG_OP, 1), {POSTGRESQL_NOW}, new.name, new.color_scheme, new.version);
+        ELSE
+            INSERT INTO project_history (project_id, operation, changed_at) VALUES (old.id, 'D', {POSTGRESQL_NOW});
+        END IF;
+    """,
+    ('etp_entries', 'etp_entry_history'): f"""
+        IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+            INSERT INTO etp_entry_history (project_id, period, operation, changed_at, etp_value, version)
+            VALUES (new.project_id, new.period, left(TG_OP, 1), {POSTGRESQL_NOW}, new.etp_value, new.version);
+        ELSE
+            INSERT INTO etp_entry_history (project_id, period, operation, changed_at) VALUES (old.project_id, old.period, 'D', {POSTGRESQL_NOW});
+        END IF;
+    """,
+}
+
+
+def upgrade():
+    op.create_table('task_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sa.String(length=1), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('text', sa.String(length=200), nullable=True),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('etp', sa.Float(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_history_task', 'task_history', ['task_id', 'id'], unique=False)
+    op.create_index('ix_task_history_changed_at', 'task_history', ['changed_at'], unique=False)
+    op.create_table('project_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sa.String(length=1), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('color_scheme', sa.String(length=50), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_project_history_changed_at', 'project_history', ['changed_at'], unique=False)
+    op.create_table('etp_entry_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=20), nullable=False),
+    sa.Column('operation', sa.String(length=1), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.Column('etp_value', sa.Float(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_etp_entry_history_changed_at', 'etp_entry_history', ['changed_at'], unique=False)
+    op.create_table('history_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('task_history_id', sa.Integer(), nullable=False),
+    sa.Column('project_history_id', sa.Integer(), nullable=False),
+    sa.Column('etp_entry_history_id', sa.Integer(), nullable=False),
+    sa.Column('tasks', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_history_snapshots_taken_at'), 'history_snapshots', ['taken_at'], unique=False)
+
+    # Mêmes triggers que app.models.history (copiés : une migration ne doit pas
+    # dépendre du code applicatif, qui évolue)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        now = SQLITE_NOW
+        for statement in SQLITE_TRIGGERS.split('END;')[:-1]:
+            op.execute(statement + 'END')
+    elif dialect == 'postgresql':
+        now = POSTGRESQL_NOW
+        for (table, history), body in POSTGRESQL_FUNCTIONS.items():
+            op.execute(f"""
+                CREATE OR REPLACE FUNCTION {history}_record() RETURNS trigger AS $$
+                BEGIN
+                    {body}
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+            """)
+            op.execute(f'DROP TRIGGER IF EXISTS {history}_record ON {table}')
+            op.execute(f'CREATE TRIGGER {history}_record AFTER INSERT OR UPDATE OR DELETE ON {table} '
+                       f'FOR EACH ROW EXECUTE FUNCTION {history}_record()')
+    else:
+        return
+
+    # L'état existant devient la première entrée de l'historique
+    op.execute(f"""
+        INSERT INTO task_history (task_id, operation, changed_at, project_id, text, comment, start_date, end_date, color, etp, version)
+        SELECT id, 'I', {now}, project_id, text, comment, start_date, end_date, color, etp, version FROM tasks
+    """)
+    op.execute(f"""
+        INSERT INTO project_history (project_id, operation, changed_at, name, color_scheme, version)
+        SELECT id, 'I', {now}, name, color_scheme, version FROM projects
+    """)
+    op.execute(f"""
+        INSERT INTO etp_entry_history (project_id, period, operation, changed_at, etp_value, version)
+        SELECT project_id, period, 'I', {now}, etp_value, version FROM etp_entries
+    """)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, history in (('tasks', 'task_history'), ('projects', 'project_history'),
+                           ('etp_entries', 'etp_entry_history')):
+        if dialect == 'sqlite':
+            for name in ('insert', 'update', 'delete'):
+                op.execute(f'DROP TRIGGER IF EXISTS {history}_{name}')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER IF EXISTS {history}_record ON {table}')
+            op.execute(f'DROP FUNCTION IF EXISTS {history}_record()')
+    op.drop_index(op.f('ix_history_snapshots_taken_at'), table_name='history_snapshots')
+    op.drop_table('history_snapshots')
+    op.drop_index('ix_etp_entry_history_changed_at', table_name='etp_entry_history')
+    op.drop_table('etp_entry_history')
+    op.drop_index('ix_project_history_changed_at', table_name='project_history')
+    op.drop_table('project_history')
+    op.drop_index('ix_task_history_changed_at', table_name='task_history')
+    op.drop_table('task_history')
@@ -0,0 +1,29 @@
+"""add version columns
+
+Revision ID: d7a5c3e82f16
+Revises: c4f2a7b90e13
+Create Date: 2026-10-18 13:31:12.406518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a5c3e82f16'
+down_revision = 'c4f2a7b90e13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les lignes existantes démarrent en version 1
+    for table in ('projects', 'tasks', 'etp_entries'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('etp_entries', 'tasks', 'projects'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
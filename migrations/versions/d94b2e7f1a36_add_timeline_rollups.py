@@ -0,0 +1,41 @@
+"""add timeline rollups
+
+Revision ID: d94b2e7f1a36
+Revises: c81f4e6a2d93
+Create Date: 2026-10-18 18:12:45.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd94b2e7f1a36'
+down_revision = 'c81f4e6a2d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables vides : les cumuls sont calculés à la première lecture (ou par `flask rollups rebuild`)
+    op.create_table('timeline_rollups',
+    sa.Column('level', sa.String(length=10), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.Column('etp_milli', sa.BigInteger(), nullable=False),
+    sa.Column('etp_days_milli', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('level', 'project_id', 'bucket')
+    )
+    op.create_table('timeline_rollup_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_history_id', sa.Integer(), nullable=False),
+    sa.Column('rebuilt_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('timeline_rollup_state')
+    op.drop_table('timeline_rollups')
@@ -0,0 +1,68 @@
+"""add task search index
+
+Revision ID: e5b9c1d47a20
+Revises: d7a5c3e82f16
+Create Date: 2026-10-18 14:02:41.218764
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c1d47a20'
+down_revision = 'd7a5c3e82f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Mêmes instructions que app.models.search_index (copiées : une migration ne
+    # doit pas dépendre du code applicatif, qui évolue)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                text, comment, content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO tasks_fts(rowid, text, comment) VALUES (new.id, new.text, new.comment);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                INSERT INTO tasks_fts(tasks_fts, rowid, text, comment) VALUES ('delete', old.id, old.text, old.comment);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF text, comment ON tasks BEGIN
+                INSERT INTO tasks_fts(tasks_fts, rowid, text, comment) VALUES ('delete', old.id, old.text, old.comment);
+                INSERT INTO tasks_fts(rowid, text, comment) VALUES (new.id, new.text, new.comment);
+            END
+        """)
+        # Indexation des tâches existantes
+        op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        # La colonne générée est calculée pour les lignes existantes à l'ajout
+        op.execute("""
+            ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(text, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(comment, '')), 'B')
+            ) STORED
+        """)
+        op.execute('CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS tasks_fts_update')
+        op.execute('DROP TRIGGER IF EXISTS tasks_fts_delete')
+        op.execute('DROP TRIGGER IF EXISTS tasks_fts_insert')
+        op.execute('DROP TABLE IF EXISTS tasks_fts')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_tasks_search_vector')
+        op.execute('ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,58 @@
+"""add scenarios
+
+Revision ID: f3a6d2b8c951
+Revises: e5b9c1d47a20
+Create Date: 2026-10-18 15:21:07.604512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a6d2b8c951'
+down_revision = 'e5b9c1d47a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scenarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('scenario_tasks',
+    sa.Column('scenario_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('start_date', sa.Date(), nullable=True),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('etp', sa.Float(), nullable=True),
+    sa.Column('removed', sa.Boolean(), server_default='0', nullable=False),
+    sa.Column('base_version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['scenario_id'], ['scenarios.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('scenario_id', 'task_id')
+    )
+    op.create_table('scenario_etp_entries',
+    sa.Column('scenario_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=20), nullable=False),
+    sa.Column('etp_value', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['scenario_id'], ['scenarios.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('scenario_id', 'project_id', 'period')
+    )
+
+
+def downgrade():
+    op.drop_table('scenario_etp_entries')
+    op.drop_table('scenario_tasks')
+    op.drop_table('scenarios')
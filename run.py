@@ -1,7 +1,15 @@
+"""Serveur de développement.
+
+    python run.py
+
+Une base vide est créée et peuplée avec les données de démonstration au
+lancement. Ailleurs (gunicorn, tests), le schéma n'est jamais vérifié au
+démarrage : `flask init-db` crée une base neuve et `flask db upgrade`
+applique les migrations.
+"""
 from app import create_app, db
-from app.services.init_data import init_db_data
+from app.database import bootstrap_database
 import logging
-import os
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -9,29 +17,12 @@ logger = logging.getLogger(__name__)
 
 app = create_app()
 
-# Nom du fichier de la base de données
-DB_FILE = 'instance/project_manager.db'
-
 if __name__ == '__main__':
     with app.app_context():
-        try:
-            # Vérifie si la base de données existe déjà
-            db_exists = os.path.exists(DB_FILE)
-            
-            if not db_exists:
-                logger.info("Base de données non trouvée, création initiale...")
-                db.create_all()
-                logger.info("Tables créées avec succès")
-                
-                logger.info("Initialisation avec les données de test...")
-                init_db_data()
-                logger.info("Données de test initialisées avec succès")
-            else:
-                logger.info("Base de données existante trouvée, conservation des données...")
-        
-        except Exception as e:
-            logger.error(f"Une erreur est survenue : {str(e)}")
-            raise e
-        
+        if bootstrap_database(db):
+            logger.info("Base de données créée et initialisée avec les données de test")
+        else:
+            logger.info("Base de données existante trouvée, conservation des données...")
+
     logger.info("Démarrage de l'application Flask...")
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,16 @@
+"""Point d'entrée WSGI de production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+La configuration est choisie par APP_CONFIG (production par défaut) et la
+base par DATABASE_URL. Chaque requête travaille dans son propre contexte
+d'application, donc avec sa propre session SQLAlchemy (Flask-SQLAlchemy
+indexe la session scoped sur le contexte) : les vues de lecture peuvent être
+servies par plusieurs threads d'un même worker. L'état partagé entre
+requêtes (cache de réponses, métriques, caches de layout et de calendrier)
+est soit protégé par un verrou, soit immuable une fois construit.
+"""
+from app import create_app
+from app.config import config_from_env
+
+app = create_app(config_from_env())